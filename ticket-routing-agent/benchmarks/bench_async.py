@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Compare the synchronous scan with the overlapped asyncio scan (--async) against
+a fake Gmail service with a fixed latency per round trip.
+
+Reports the time from the start of the scan until the first forward and the
+first urgent forward are sent, and the total scan time. Both scans are checked
+to produce the same tickets and send the same forwards.
+
+    python benchmarks/bench_async.py --messages 5000 --latency-ms 20 --send-workers 4
+"""
+import os
+import sys
+import time
+import asyncio
+import logging
+import argparse
+from collections import Counter
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.agent import TicketRoutingAgent
+from src.rate_limiter import TokenBucket
+from benchmarks.fake_gmail import FakeGmailService, make_inbox
+
+logging.getLogger('ticket_routing_agent').setLevel(logging.WARNING)
+
+
+def run(inbox, use_async, latency, options):
+    agent = TicketRoutingAgent(**options)
+    service = FakeGmailService(inbox, latency=latency)
+    handler = agent.gmail_handler
+    handler.service = service
+    handler.authenticate = lambda: True
+    handler.send_limiter = TokenBucket(1e12, 1e12)
+
+    sent_at = {}
+    forward_email = handler.forward_email
+
+    def timed_forward(description, recipient, subject, body):
+        status = forward_email(description, recipient, subject, body)
+        kind = 'urgent' if subject.startswith("[FORWARDED] URGENT") else 'any'
+        for key in {kind, 'any'}:
+            sent_at.setdefault(key, time.perf_counter() - start)
+        return status
+
+    handler.forward_email = timed_forward
+
+    start = time.perf_counter()
+    tickets = asyncio.run(agent.scan_gmail_async()) if use_async else agent.scan_gmail()
+    elapsed = time.perf_counter() - start
+
+    outcome = [(t.id, t.category, t.is_urgent) for t in tickets]
+    forwards = Counter(message['raw'] for message in service.sent)
+    return elapsed, sent_at.get('any'), sent_at.get('urgent'), outcome, forwards
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Synchronous vs overlapped asyncio scan benchmark')
+    parser.add_argument('--messages', type=int, default=5000, help='Messages in the synthetic inbox')
+    parser.add_argument('--latency-ms', type=float, default=20.0, help='Simulated latency per Gmail round trip')
+    parser.add_argument('--send-workers', type=int, default=4, help='Concurrent sends')
+    parser.add_argument('--fetch-concurrency', type=int, default=4, help='Batch fetches in flight with --async')
+    parser.add_argument('--classify-concurrency', type=int, default=2, help='Extraction workers with --async')
+    parser.add_argument('--queue-size', type=int, default=200, help='Items buffered between --async stages')
+    args = parser.parse_args()
+
+    inbox = make_inbox(args.messages, ticket_share=0.1)
+    options = {
+        'send_workers': args.send_workers,
+        'fetch_concurrency': args.fetch_concurrency,
+        'classify_concurrency': args.classify_concurrency,
+        'queue_size': args.queue_size,
+    }
+    print(f"{args.messages} messages, {args.latency_ms:.0f} ms per round trip, {args.send_workers} send workers")
+    print(f"{'mode':<8}{'first forward s':>17}{'first urgent s':>16}{'scan s':>9}{'tickets':>9}")
+
+    expected = None
+    for use_async in (False, True):
+        elapsed, first, first_urgent, outcome, forwards = run(inbox, use_async, args.latency_ms / 1000, options)
+        if expected is None:
+            expected = (outcome, forwards)
+        assert (outcome, forwards) == expected, "the async scan produced different tickets or forwards"
+        print(f"{'async' if use_async else 'sync':<8}{first or 0:>17.2f}{first_urgent or 0:>16.2f}"
+              f"{elapsed:>9.2f}{len(outcome):>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Measure authenticate() and API request construction with the real Google client
+libraries, using a locally written token.json that is still valid so no network
+access is needed.
+
+    python benchmarks/bench_auth.py --calls 5 --requests 1000
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.gmail_handler import GmailHandler, SCOPES
+
+# build() with the default cache_discovery logs that its file cache is unavailable on every call
+logging.getLogger('googleapiclient.discovery_cache').setLevel(logging.WARNING)
+
+
+def write_token(path):
+    expiry = datetime.utcnow() + timedelta(hours=1)
+    with open(path, 'w') as f:
+        json.dump({
+            'token': 'local-access-token',
+            'refresh_token': 'local-refresh-token',
+            'token_uri': 'https://oauth2.googleapis.com/token',
+            'client_id': 'local-client-id.apps.googleusercontent.com',
+            'client_secret': 'local-client-secret',
+            'scopes': SCOPES,
+            'expiry': expiry.isoformat() + 'Z',
+        }, f)
+
+
+def legacy_authenticate(token_path):
+    """What authenticate() did on every call: eval token.json and build a new service."""
+    from google.oauth2.credentials import Credentials
+    from googleapiclient.discovery import build
+
+    creds = Credentials.from_authorized_user_info(eval(open(token_path, 'r').read()), SCOPES)
+    return build('gmail', 'v1', credentials=creds)
+
+
+def timed(function, calls):
+    times = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return result, times
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Authentication and client construction benchmark')
+    parser.add_argument('--calls', type=int, default=5, help='authenticate() calls per mode')
+    parser.add_argument('--requests', type=int, default=1000, help='messages.get requests to build per mode')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        token_path = os.path.join(tmp, 'token.json')
+        write_token(token_path)
+
+        # Import the client libraries up front so neither mode is charged for them
+        import google.auth.transport.requests
+        import google_auth_oauthlib.flow
+        legacy_authenticate(token_path)
+
+        service, legacy = timed(lambda: legacy_authenticate(token_path), args.calls)
+        handler = GmailHandler(token_path=token_path, credentials_path=os.path.join(tmp, 'missing.json'))
+        _, cached = timed(handler.authenticate, args.calls)
+        if handler._refresh_timer is not None:
+            handler._refresh_timer.cancel()
+
+    print(f"authenticate(), {args.calls} calls (ms)")
+    print(f"  {'eval + build every call':<26}" + ''.join(f"{t * 1000:>8.2f}" for t in legacy))
+    print(f"  {'cached':<26}" + ''.join(f"{t * 1000:>8.2f}" for t in cached))
+
+    _, chained = timed(lambda: service.users().messages().get(userId='me', id='x', format='full'), args.requests)
+    _, reused = timed(lambda: handler.messages_api.get(userId='me', id='x', format='full'), args.requests)
+    print(f"\nBuilding {args.requests} messages.get requests (not executed)")
+    print(f"  {'service.users().messages()':<28}{sum(chained) * 1000:>9.0f} ms  "
+          f"({sum(chained) / args.requests * 1e6:.0f} us each)")
+    print(f"  {'cached messages collection':<28}{sum(reused) * 1000:>9.0f} ms  "
+          f"({sum(reused) / args.requests * 1e6:.0f} us each)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Compare serial and batched inbox fetching against the fake Gmail service.
+
+    python benchmarks/bench_batch_fetch.py --messages 1000 --latency-ms 20
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.gmail_handler import DEFAULT_BATCH_SIZE, GmailHandler
+from benchmarks.fake_gmail import FakeGmailService, make_message
+
+
+def run(messages, latency, batch_size):
+    service = FakeGmailService(messages, latency=latency)
+    handler = GmailHandler(batch_size=batch_size)
+    handler.service = service
+
+    start = time.perf_counter()
+    fetched = handler.get_all_inbox_emails()
+    elapsed = time.perf_counter() - start
+
+    assert len(fetched) == len(messages)
+    return service.round_trips, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Batched Gmail fetch benchmark')
+    parser.add_argument('--messages', type=int, default=1000, help='Messages in the fake inbox')
+    parser.add_argument('--latency-ms', type=float, default=20.0, help='Simulated latency per round trip')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Messages per batch request')
+    args = parser.parse_args()
+
+    messages = [make_message(i) for i in range(args.messages)]
+    latency = args.latency_ms / 1000
+
+    print(f"{args.messages} messages, {args.latency_ms:.0f} ms per round trip")
+    print(f"{'mode':<10}{'round trips':>14}{'wall time (s)':>16}")
+    for label, batch_size in (('serial', 1), ('batched', args.batch_size)):
+        round_trips, elapsed = run(messages, latency, batch_size)
+        print(f"{label:<10}{round_trips:>14}{elapsed:>16.3f}")
+
+
+if __name__ == "__main__":
+    main()
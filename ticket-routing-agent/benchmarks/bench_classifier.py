@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Compare first-match classification with the weighted scoring mode of TicketAnalyzer.
+Each run produces a category and an urgency flag per email, as summarize_ticket does.
+
+    python benchmarks/bench_classifier.py --emails 100000
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.ticket_analyzer import TicketAnalyzer, URGENT_LABEL
+from benchmarks.bench_keyword_matcher import make_corpus
+
+
+def legacy_classify(analyzer, subject, body):
+    """The first-match-wins and urgency loops the matcher replaced."""
+    text = f"{subject} {body}".lower()
+    is_urgent = any(word in text for word in analyzer.urgent_keywords)
+    for category, keywords in analyzer.issue_categories.items():
+        for keyword in keywords:
+            if keyword in text:
+                return category.title(), is_urgent
+    return "Cross-Functional", is_urgent
+
+
+def first_match_classify(analyzer, subject, body):
+    """What summarize_ticket does by default."""
+    labels = analyzer.matcher.labels(f"{subject} {body}")
+    return analyzer._category_from_labels(labels), URGENT_LABEL in labels
+
+
+def scoring_classify(analyzer, subject, body):
+    """What summarize_ticket does in scoring mode."""
+    matches = analyzer.matcher.find_all(f"{subject}\n{body}")
+    ranking = analyzer._rank_matches(matches, len(subject))
+    is_urgent = any(URGENT_LABEL in match.labels for match in matches)
+    return analyzer._category_from_ranking(ranking), is_urgent
+
+
+def timed(classify, corpus):
+    start = time.perf_counter()
+    results = [classify(subject, body) for subject, body in corpus]
+    return results, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Ticket classifier benchmark')
+    parser.add_argument('--emails', type=int, default=100000, help='Synthetic emails to classify')
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.emails)
+    first_match = TicketAnalyzer()
+    scoring = TicketAnalyzer(scoring=True)
+
+    runs = [
+        ('substring loop', lambda subject, body: legacy_classify(first_match, subject, body)),
+        ('first match', lambda subject, body: first_match_classify(first_match, subject, body)),
+        ('scoring', lambda subject, body: scoring_classify(scoring, subject, body)),
+    ]
+
+    print(f"{args.emails} emails")
+    print(f"{'classifier':<16}{'time (s)':>10}{'emails/s':>12}")
+    results = {}
+    for label, classify in runs:
+        results[label], elapsed = timed(classify, corpus)
+        print(f"{label:<16}{elapsed:>10.3f}{args.emails / elapsed:>12.0f}")
+
+    changed = sum(1 for old, new in zip(results['first match'], results['scoring']) if old[0] != new[0])
+    print(f"\nscoring picks a different category for {changed / args.emails:.1%} of emails")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Scan an inbox caught in an outage storm, where hundreds of users report the same
+"site is down / 502" problem in their own words (some as replies in a shared
+thread) among unrelated bug reports, with and without near-duplicate clustering.
+
+Reports how many tickets were classified and forwarded, the scan time, how many
+incidents the storm collapsed into, and how many unrelated reports were wrongly
+folded into another ticket.
+
+    python benchmarks/bench_clustering.py --reports 200 --storm 500 --similarity 0.5 --latency-ms 10
+"""
+import os
+import sys
+import time
+import random
+import base64
+import logging
+import argparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.agent import TicketRoutingAgent
+from src.rate_limiter import TokenBucket
+from benchmarks.fake_gmail import FakeGmailService, make_message
+
+logging.getLogger('ticket_routing_agent').setLevel(logging.WARNING)
+
+STORM_SUBJECTS = [
+    "Site is down - 502 bad gateway",
+    "site down, getting 502 bad gateway",
+    "URGENT: site is down (502 bad gateway)",
+    "502 bad gateway - the site is down",
+    "Is the site down? 502 bad gateway error",
+]
+
+STORM_BODIES = [
+    "Hi, the site is down for me. Every page returns 502 bad gateway since {time}. Order {order} is stuck.",
+    "Since {time} the site is down and I only get a 502 bad gateway error page, order {order} failed.",
+    "The site is down, every page shows 502 bad gateway. Tried again at {time}, still 502. Order {order}.",
+    "Getting a 502 bad gateway error, the site is down for our whole team since {time}. Order {order}.",
+]
+
+# Words for unrelated bug reports, so that no two of them read alike
+FEATURES = [
+    "export", "invoice", "search", "profile", "avatar", "calendar", "report", "upload", "coupon",
+    "wishlist", "language", "timezone", "password", "billing", "webhook", "sitemap", "filter",
+    "sorting", "pagination", "tooltip", "notification", "signature", "captcha", "receipt",
+]
+PLACES = [
+    "settings page", "admin panel", "android app", "ios app", "checkout", "landing page",
+    "help center", "partner portal", "reports tab", "team workspace", "mobile view", "inbox",
+]
+SYMPTOMS = [
+    "shows the wrong totals", "throws an error", "is broken", "hangs forever", "loses my changes",
+    "crashes with an error", "renders blank", "sends duplicates", "ignores the filter",
+    "shows stale data", "logs me out", "rejects valid input",
+]
+
+
+def pseudo_word(rng):
+    return "".join(rng.choice("bcdfghklmnprstvz") + rng.choice("aeiou") for _ in range(3))
+
+
+def message(index, subject, body, thread_id, sender):
+    msg = make_message(index)
+    msg['threadId'] = thread_id
+    msg['snippet'] = body[:100]
+    headers = msg['payload']['headers']
+    headers[0]['value'] = subject
+    headers[1]['value'] = sender
+    msg['payload']['body'] = {'data': base64.urlsafe_b64encode(body.encode()).decode()}
+    return msg
+
+
+def make_storm_inbox(reports, storm, seed=3):
+    """Unrelated bug reports and a storm of outage reports, shuffled together."""
+    rng = random.Random(seed)
+    mail = []
+    for i in range(reports):
+        feature, place, symptom = rng.choice(FEATURES), rng.choice(PLACES), rng.choice(SYMPTOMS)
+        # Each reporter describes their own data and steps
+        details = " ".join(pseudo_word(rng) for _ in range(8))
+        mail.append(('report', f"Bug: {feature} {symptom} on the {place}",
+                     f"When I use {feature} on the {place} it {symptom}. Steps: {details}.", f"t-report-{i}"))
+    for i in range(storm):
+        in_thread = rng.random() < 0.25
+        subject = f"Re: {STORM_SUBJECTS[0]}" if in_thread else rng.choice(STORM_SUBJECTS)
+        body = rng.choice(STORM_BODIES).format(time=f"{rng.randint(8, 11)}:{rng.randint(0, 59):02d}",
+                                               order=rng.randint(10000, 99999))
+        mail.append(('storm', subject, body, 't-storm' if in_thread else f"t-storm-{i}"))
+    rng.shuffle(mail)
+
+    kinds = {}
+    inbox = []
+    for index, (kind, subject, body, thread_id) in enumerate(mail):
+        inbox.append(message(index, subject, body, thread_id, f"user{index}@example.com"))
+        kinds[inbox[-1]['id']] = kind
+    return inbox, kinds
+
+
+def run(inbox, kinds, cluster, similarity, latency):
+    agent = TicketRoutingAgent(cluster=cluster, cluster_similarity=similarity)
+    service = FakeGmailService(inbox, latency=latency)
+    handler = agent.gmail_handler
+    handler.service = service
+    handler.authenticate = lambda: True
+    handler.send_limiter = TokenBucket(1e12, 1e12)
+
+    classified = [0]
+    summarize_ticket = agent.ticket_analyzer.summarize_ticket
+
+    def counting(email):
+        classified[0] += 1
+        return summarize_ticket(email)
+
+    agent.ticket_analyzer.summarize_ticket = counting
+
+    start = time.perf_counter()
+    tickets = agent.scan_gmail()
+    elapsed = time.perf_counter() - start
+
+    storm_incidents = sum(1 for ticket in tickets if kinds[ticket.id] == 'storm')
+    # Reports folded into a ticket of the other kind, or two unrelated reports merged
+    wrong = sum(
+        1 for ticket in tickets for duplicate in ticket.duplicate_ids
+        if kinds[duplicate] != kinds[ticket.id] or kinds[ticket.id] == 'report'
+    )
+    largest = max((ticket.reporter_count for ticket in tickets), default=0)
+    return {
+        'classified': classified[0], 'forwarded': len(service.sent), 'seconds': elapsed,
+        'storm_incidents': storm_incidents, 'wrong': wrong, 'largest': largest,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Near-duplicate clustering benchmark')
+    parser.add_argument('--reports', type=int, default=200, help='Unrelated bug reports')
+    parser.add_argument('--storm', type=int, default=500, help='Reports of the same outage')
+    parser.add_argument('--similarity', type=float, default=0.5, help='Clustering similarity threshold')
+    parser.add_argument('--latency-ms', type=float, default=10.0, help='Simulated latency per Gmail round trip')
+    args = parser.parse_args()
+
+    inbox, kinds = make_storm_inbox(args.reports, args.storm)
+    print(f"{args.reports} unrelated bug reports and {args.storm} reports of one outage, "
+          f"similarity threshold {args.similarity}, {args.latency_ms:.0f} ms per round trip")
+    print(f"{'mode':<12}{'classified':>11}{'forwarded':>11}{'seconds':>9}"
+          f"{'storm tickets':>15}{'largest':>9}{'wrong merges':>14}")
+    for cluster in (False, True):
+        result = run(inbox, kinds, cluster, args.similarity, args.latency_ms / 1000)
+        print(f"{'clustered' if cluster else 'per report':<12}{result['classified']:>11}{result['forwarded']:>11}"
+              f"{result['seconds']:>9.2f}{result['storm_incidents']:>15}{result['largest']:>9}{result['wrong']:>14}")
+
+
+if __name__ == "__main__":
+    main()
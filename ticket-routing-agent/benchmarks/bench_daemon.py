@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Run the scan daemon against the fake Gmail service while a local stub plays
+Cloud Pub/Sub: it delivers bursts of mail and posts one push notification per
+message. Reports notification-to-scanned latency, how many scans each burst
+cost, and the startup a cron-style run would pay on every invocation instead.
+
+    python benchmarks/bench_daemon.py --bursts 5 --burst-size 20 --latency-ms 20
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import tempfile
+import threading
+import subprocess
+import urllib.request
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.agent import TicketRoutingAgent
+from src.daemon import ScanDaemon, pubsub_envelope
+from src.rate_limiter import TokenBucket
+from benchmarks.fake_gmail import FakeGmailService, make_inbox
+
+logging.getLogger('ticket_routing_agent').setLevel(logging.WARNING)
+
+
+def cold_start_seconds(repeat=3):
+    """Interpreter start, imports and agent construction, as a cron run pays before scanning."""
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    code = "from src.agent import TicketRoutingAgent; TicketRoutingAgent()"
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], cwd=root, check=True, capture_output=True)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def post(url, body):
+    request = urllib.request.Request(url, data=json.dumps(body).encode(), method='POST',
+                                     headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request) as response:
+        return response.status
+
+
+def push_stub(daemon, service, scanned, new_mail, bursts, burst_size, burst_gap, results):
+    """Deliver mail in bursts with a push notification per message, then stop the daemon."""
+    while daemon.server is None or not scanned:
+        time.sleep(0.01)
+    url = f"http://127.0.0.1:{daemon.server.server_address[1]}/"
+    expected = scanned[-1][1]
+
+    try:
+        for burst in range(bursts):
+            scans_before = len(scanned)
+            first_post = time.monotonic()
+            for message in new_mail[burst * burst_size:(burst + 1) * burst_size]:
+                service.add_message(message)
+                post(url, pubsub_envelope('support@example.com', str(service.history_id)))
+            last_post = time.monotonic()
+            expected += burst_size
+
+            while scanned[-1][1] < expected:
+                time.sleep(0.001)
+            done = scanned[-1][0]
+            results.append({
+                'notifications': burst_size,
+                'scans': len(scanned) - scans_before,
+                'first_post_ms': (done - first_post) * 1000,
+                'last_post_ms': (done - last_post) * 1000,
+            })
+            time.sleep(burst_gap)
+    finally:
+        daemon.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Daemon push/poll benchmark')
+    parser.add_argument('--messages', type=int, default=2000, help='Messages in the inbox at startup')
+    parser.add_argument('--bursts', type=int, default=5, help='Bursts of new mail to deliver')
+    parser.add_argument('--burst-size', type=int, default=20, help='Messages (and notifications) per burst')
+    parser.add_argument('--burst-gap', type=float, default=0.5, help='Seconds between bursts')
+    parser.add_argument('--debounce', type=float, default=0.1, help='Push debounce in seconds')
+    parser.add_argument('--interval', type=float, default=60.0, help='Scheduled scan interval in seconds')
+    parser.add_argument('--latency-ms', type=float, default=20.0, help='Simulated latency per round trip')
+    args = parser.parse_args()
+
+    mail = make_inbox(args.messages + args.bursts * args.burst_size)
+    service = FakeGmailService(mail[:args.messages], latency=args.latency_ms / 1000)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        agent = TicketRoutingAgent(incremental=True, checkpoint_path=os.path.join(tmp, 'checkpoint.db'))
+        handler = agent.gmail_handler
+        handler.service = service
+        handler.authenticate = lambda: True
+        handler.send_limiter = TokenBucket(1e12, 1e12)
+
+        scanned = []  # (finished at, messages scanned so far) per scan
+        total = [0]
+
+        def on_scan(agent):
+            total[0] += len(agent.inbox)
+            scanned.append((time.monotonic(), total[0]))
+
+        daemon = ScanDaemon(agent, interval=args.interval, push_port=0, push_debounce=args.debounce, on_scan=on_scan)
+        results = []
+        stub = threading.Thread(target=push_stub, args=(
+            daemon, service, scanned, mail[args.messages:], args.bursts, args.burst_size, args.burst_gap, results
+        ))
+        stub.start()
+        start = time.monotonic()
+        daemon.run()
+        stub.join()
+
+    print(f"{args.messages} messages at startup, {args.bursts} bursts of {args.burst_size}, "
+          f"{args.latency_ms:.0f} ms per round trip, {args.debounce * 1000:.0f} ms debounce")
+    print(f"Initial full scan {scanned[0][0] - start:.2f} s; {daemon.scans} scan(s) in all "
+          f"for {daemon.notifications} notification(s)")
+    print(f"{'burst':>6}{'notifications':>15}{'scans':>7}{'first post -> scanned':>24}{'last post -> scanned':>23}")
+    for number, result in enumerate(results, start=1):
+        print(f"{number:>6}{result['notifications']:>15}{result['scans']:>7}"
+              f"{result['first_post_ms']:>21.0f} ms{result['last_post_ms']:>20.0f} ms")
+    print(f"\nA cron run pays {cold_start_seconds() * 1000:.0f} ms of interpreter start and imports per scan "
+          f"before OAuth and discovery, which the daemon pays once")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Run TicketRoutingAgent.scan_gmail end to end against the fake Gmail service at
+several inbox sizes, reporting per-stage time, API calls, peak memory and tickets/s.
+
+Results are saved as JSON under benchmarks/results/ and can be compared with an earlier run:
+
+    python benchmarks/bench_e2e.py --sizes 1000 10000 100000
+    python benchmarks/bench_e2e.py --sizes 1000 10000 --compare benchmarks/results/e2e-20240101-120000.json
+    python benchmarks/bench_e2e.py --fixtures my_inbox.mbox --sizes 5000
+
+Stages run interleaved as the inbox streams, so each stage's time is the total
+spent in its calls; 'other' is listing, generator overhead and fake API time.
+Forwards are sent on the scheduler's worker threads, urgent ones while the inbox
+is still being classified, so 'forward' is send time summed over the workers and
+can overlap the other stages.
+Memory tracing slows the scan several times over; use --no-memory for timing runs.
+"""
+import os
+import sys
+import json
+import logging
+import time
+import argparse
+import platform
+import threading
+import subprocess
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.agent import TicketRoutingAgent
+from src.rate_limiter import TokenBucket
+from benchmarks.fake_gmail import FakeGmailService, make_inbox, load_fixtures, replicate
+
+logging.getLogger('ticket_routing_agent').setLevel(logging.WARNING)
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+
+
+class StageTimer:
+    """
+    Wraps methods on an object to total the calls and time spent in each pipeline stage.
+
+    A call made from inside another call of the same stage on the same thread (a
+    digest's sends, say) is not counted again. Totals are kept under a lock, since
+    sends are timed on several threads at once.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.lock = threading.Lock()
+        self.active = threading.local()
+
+    def wrap(self, obj, name, stage):
+        method = getattr(obj, name)
+        stats = self.stages.setdefault(stage, {'calls': 0, 'seconds': 0.0})
+
+        def timed(*args, **kwargs):
+            active = self.active.__dict__.setdefault('stages', set())
+            if stage in active:
+                return method(*args, **kwargs)
+            active.add(stage)
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                active.discard(stage)
+                with self.lock:
+                    stats['calls'] += 1
+                    stats['seconds'] += time.perf_counter() - start
+
+        setattr(obj, name, timed)
+
+
+def build_agent(service, options):
+    agent = TicketRoutingAgent(**options)
+    handler = agent.gmail_handler
+    handler.service = service
+    handler.authenticate = lambda: True
+    # Measure the pipeline, not Gmail's send quota
+    handler.send_limiter = TokenBucket(1e12, 1e12)
+
+    timer = StageTimer()
+    timer.wrap(handler, 'get_messages', 'fetch')
+    timer.wrap(handler, 'extract_ticket_content', 'extract')
+    timer.wrap(handler, 'is_ticket', 'filter')
+    timer.wrap(handler, 'extract_issue_summary', 'summarize')
+    timer.wrap(agent.ticket_analyzer, 'summarize_ticket', 'classify')
+    timer.wrap(agent.ticket_analyzer, 'generate_ticket_report', 'report')
+    # The forward scheduler sends each ticket with forward_email; digests are sent together
+    timer.wrap(handler, 'forward_email', 'forward')
+    timer.wrap(handler, 'forward_digest', 'forward')
+    if agent.checkpoint:
+        timer.wrap(agent.checkpoint, 'record_scan', 'checkpoint')
+    return agent, timer
+
+
+def run(inbox, latency, options, trace_memory):
+    service = FakeGmailService(inbox, latency=latency)
+    agent, timer = build_agent(service, options)
+
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    tickets = agent.scan_gmail()
+    elapsed = time.perf_counter() - start
+    peak = None
+    if trace_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    stages = dict(timer.stages)
+    stages['other'] = {'calls': 0, 'seconds': max(0.0, elapsed - sum(s['seconds'] for s in stages.values()))}
+    result = {
+        'messages': len(inbox),
+        'tickets': len(tickets),
+        'seconds': elapsed,
+        'tickets_per_second': len(tickets) / elapsed if elapsed else 0.0,
+        'messages_per_second': len(inbox) / elapsed if elapsed else 0.0,
+        'peak_memory_mb': peak / 1e6 if peak is not None else None,
+        'round_trips': service.round_trips,
+        'api_calls': dict(service.calls),
+        'mb_received': service.bytes_received / 1e6,
+        'stages': stages,
+    }
+    if agent.metrics.enabled:
+        result['metrics'] = agent.metrics.to_dict()
+    return result
+
+
+def print_run(result):
+    peak = f"{result['peak_memory_mb']:.1f} MB" if result['peak_memory_mb'] is not None else 'not traced'
+    print(f"\n{result['messages']} messages -> {result['tickets']} tickets in {result['seconds']:.2f} s "
+          f"({result['tickets_per_second']:.0f} tickets/s, {result['messages_per_second']:.0f} messages/s), "
+          f"peak {peak}")
+    print(f"  API: {result['round_trips']} round trips, {result['mb_received']:.1f} MB received, "
+          + ', '.join(f"{method} {count}" for method, count in sorted(result['api_calls'].items())))
+    for stage, stats in result['stages'].items():
+        share = stats['seconds'] / result['seconds'] if result['seconds'] else 0.0
+        print(f"  {stage:<10}{stats['seconds']:>9.3f} s {share:>6.1%}{stats['calls']:>10} calls")
+
+
+def compare(results, previous_path):
+    with open(previous_path) as f:
+        previous = {run['messages']: run for run in json.load(f)['runs']}
+
+    print(f"\nCompared with {previous_path} ({', '.join(str(size) for size in sorted(previous))} messages):")
+    print(f"{'messages':>10}{'seconds':>18}{'tickets/s':>18}{'peak MB':>18}")
+    for result in results:
+        before = previous.get(result['messages'])
+        if before is None:
+            continue
+        row = f"{result['messages']:>10}"
+        for key in ('seconds', 'tickets_per_second', 'peak_memory_mb'):
+            old, new = before.get(key), result.get(key)
+            row += f"{old:>8.1f} -> {new:<6.1f}" if old and new is not None else f"{'n/a':>18}"
+        print(row)
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(__file__)
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='End-to-end scan benchmark')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000], help='Inbox sizes to scan')
+    parser.add_argument('--fixtures', type=str, help='JSON or mbox messages to replicate instead of generated mail')
+    parser.add_argument('--ticket-share', type=float, default=0.1, help='Share of bug reports in generated mail')
+    parser.add_argument('--long-share', type=float, default=0.02, help='Share of long newsletters in generated mail')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Simulated latency per round trip')
+    parser.add_argument('--scoring', action='store_true', help='Scan with --scoring')
+    parser.add_argument('--prefilter', action='store_true', help='Scan with --prefilter')
+    parser.add_argument('--search', action='store_true', help='Scan with --search')
+    parser.add_argument('--send-workers', type=int, default=1, help='Scan with --send-workers')
+    parser.add_argument('--metrics', action='store_true', help='Scan with metrics on and save their report with each run')
+    parser.add_argument('--no-memory', action='store_true', help='Skip tracemalloc peak memory tracking')
+    parser.add_argument('--output', type=str, help='Results file (default: benchmarks/results/e2e-<time>.json)')
+    parser.add_argument('--compare', type=str, help='Earlier results file to compare with')
+    args = parser.parse_args()
+
+    options = {
+        'scoring': args.scoring,
+        'prefilter': args.prefilter,
+        'search': args.search,
+        'send_workers': args.send_workers,
+        'metrics': args.metrics,
+    }
+    fixtures = load_fixtures(args.fixtures) if args.fixtures else None
+
+    results = []
+    for size in args.sizes:
+        if fixtures:
+            inbox = replicate(fixtures, size)
+        else:
+            inbox = make_inbox(size, args.ticket_share, args.long_share)
+        result = run(inbox, args.latency_ms / 1000, options, trace_memory=not args.no_memory)
+        print_run(result)
+        results.append(result)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"e2e-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'options': {**options, **{key: getattr(args, key) for key in (
+                'fixtures', 'ticket_share', 'long_share', 'latency_ms', 'no_memory'
+            )}},
+            'runs': results,
+        }, f, indent=2)
+    print(f"\nSaved results to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Compare serial and concurrent forwarding against the fake Gmail service.
+
+    python benchmarks/bench_forwarding.py --tickets 100 --workers 8 --latency-ms 100
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.gmail_handler import GmailHandler
+from src.ticket_analyzer import TicketAnalyzer
+from benchmarks.fake_gmail import FakeGmailService, make_message
+
+
+def run(tickets, workers, latency, send_rate, send_errors):
+    service = FakeGmailService([], latency=latency, send_errors=send_errors)
+    handler = GmailHandler(send_workers=workers, send_rate=send_rate, send_burst=workers)
+    handler.service = service
+    handler.retry_base_delay = 0.01
+
+    start = time.perf_counter()
+    statuses = handler.forward_classified_emails(tickets)
+    elapsed = time.perf_counter() - start
+
+    failed = sum(1 for status in statuses if '✗' in status)
+    return len(statuses), failed, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Concurrent forwarding benchmark')
+    parser.add_argument('--tickets', type=int, default=100, help='Tickets to forward')
+    parser.add_argument('--workers', type=int, default=8, help='Concurrent senders')
+    parser.add_argument('--latency-ms', type=float, default=100.0, help='Simulated latency per send')
+    parser.add_argument('--send-rate', type=float, default=1000.0,
+                        help='Token bucket rate; use 2.5 to see the Gmail quota cap')
+    parser.add_argument('--transient-errors', type=int, default=4, help='Sends answered with 429 first')
+    args = parser.parse_args()
+
+    analyzer = TicketAnalyzer()
+    extractor = GmailHandler()
+    emails = [
+        analyzer.summarize_ticket(extractor.extract_ticket_content(make_message(i)))
+        for i in range(args.tickets)
+    ]
+
+    latency = args.latency_ms / 1000
+    print(f"{args.tickets} tickets, {args.latency_ms:.0f} ms per send, {args.transient_errors} transient 429s")
+    print(f"{'mode':<14}{'sends':>8}{'failed':>8}{'wall time (s)':>16}")
+    for label, workers in (('serial', 1), (f'{args.workers} workers', args.workers)):
+        sends, failed, elapsed = run(emails, workers, latency, args.send_rate, [429] * args.transient_errors)
+        print(f"{label:<14}{sends:>8}{failed:>8}{elapsed:>16.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Count model calls and time for LLM-only versus hybrid classification, on a
+first scan and a re-scan of the same inbox, using the stub model.
+
+    python benchmarks/bench_hybrid.py --emails 2000 --latency-ms 50
+"""
+import os
+import sys
+import time
+import tempfile
+import argparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.gmail_handler import GmailHandler
+from src.ticket_analyzer import TicketAnalyzer
+from src.llm_classifier import HybridClassifier, VerdictCache
+from benchmarks.fake_gmail import make_message
+from benchmarks.stub_model import StubModel
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Hybrid LLM classification benchmark')
+    parser.add_argument('--emails', type=int, default=2000, help='Ticket emails per scan')
+    parser.add_argument('--latency-ms', type=float, default=50.0, help='Simulated model latency')
+    parser.add_argument('--threshold', type=float, default=0.6, help='Keyword confidence threshold')
+    args = parser.parse_args()
+
+    handler = GmailHandler()
+    analyzer = TicketAnalyzer(scoring=True)
+    emails = [handler.extract_ticket_content(make_message(i)) for i in range(args.emails)]
+    for i, email in enumerate(emails):
+        # Every content appears twice, like a report sent to two support addresses
+        email['body_text'] += f" (ref {i // 2})"
+
+    print(f"{args.emails} tickets per scan, {args.latency_ms:.0f} ms per model call")
+    print(f"{'mode':<12}{'scan':<10}{'model calls':>12}{'time (s)':>10}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, threshold, cached in (('llm only', 1.01, False), ('hybrid', args.threshold, True)):
+            model = StubModel(latency=args.latency_ms / 1000)
+            cache = VerdictCache(os.path.join(tmp, f"{label}.db")) if cached else None
+            classifier = HybridClassifier(analyzer, model, cache, confidence_threshold=threshold, batch_size=1)
+
+            for scan in ('first', 'rescan'):
+                calls_before = model.calls
+                start = time.perf_counter()
+                tickets = analyzer.summarize_tickets(emails)
+                if cached:
+                    classifier.classify_tickets(tickets)
+                else:
+                    for ticket in tickets:
+                        classifier.classify_ticket(ticket)
+                elapsed = time.perf_counter() - start
+                print(f"{label:<12}{scan:<10}{model.calls - calls_before:>12}{elapsed:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
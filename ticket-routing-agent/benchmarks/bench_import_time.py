@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Measure CLI startup and agent construction time in fresh interpreters.
+
+    python benchmarks/bench_import_time.py --runs 5
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+CONSTRUCT = (
+    "import sys; sys.path.insert(0, '.'); "
+    "from src.agent import TicketRoutingAgent; TicketRoutingAgent(); "
+    "heavy = [m for m in ('strands', 'boto3', 'googleapiclient', 'httplib2') if m in sys.modules]; "
+    "print(','.join(heavy) or 'none')"
+)
+
+CASES = [
+    ('run.py --help', [sys.executable, 'run.py', '--help']),
+    ('construct TicketRoutingAgent', [sys.executable, '-c', CONSTRUCT]),
+    ('import strands (deferred cost)', [sys.executable, '-c', 'import strands.models']),
+    ('interpreter baseline', [sys.executable, '-c', 'pass']),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Startup time benchmark')
+    parser.add_argument('--runs', type=int, default=5, help='Runs per case; the median is reported')
+    args = parser.parse_args()
+
+    print(f"{'case':<34}{'median (s)':>12}")
+    for label, command in CASES:
+        timings = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            result = subprocess.run(command, cwd=ROOT, capture_output=True, text=True, check=True)
+            timings.append(time.perf_counter() - start)
+        print(f"{label:<34}{statistics.median(timings):>12.3f}")
+        if command[1] == '-c' and command[2] is CONSTRUCT:
+            print(f"{'  heavy modules loaded':<34}{result.stdout.strip():>12}")
+
+
+if __name__ == "__main__":
+    main()
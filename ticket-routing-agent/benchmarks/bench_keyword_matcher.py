@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Compare the per-keyword substring loops with the single-pass KeywordMatcher
+on a synthetic corpus: ticket detection, classification and urgency per email.
+
+    python benchmarks/bench_keyword_matcher.py --emails 100000
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.gmail_handler import GmailHandler
+from src.ticket_analyzer import TicketAnalyzer, URGENT_LABEL
+from src.keyword_matcher import KeywordMatcher
+from benchmarks.fake_gmail import FILLER
+
+
+
+def make_corpus(size, seed=7):
+    rng = random.Random(seed)
+    keywords = ["button", "api", "database", "502", "timeout", "server", "urgent", "bug", "not working"]
+    corpus = []
+    for _ in range(size):
+        words = [rng.choice(FILLER) for _ in range(rng.randint(40, 160))]
+        for _ in range(rng.randint(0, 3)):
+            words.insert(rng.randrange(len(words)), rng.choice(keywords))
+        corpus.append((" ".join(words[:8]).capitalize(), " ".join(words[8:])))
+    return corpus
+
+
+def legacy(handler, analyzer, subject, body):
+    """The loops the matcher replaced."""
+    body_text, subject_text = body.lower(), subject.lower()
+    is_ticket = any(q.lower() in subject_text or q.lower() in body_text for q in handler.ticket_queries)
+
+    text = f"{subject} {body}".lower()
+    category = "Cross-Functional"
+    for name, keywords in analyzer.issue_categories.items():
+        if any(keyword in text for keyword in keywords):
+            category = name.title()
+            break
+
+    is_urgent = any(word in text for word in analyzer.urgent_keywords)
+    return is_ticket, category, is_urgent
+
+
+def matched(handler, analyzer, subject, body):
+    is_ticket = handler.is_ticket({'subject': subject, 'body_text': body})
+    labels = analyzer.matcher.labels(f"{subject} {body}")
+    return is_ticket, analyzer._category_from_labels(labels), URGENT_LABEL in labels
+
+
+def timed(fn, handler, analyzer, corpus):
+    start = time.perf_counter()
+    results = [fn(handler, analyzer, subject, body) for subject, body in corpus]
+    return results, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Keyword matcher benchmark')
+    parser.add_argument('--emails', type=int, default=100000, help='Synthetic emails to scan')
+    parser.add_argument('--extra-keywords', type=int, default=0,
+                        help='Synthetic keywords added to every category, to show scaling')
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.emails)
+    handler = GmailHandler()
+    analyzer = TicketAnalyzer()
+
+    rng = random.Random(11)
+    for keywords in analyzer.issue_categories.values():
+        keywords.extend(
+            "".join(rng.choice("bcdfghjklmnpqrstvwxz") for _ in range(rng.randint(6, 10)))
+            for _ in range(args.extra_keywords)
+        )
+    keyword_count = sum(len(keywords) for keywords in analyzer.issue_categories.values())
+
+    baseline, baseline_time = timed(legacy, handler, analyzer, corpus)
+    print(f"{args.emails} emails, {keyword_count} category keywords")
+    print(f"{'implementation':<22}{'time (s)':>10}{'emails/s':>12}{'speedup':>9}")
+    print(f"{'substring loops':<22}{baseline_time:>10.3f}{args.emails / baseline_time:>12.0f}{1:>9.2f}")
+
+    variants = [('matcher (regex)', False)]
+    if handler.ticket_matcher._automaton is not None:
+        variants.insert(0, ('matcher (automaton)', True))
+
+    for label, use_automaton in variants:
+        handler.ticket_matcher = KeywordMatcher({'ticket': handler.ticket_queries}, use_automaton)
+        analyzer.matcher = KeywordMatcher(
+            {**analyzer.issue_categories, URGENT_LABEL: analyzer.urgent_keywords}, use_automaton
+        )
+        results, elapsed = timed(matched, handler, analyzer, corpus)
+        assert results == baseline, f"{label} disagrees with the substring loops"
+        print(f"{label:<22}{elapsed:>10.3f}{args.emails / elapsed:>12.0f}{baseline_time / elapsed:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
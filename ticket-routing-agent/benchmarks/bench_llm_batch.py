@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Measure batched, concurrent LLM analysis of ambiguous tickets with the stub model.
+
+    python benchmarks/bench_llm_batch.py --tickets 500 --latency-ms 200
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.ticket_analyzer import TicketAnalyzer
+from src.llm_classifier import HybridClassifier
+from benchmarks.stub_model import StubModel
+
+TOPICS = [
+    "the export sometimes hangs and then the report is empty",
+    "customers in one region see odd behaviour after login",
+    "something is off with the numbers shown in the summary view",
+    "the nightly job finished but the results look wrong",
+]
+
+
+def make_tickets(size):
+    # Distinct, keyword-poor tickets: all of them are ambiguous and none are duplicates
+    return [
+        {'id': f"t{i}", 'subject': f"Question #{i}", 'body': f"Hi, {TOPICS[i % len(TOPICS)]} (ref {i}).", 'confidence': 0.0}
+        for i in range(size)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Batched LLM analysis benchmark')
+    parser.add_argument('--tickets', type=int, default=500, help='Ambiguous tickets to analyze')
+    parser.add_argument('--latency-ms', type=float, default=200.0, help='Simulated model latency per call')
+    parser.add_argument('--max-batch', type=int, default=16,
+                        help='Stub answers larger batches with truncated JSON, forcing splits')
+    args = parser.parse_args()
+
+    analyzer = TicketAnalyzer()
+    tickets = make_tickets(args.tickets)
+
+    print(f"{args.tickets} ambiguous tickets, {args.latency_ms:.0f} ms per call, stub truncates batches > {args.max_batch}")
+    print(f"{'batch':>6}{'in flight':>10}{'calls':>7}{'splits':>8}{'tickets/s':>11}{'tokens/ticket':>15}")
+    for batch_size, max_in_flight in ((1, 1), (1, 8), (10, 1), (10, 8), (25, 8)):
+        model = StubModel(latency=args.latency_ms / 1000, max_batch=args.max_batch)
+        classifier = HybridClassifier(analyzer, model, batch_size=batch_size, max_in_flight=max_in_flight)
+
+        start = time.perf_counter()
+        verdicts = classifier.analyze_batch(tickets)
+        elapsed = time.perf_counter() - start
+
+        assert all(verdict is not None for verdict in verdicts)
+        print(f"{batch_size:>6}{max_in_flight:>10}{model.calls:>7}{classifier.stats['batch_splits']:>8}"
+              f"{len(tickets) / elapsed:>11.1f}{model.tokens() / len(tickets):>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
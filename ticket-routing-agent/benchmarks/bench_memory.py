@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Compare the memory held by extracted emails and ticket summaries as per-message
+dicts (with the HTML body kept) and as slotted EmailRecord/Ticket records.
+
+Like scan_gmail, every ticket email and its summary stay referenced until the run ends.
+
+    python benchmarks/bench_memory.py --emails 50000
+"""
+import os
+import sys
+import time
+import base64
+import argparse
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.gmail_handler import GmailHandler
+from src.ticket_analyzer import TicketAnalyzer
+from benchmarks.fake_gmail import make_multipart_message
+
+
+def legacy_extract(message):
+    """The nine-key dict extract_ticket_content used to build, HTML body included."""
+    headers = {header['name']: header['value'] for header in message['payload']['headers']}
+    email_data = {
+        'id': message['id'],
+        'thread_id': message['threadId'],
+        'subject': headers.get('Subject', ''),
+        'from': headers.get('From', ''),
+        'to': headers.get('To', ''),
+        'date': headers.get('Date', ''),
+        'timestamp': int(message['internalDate']) / 1000,
+        'body_text': '',
+        'body_html': ''
+    }
+    for part in message['payload']['parts']:
+        if part['mimeType'] == 'text/plain':
+            email_data['body_text'] = base64.urlsafe_b64decode(part['body']['data']).decode('utf-8')
+        elif part['mimeType'] == 'text/html':
+            email_data['body_html'] = base64.urlsafe_b64decode(part['body']['data']).decode('utf-8')
+    return email_data
+
+
+def legacy_summarize(analyzer, email):
+    """The per-ticket dict summarize_ticket used to build."""
+    subject = email.get('subject', '')
+    body = email.get('body_text', '')
+    labels = analyzer.matcher.labels(f"{subject} {body}")
+    category = analyzer._category_from_labels(labels)
+    return {
+        'id': email.get('id'),
+        'subject': subject,
+        'category': category,
+        'is_urgent': 'urgent' in labels,
+        'timestamp': datetime.fromtimestamp(email.get('timestamp', 0)),
+        'from': email.get('from'),
+        'forward_to': analyzer.classify_department(category),
+        'body': body,
+    }
+
+
+def measure(extract, summarize, messages):
+    tracemalloc.start()
+    start = time.perf_counter()
+
+    emails = []
+    for message in messages:
+        email = extract(message)
+        email['summary'] = None
+        emails.append(email)
+    tickets = [summarize(email) for email in emails]
+
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(tickets), current, peak, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Email and ticket record memory benchmark')
+    parser.add_argument('--emails', type=int, default=50000, help='Synthetic multipart emails to hold')
+    args = parser.parse_args()
+
+    # Raw API responses are built up front and not counted; only what extraction keeps is
+    messages = [make_multipart_message(i) for i in range(args.emails)]
+    handler = GmailHandler()
+    analyzer = TicketAnalyzer()
+
+    runs = [
+        ('dicts + HTML', legacy_extract, lambda email: legacy_summarize(analyzer, email)),
+        ('slotted records', handler.extract_ticket_content, analyzer.summarize_ticket),
+    ]
+
+    print(f"{args.emails} emails, every one held as an email and a ticket\n")
+    print(f"{'representation':<18}{'retained MB':>13}{'peak MB':>10}{'bytes/email':>13}{'seconds':>10}")
+    baseline = None
+    for name, extract, summarize in runs:
+        count, current, peak, elapsed = measure(extract, summarize, messages)
+        baseline = baseline or current
+        print(
+            f"{name:<18}{current / 1e6:>13.1f}{peak / 1e6:>10.1f}{current / count:>13.0f}{elapsed:>10.2f}"
+            f"   ({current / baseline:.0%} of dicts)"
+        )
+
+
+if __name__ == '__main__':
+    main()
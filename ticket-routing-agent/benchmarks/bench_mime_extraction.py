@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Compare body extraction throughput of the old top-level-parts code and MimeExtractor,
+with and without an early stop, over the Gmail payload fixtures.
+
+    python benchmarks/bench_mime_extraction.py --repeat 200 --max-body-chars 2000
+"""
+import os
+import sys
+import json
+import time
+import base64
+import argparse
+
+import html2text
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.mime_extractor import MimeExtractor
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures', 'gmail_payloads.json')
+
+
+def legacy_body_text(payload):
+    """The body handling extract_ticket_content used to do."""
+    body_text = ''
+    body_html = ''
+    if 'parts' in payload:
+        for part in payload['parts']:
+            if part['mimeType'] == 'text/plain':
+                if 'data' in part['body']:
+                    body_text = base64.urlsafe_b64decode(part['body']['data']).decode('utf-8')
+            elif part['mimeType'] == 'text/html':
+                if 'data' in part['body']:
+                    body_html = base64.urlsafe_b64decode(part['body']['data']).decode('utf-8')
+    elif 'body' in payload and 'data' in payload['body']:
+        decoded_data = base64.urlsafe_b64decode(payload['body']['data']).decode('utf-8')
+        if payload['mimeType'] == 'text/plain':
+            body_text = decoded_data
+        elif payload['mimeType'] == 'text/html':
+            body_html = decoded_data
+    if not body_text and body_html:
+        h = html2text.HTML2Text()
+        h.ignore_links = False
+        body_text = h.handle(body_html)
+    return body_text
+
+
+def timed(extract, payload, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        text = extract(payload)
+    return text, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='MIME body extraction benchmark')
+    parser.add_argument('--repeat', type=int, default=200, help='Extractions per fixture and mode')
+    parser.add_argument('--max-body-chars', type=int, default=2000, help='Early stop for the last mode')
+    args = parser.parse_args()
+
+    with open(FIXTURES) as f:
+        fixtures = json.load(f)
+
+    modes = [
+        ('old', legacy_body_text),
+        ('engine', MimeExtractor().body_text),
+        (f'engine {args.max_body_chars}', MimeExtractor(max_chars=args.max_body_chars).body_text),
+    ]
+    totals = {name: 0.0 for name, _ in modes}
+
+    print(f"{len(fixtures)} fixtures, {args.repeat} extractions each; messages/s (body characters)\n")
+    print(f"{'fixture':<22}" + ''.join(f"{name:>22}" for name, _ in modes))
+    for fixture, message in fixtures.items():
+        row = f"{fixture:<22}"
+        for name, extract in modes:
+            text, elapsed = timed(extract, message['payload'], args.repeat)
+            totals[name] += elapsed
+            row += f"{args.repeat / elapsed:>14.0f} ({len(text):>5})"
+        print(row)
+
+    count = len(fixtures) * args.repeat
+    print(f"{'all':<22}" + ''.join(f"{count / totals[name]:>14.0f}        " for name, _ in modes))
+
+
+if __name__ == '__main__':
+    main()
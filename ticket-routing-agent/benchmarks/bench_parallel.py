@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Scale extraction and classification across worker processes: scan a synthetic
+inbox with 1 (the serial pipeline), 2, 4 and 8 analysis workers and report
+scan time, messages per second and speedup over serial.
+
+Half of the multipart messages have their text/plain part removed, so their
+bodies go through html2text as mail from HTML-only senders does. Every parallel
+run is checked to produce the same tickets, in the same order, as the serial one.
+
+    python benchmarks/bench_parallel.py --messages 5000 --workers 1 2 4 8
+
+Worker start-up (interpreter, imports, analyzer state) is paid once per agent and
+is reported separately; a daemon pays it once for its lifetime.
+"""
+import os
+import sys
+import time
+import random
+import logging
+import argparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.agent import TicketRoutingAgent
+from src.rate_limiter import TokenBucket
+from benchmarks.fake_gmail import FakeGmailService, make_inbox
+
+logging.getLogger('ticket_routing_agent').setLevel(logging.WARNING)
+
+
+def make_corpus(size, html_only_share=0.5, seed=11):
+    rng = random.Random(seed)
+    inbox = make_inbox(size, ticket_share=0.3, long_share=0.05)
+    for message in inbox:
+        parts = message['payload'].get('parts')
+        if parts and parts[0]['mimeType'] == 'text/plain' and rng.random() < html_only_share:
+            del parts[0]
+    return inbox
+
+
+def run(inbox, workers):
+    agent = TicketRoutingAgent(analysis_workers=workers)
+    handler = agent.gmail_handler
+    handler.service = FakeGmailService(inbox)
+    handler.authenticate = lambda: True
+    handler.send_limiter = TokenBucket(1e12, 1e12)
+    agent.gmail_handler.forward_classified_emails = lambda tickets: []
+
+    startup = 0.0
+    if agent.parallel_analyzer:
+        start = time.perf_counter()
+        agent.parallel_analyzer.start()
+        startup = time.perf_counter() - start
+
+    start = time.perf_counter()
+    tickets = agent.scan_gmail()
+    elapsed = time.perf_counter() - start
+
+    chunk_size = agent.parallel_analyzer.chunk_size if agent.parallel_analyzer else None
+    if agent.parallel_analyzer:
+        agent.parallel_analyzer.close()
+    outcome = [(t.id, t.category, t.is_urgent, t.summary, t.body) for t in tickets]
+    return elapsed, startup, chunk_size, outcome
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Parallel analysis scaling benchmark')
+    parser.add_argument('--messages', type=int, default=5000, help='Messages in the synthetic inbox')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8], help='Worker counts to run')
+    args = parser.parse_args()
+
+    inbox = make_corpus(args.messages)
+    print(f"{args.messages} messages on {os.cpu_count()} CPU(s), forwarding skipped")
+    print(f"{'workers':>8}{'scan s':>9}{'msgs/s':>9}{'speedup':>9}{'startup s':>11}{'chunk':>7}")
+
+    baseline = expected = None
+    for workers in args.workers:
+        elapsed, startup, chunk_size, outcome = run(inbox, workers)
+        if expected is None:
+            baseline, expected = elapsed, outcome
+        assert outcome == expected, f"{workers} workers produced different tickets than {args.workers[0]}"
+        print(f"{workers:>8}{elapsed:>9.2f}{args.messages / elapsed:>9.0f}{baseline / elapsed:>8.2f}x"
+              f"{startup:>11.2f}{chunk_size or '-':>7}")
+
+
+if __name__ == "__main__":
+    main()
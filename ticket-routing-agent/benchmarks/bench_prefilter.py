@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Compare single-stage ticket filtering with the metadata/snippet prefilter against the fake Gmail service.
+
+The inbox mixes bug reports, short non-ticket mail and long newsletters, a few of which
+mention a ticket keyword only deep in the body.
+
+    python benchmarks/bench_prefilter.py --messages 2000 --ticket-share 0.1 --latency-ms 20
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.gmail_handler import GmailHandler
+from benchmarks.fake_gmail import FakeGmailService, make_inbox
+
+
+def run(inbox, latency, prefilter):
+    service = FakeGmailService(inbox, latency=latency)
+    handler = GmailHandler(prefilter=prefilter)
+    handler.service = service
+
+    start = time.perf_counter()
+    snapshot = handler.fetch_inbox()
+    tickets = handler.query_inbox_for_ticket(snapshot)
+    elapsed = time.perf_counter() - start
+
+    return [ticket['id'] for ticket in tickets], service, snapshot.report(), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Two-stage filtering benchmark')
+    parser.add_argument('--messages', type=int, default=2000, help='Messages in the fake inbox')
+    parser.add_argument('--ticket-share', type=float, default=0.1, help='Share of bug reports')
+    parser.add_argument('--long-share', type=float, default=0.2, help='Share of long newsletters')
+    parser.add_argument('--latency-ms', type=float, default=20.0, help='Simulated latency per round trip')
+    args = parser.parse_args()
+
+    inbox = make_inbox(args.messages, args.ticket_share, args.long_share)
+    latency = args.latency_ms / 1000
+
+    print(f"{args.messages} messages, {args.ticket_share:.0%} bug reports, {args.long_share:.0%} newsletters, "
+          f"{args.latency_ms:.0f} ms per round trip")
+    print(f"{'mode':<12}{'tickets':>9}{'round trips':>13}{'MB received':>13}{'time (s)':>10}   stage one")
+    found = None
+    for label, prefilter in (('full fetch', False), ('prefilter', True)):
+        ticket_ids, service, report, elapsed = run(inbox, latency, prefilter)
+        found = found or ticket_ids
+        assert ticket_ids == found, "the prefilter changed which tickets were found"
+        stage_one = ', '.join(f"{key[10:]} {value}" for key, value in report.items() if key.startswith('prefilter_'))
+        print(f"{label:<12}{len(ticket_ids):>9}{service.round_trips:>13}{service.bytes_received / 1e6:>13.2f}"
+              f"{elapsed:>10.2f}   {stage_one}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Measure how long urgent and routine tickets wait to be forwarded when a few
+critical outage reports arrive among hundreds of routine UI tickets.
+
+The messages were received over the last day, in inbox order. For each priority
+class the benchmark reports the median and longest time from the start of the
+scan, and from receipt, until the ticket's forward was sent.
+
+    python benchmarks/bench_priority.py --messages 3000 --urgent 10 --latency-ms 10 --send-workers 2 --async
+
+Sends are the slowest stage here, so the asyncio scan needs a --queue-size above
+the number of routine tickets for classification to reach the late outage reports
+before the routine forwards drain.
+"""
+import os
+import sys
+import time
+import base64
+import random
+import asyncio
+import logging
+import argparse
+from statistics import median
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.agent import TicketRoutingAgent
+from src.rate_limiter import TokenBucket
+from benchmarks.fake_gmail import FakeGmailService, make_message
+
+logging.getLogger('ticket_routing_agent').setLevel(logging.WARNING)
+
+ROUTINE = ("Checkout button not working on mobile",
+           "Hi team, the layout breaks when I click the submit button. Please help.")
+OUTAGE = ("Site is down - 502 bad gateway",
+          "Users report the server is unreachable, looks like an outage. Urgent!")
+OTHER = ("Lunch on Friday?", "Are we still on for lunch? Let me know.")
+
+
+def make_priority_inbox(size, urgent, ticket_share=0.3, seed=5):
+    """Routine UI tickets and other mail, with `urgent` outage reports in the newer half of the inbox."""
+    rng = random.Random(seed)
+    outages = set(rng.sample(range(size // 2, size), urgent))
+    now_ms = int(time.time() * 1000)
+    inbox = []
+    for index in range(size):
+        if index in outages:
+            subject, body = OUTAGE
+        else:
+            subject, body = ROUTINE if rng.random() < ticket_share else OTHER
+        message = make_message(index)
+        message['threadId'] = f"thread{index:08d}"
+        # Oldest first, received over the last day
+        message['internalDate'] = str(now_ms - (size - index) * 86400000 // size)
+        message['snippet'] = body
+        message['payload']['headers'][0]['value'] = subject
+        message['payload']['body'] = {'data': base64.urlsafe_b64encode(body.encode()).decode()}
+        inbox.append(message)
+    return inbox
+
+
+def run(inbox, options, latency, use_async):
+    agent = TicketRoutingAgent(**options)
+    handler = agent.gmail_handler
+    handler.service = FakeGmailService(inbox, latency=latency)
+    handler.authenticate = lambda: True
+    handler.send_limiter = TokenBucket(1e12, 1e12)
+
+    waits = {True: [], False: []}
+    forward_email = handler.forward_email
+
+    def timed_forward(description, recipient, subject, body):
+        status = forward_email(description, recipient, subject, body)
+        waits[subject.startswith("[FORWARDED] URGENT")].append(time.perf_counter() - start)
+        return status
+
+    handler.forward_email = timed_forward
+
+    start = time.perf_counter()
+    if use_async:
+        asyncio.run(agent.scan_gmail_async())
+    else:
+        agent.scan_gmail()
+    elapsed = time.perf_counter() - start
+    return waits, elapsed, agent.summary.get('forward_delays', {})
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Urgent-first forwarding benchmark')
+    parser.add_argument('--messages', type=int, default=3000, help='Messages in the synthetic inbox')
+    parser.add_argument('--urgent', type=int, default=10, help='Urgent outage reports among them')
+    parser.add_argument('--latency-ms', type=float, default=10.0, help='Simulated latency per Gmail round trip')
+    parser.add_argument('--send-workers', type=int, default=2, help='Concurrent sends')
+    parser.add_argument('--async', dest='async_scan', action='store_true', help='Also run the asyncio scan')
+    parser.add_argument('--queue-size', type=int, default=200, help='Items buffered between --async stages')
+    args = parser.parse_args()
+
+    inbox = make_priority_inbox(args.messages, args.urgent)
+    print(f"{args.messages} messages, {args.urgent} urgent outage reports, "
+          f"{args.latency_ms:.0f} ms per round trip, {args.send_workers} send workers")
+    print(f"{'mode':<7}{'class':<8}{'sends':>7}{'median s':>10}{'max s':>8}{'from receipt (median)':>23}{'scan s':>9}")
+
+    options = {'send_workers': args.send_workers, 'queue_size': args.queue_size}
+    modes = [False, True] if args.async_scan else [False]
+    for use_async in modes:
+        waits, elapsed, delays = run(inbox, options, args.latency_ms / 1000, use_async)
+        for urgent in (True, False):
+            priority = 'urgent' if urgent else 'normal'
+            values = waits[urgent] or [0.0]
+            from_receipt = delays.get(priority, {}).get('median_seconds')
+            receipt = f"{from_receipt / 60:.0f} min" if from_receipt is not None else "-"
+            print(f"{'async' if use_async else 'sync':<7}{priority:<8}{len(waits[urgent]):>7}"
+                  f"{median(values):>10.2f}{max(values):>8.2f}{receipt:>23}{elapsed:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Compare listing the whole inbox with letting Gmail search for the ticket queries,
+against the fake Gmail service (which implements a small subset of Gmail search).
+
+    python benchmarks/bench_search.py --messages 2000 --ticket-share 0.1 --latency-ms 20
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.gmail_handler import GmailHandler
+from benchmarks.fake_gmail import FakeGmailService, make_inbox
+
+
+def run(inbox, latency, **options):
+    service = FakeGmailService(inbox, latency=latency)
+    handler = GmailHandler(**options)
+    handler.service = service
+    # The fake evaluates searches in Python; do it before timing, as Gmail's index would have
+    for query in handler.search_queries() if handler.search else ():
+        service.search(query)
+
+    start = time.perf_counter()
+    tickets = handler.query_inbox_for_ticket(handler.fetch_inbox())
+    elapsed = time.perf_counter() - start
+
+    return [ticket['id'] for ticket in tickets], service, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Server-side search benchmark')
+    parser.add_argument('--messages', type=int, default=2000, help='Messages in the fake inbox')
+    parser.add_argument('--ticket-share', type=float, default=0.1, help='Share of bug reports')
+    parser.add_argument('--long-share', type=float, default=0.2, help='Share of long newsletters')
+    parser.add_argument('--latency-ms', type=float, default=20.0, help='Simulated latency per round trip')
+    args = parser.parse_args()
+
+    inbox = make_inbox(args.messages, args.ticket_share, args.long_share)
+    latency = args.latency_ms / 1000
+
+    print(f"{args.messages} messages, {args.ticket_share:.0%} bug reports, {args.long_share:.0%} newsletters, "
+          f"{args.latency_ms:.0f} ms per round trip")
+    print(f"{'mode':<12}{'tickets':>9}{'missed':>8}{'round trips':>13}{'MB received':>13}{'time (s)':>10}")
+    listed = None
+    for label, options in (('list inbox', {}), ('search', {'search': True})):
+        ticket_ids, service, elapsed = run(inbox, latency, **options)
+        listed = listed or ticket_ids
+        missed = len(set(listed) - set(ticket_ids))
+        print(f"{label:<12}{len(ticket_ids):>9}{missed:>8}{service.round_trips:>13}"
+              f"{service.bytes_received / 1e6:>13.2f}{elapsed:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Fill a ticket store with synthetic scans and measure bulk upserts, the aggregate
+report and streaming exports at history sizes up to millions of tickets.
+
+For comparison, the same report is computed in memory with
+TicketAnalyzer.generate_ticket_report over a list holding every ticket, as the
+agent does for a single run. Peak memory is the Python allocation high-water
+mark during each step (tracemalloc, in a second, untimed run).
+
+    python benchmarks/bench_ticket_store.py --tickets 1000000 --scan-size 10000
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.records import Ticket
+from src.ticket_analyzer import TicketAnalyzer
+from src.ticket_store import TicketStore
+
+CATEGORIES = [
+    ('Frontend', ['frontend@fakemail.com']),
+    ('Backend', ['backend@fakemail.com']),
+    ('Sysops', ['sysops@fakemail.com']),
+    ('Cross-functional', ['frontend@fakemail.com', 'backend@fakemail.com', 'sysops@fakemail.com']),
+]
+
+
+def make_tickets(start, count, rng, now):
+    for index in range(start, start + count):
+        category, forward_to = rng.choice(CATEGORIES)
+        duplicates = [f"dup{index}-{n}" for n in range(rng.choice((0, 0, 0, 0, 1, 3)))]
+        yield Ticket(
+            id=f"msg{index:010d}", subject=f"Ticket {index}: checkout page broken", category=category,
+            is_urgent=rng.random() < 0.2, timestamp=datetime.fromtimestamp(now - rng.random() * 365 * 86400),
+            sender=f"user{rng.randrange(50000)}@example.com", forward_to=forward_to,
+            body="", summary=f"Ticket {index}: checkout page broken", confidence=None, classified_by=None,
+            reporter_count=1 + len(duplicates), duplicate_ids=duplicates
+        )
+
+
+def measure(step):
+    """Time a step, then run it again under tracemalloc for its peak memory, which tracing would slow."""
+    start = time.perf_counter()
+    result = step()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    step()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Ticket store benchmark')
+    parser.add_argument('--tickets', type=int, default=200000, help='Stored tickets')
+    parser.add_argument('--scan-size', type=int, default=10000, help='Tickets upserted per scan')
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    now = time.time()
+    directory = tempfile.mkdtemp()
+    store = TicketStore(os.path.join(directory, 'tickets.db'))
+
+    start = time.perf_counter()
+    for first in range(0, args.tickets, args.scan_size):
+        run_id = store.start_run()
+        store.upsert_tickets(run_id, make_tickets(first, min(args.scan_size, args.tickets - first), rng, now))
+    elapsed = time.perf_counter() - start
+    size = os.path.getsize(store.db_path) / 1e6
+    print(f"{args.tickets} tickets in scans of {args.scan_size}: {args.tickets / elapsed:,.0f} upserts/s, "
+          f"{size:.0f} MB on disk")
+
+    # Re-upserting one scan's tickets updates them in place; a scan never holds more than are stored
+    existing = min(args.scan_size, args.tickets)
+    start = time.perf_counter()
+    store.upsert_tickets(run_id, make_tickets(0, existing, rng, now))
+    elapsed = time.perf_counter() - start
+    print(f"re-upsert of {existing} existing tickets: {elapsed:.2f} s")
+
+    print(f"\n{'step':<34}{'seconds':>9}{'peak MB':>9}")
+    steps = [
+        ("report, all tickets", lambda: store.generate_ticket_report()),
+        ("report, last 30 days", lambda: store.generate_ticket_report(since=now - 30 * 86400)),
+        ("report, one run", lambda: store.generate_ticket_report(run_id=run_id)),
+        ("export CSV", lambda: store.export(os.path.join(directory, 'tickets.csv'))),
+        ("export JSONL", lambda: store.export(os.path.join(directory, 'tickets.jsonl'))),
+    ]
+    for name, step in steps:
+        _, elapsed, peak = measure(step)
+        print(f"{name:<34}{elapsed:>9.3f}{peak:>9.1f}")
+
+    analyzer = TicketAnalyzer()
+    tickets, elapsed, peak = measure(lambda: list(make_tickets(0, args.tickets, random.Random(1), now)))
+    print(f"{'(in memory) build ticket list':<34}{elapsed:>9.3f}{peak:>9.1f}")
+    report, elapsed, peak = measure(lambda: analyzer.generate_ticket_report(tickets))
+    print(f"{'(in memory) generate_ticket_report':<34}{elapsed:>9.3f}{peak:>9.1f}")
+    stored = store.generate_ticket_report()
+    assert stored['total_tickets'] == report['total_tickets'] == args.tickets
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Compare the old per-thread httplib2 connections with the shared PooledHttp
+transport, running the real googleapiclient request and batch code against a
+local TLS server that stands in for Gmail.
+
+Each scan fetches messages in batches and forwards tickets on a worker pool, as
+scan_gmail does. The server counts the TLS connections it accepts and can delay
+each handshake and response to imitate network round trips.
+
+    python benchmarks/bench_transport.py --scans 3 --messages 500 --tickets 40 --workers 8 --rtt-ms 30
+
+Needs the openssl command to create a throwaway certificate.
+"""
+import os
+import re
+import ssl
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+import subprocess
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httplib2
+import google_auth_httplib2
+from google.oauth2.credentials import Credentials
+from googleapiclient import discovery_cache
+from googleapiclient.discovery import build_from_document
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.gmail_handler import GmailHandler
+from src.rate_limiter import TokenBucket
+from src.transport import PooledHttp
+from benchmarks.fake_gmail import make_message
+
+
+class GmailStub(BaseHTTPRequestHandler):
+    """Answers messages.get, messages.send and batch requests like Gmail, with made-up messages."""
+
+    protocol_version = 'HTTP/1.1'  # keep-alive
+
+    def setup(self):
+        super().setup()
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        # A TLS handshake costs about two round trips before the first request
+        time.sleep(2 * server.rtt)
+
+    def do_GET(self):
+        match = re.search(r'/messages/([^/?]+)', self.path)
+        self.respond(200, json.dumps(make_message(int(match.group(1)[3:]))))
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0)).decode()
+        if self.path.startswith('/batch'):
+            self.respond_batch(body)
+        else:
+            self.respond(200, json.dumps({'id': 'sent'}))
+
+    def respond_batch(self, body):
+        boundary = 'batch_stub_boundary'
+        parts = []
+        for content_id, message_id in re.findall(r'Content-ID: <([^>]+)>.*?/messages/([^/?\s]+)', body, re.S):
+            message = json.dumps(make_message(int(message_id[3:])))
+            parts.append(
+                f"--{boundary}\r\nContent-Type: application/http\r\nContent-ID: <response-{content_id}>\r\n\r\n"
+                f"HTTP/1.1 200 OK\r\nContent-Type: application/json; charset=UTF-8\r\n\r\n{message}\r\n"
+            )
+        self.respond(200, ''.join(parts) + f"--{boundary}--", f'multipart/mixed; boundary={boundary}')
+
+    def respond(self, status, text, content_type='application/json; charset=UTF-8'):
+        time.sleep(self.server.rtt)
+        data = text.encode()
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(tmp, rtt):
+    cert, key = os.path.join(tmp, 'cert.pem'), os.path.join(tmp, 'key.pem')
+    subprocess.run([
+        'openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-keyout', key, '-out', cert,
+        '-days', '1', '-subj', '/CN=127.0.0.1', '-addext', 'subjectAltName=IP:127.0.0.1'
+    ], check=True, capture_output=True)
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), GmailStub)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.connections = 0
+    server.rtt = rtt
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+    server.socket = context.wrap_socket(server.socket, server_side=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, cert
+
+
+class PerThreadHandler(GmailHandler):
+    """GmailHandler as it was: one shared httplib2 object for fetching, one per thread for sends."""
+
+    def __init__(self, credentials, ca_certs, **kwargs):
+        super().__init__(**kwargs)
+        self.credentials = credentials
+        self.ca_certs = ca_certs
+        self._thread_local = threading.local()
+
+    def new_http(self):
+        return google_auth_httplib2.AuthorizedHttp(self.credentials, http=httplib2.Http(ca_certs=self.ca_certs))
+
+    def _execute_with_retry(self, request, method):
+        http = getattr(self._thread_local, 'http', None)
+        if http is None:
+            http = self._thread_local.http = self.new_http()
+        self._record_calls(method)
+        return request.execute(http=http)
+
+
+def build_handler(mode, server, cert, workers):
+    credentials = Credentials(token='local-access-token')
+    document = json.loads(discovery_cache.get_static_doc('gmail', 'v1'))
+    document['rootUrl'] = f"https://127.0.0.1:{server.server_address[1]}/"
+
+    if mode == 'pooled':
+        handler = GmailHandler(send_workers=workers)
+        handler.credentials = credentials
+        handler.http = PooledHttp(credentials, pool_size=handler.pool_size)
+        handler.http.session.verify = cert
+        handler.http.session.trust_env = False  # REQUESTS_CA_BUNDLE would override verify
+    else:
+        handler = PerThreadHandler(credentials, cert, send_workers=workers)
+        handler.http = handler.new_http()
+    handler.service = build_from_document(document, http=handler.http)
+    handler.authenticate = lambda: True
+    handler.send_limiter = TokenBucket(1e12, 1e12)
+    return handler
+
+
+def run(mode, server, cert, args):
+    handler = build_handler(mode, server, cert, args.workers)
+    tickets = [
+        {'id': f"msg{i:08d}", 'subject': 'Checkout button not working', 'from': 'user@example.com',
+         'body': 'The layout breaks when I click submit.', 'is_urgent': False, 'forward_to': ['frontend@example.com']}
+        for i in range(args.tickets)
+    ]
+    message_ids = [f"msg{i:08d}" for i in range(args.messages)]
+
+    server.connections = 0
+    scan_times = []
+    for _ in range(args.scans):
+        start = time.perf_counter()
+        fetched = handler.get_messages(message_ids)
+        statuses = handler.forward_classified_emails(tickets)
+        scan_times.append(time.perf_counter() - start)
+        assert len(fetched) == args.messages, f"fetched {len(fetched)} of {args.messages} messages"
+        assert all('✓' in status for status in statuses), statuses[:3]
+    return server.connections, scan_times
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Gmail transport benchmark')
+    parser.add_argument('--scans', type=int, default=3, help='Scans to run on one handler')
+    parser.add_argument('--messages', type=int, default=500, help='Messages fetched per scan')
+    parser.add_argument('--tickets', type=int, default=40, help='Tickets forwarded per scan')
+    parser.add_argument('--workers', type=int, default=8, help='Send workers')
+    parser.add_argument('--rtt-ms', type=float, default=30.0, help='Simulated network round trip')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        server, cert = start_server(tmp, args.rtt_ms / 1000)
+        print(f"{args.scans} scans of {args.messages} fetched messages and {args.tickets} sends "
+              f"on {args.workers} workers, {args.rtt_ms:.0f} ms round trip")
+        print(f"{'transport':<22}{'TLS connections':>16}   seconds per scan")
+        for mode, label in (('per-thread', 'per-thread httplib2'), ('pooled', 'PooledHttp')):
+            connections, scan_times = run(mode, server, cert, args)
+            print(f"{label:<22}{connections:>16}   " + ' '.join(f"{t:.2f}" for t in scan_times))
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,458 @@
+"""
+In-memory stand-in for the parts of the Gmail API service used by GmailHandler.
+
+Every call to execute() counts as one HTTP round trip and sleeps for `latency`
+seconds, so benchmarks can compare request counts and wall time offline.
+"""
+import re
+import json
+import time
+import base64
+import random
+import mailbox
+import threading
+from collections import Counter
+from email.message import Message
+from email.utils import parsedate_to_datetime
+from typing import List, Dict, Any
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+SUBJECTS = [
+    "Checkout button not working on mobile",
+    "API returns 500 error on /orders",
+    "Site is down - 502 bad gateway",
+    "Weekly newsletter",
+    "Lunch on Friday?",
+    "Dashboard broken after deployment",
+    "Invoice for March",
+    "Database query timeout in reports",
+]
+
+BODIES = [
+    "Hi team, the layout breaks when I click the submit button. Please help.",
+    "Our integration started failing with a json error from the api this morning.",
+    "Users report the server is unreachable, looks like an outage. Urgent!",
+    "Here is what happened this week across the company.",
+    "Are we still on for lunch? Let me know.",
+    "Since the last deployment the dashboard shows mixed symptoms.",
+    "Please find the invoice attached.",
+    "The reports page hits a timeout, probably a slow database query.",
+]
+
+
+# Neutral words, none of them a ticket or category keyword
+FILLER = (
+    "the a user reported that when they open the page it shows blank we tried again "
+    "yesterday and today please look into this thanks regards team customer account "
+    "order invoice payment weekly update meeting schedule release notes support"
+).split()
+
+
+def make_message(index: int) -> Dict[str, Any]:
+    """Build a synthetic Gmail API message in 'full' format."""
+    subject = SUBJECTS[index % len(SUBJECTS)]
+    body = BODIES[index % len(BODIES)]
+    return {
+        'id': f"msg{index:08d}",
+        'threadId': f"thread{index // 3:08d}",
+        'internalDate': str(1700000000000 + index * 60000),
+        'snippet': body[:100],
+        'payload': {
+            'mimeType': 'text/plain',
+            'headers': [
+                {'name': 'Subject', 'value': subject},
+                {'name': 'From', 'value': f"user{index % 50}@example.com"},
+                {'name': 'To', 'value': 'support@example.com'},
+                {'name': 'Date', 'value': 'Tue, 14 Nov 2023 22:13:20 +0000'},
+            ],
+            'body': {'data': base64.urlsafe_b64encode(body.encode('utf-8')).decode()},
+        },
+    }
+
+
+def make_multipart_message(index: int) -> Dict[str, Any]:
+    """Build a synthetic multipart/alternative message with text and HTML parts, as most mail clients send."""
+    message = make_message(index)
+    body = BODIES[index % len(BODIES)]
+    html = (
+        '<html><head><meta charset="utf-8"></head><body>'
+        '<div dir="ltr" style="font-family:Arial,sans-serif;font-size:14px">'
+        f'<p>{body}</p><br><p>--<br>Sent from the customer portal</p>'
+        '</div></body></html>'
+    )
+    message['payload']['mimeType'] = 'multipart/alternative'
+    message['payload']['parts'] = [
+        {'mimeType': 'text/plain', 'body': message['payload'].pop('body')},
+        {'mimeType': 'text/html', 'body': {'data': base64.urlsafe_b64encode(html.encode('utf-8')).decode()}},
+    ]
+    return message
+
+
+TICKET_SUBJECTS = [0, 1, 2, 5, 7]  # indexes into SUBJECTS/BODIES of bug reports
+OTHER_SUBJECTS = [3, 4, 6]
+
+# Delivered mail carries a few KB of routing and authentication headers
+TRANSPORT_HEADERS = [
+    {'name': 'Received', 'value': 'by 2002:a05:6a10:8a8f:b0:5c4:1bd3:3e1b with SMTP id d15csp1820811pxo; '
+                                  'Tue, 14 Nov 2023 14:13:20 -0800 (PST)'},
+    {'name': 'X-Received', 'value': 'by 2002:a17:906:2bc4:b0:9e5:2c72:b7 with SMTP id n4mr1064133ejg.13; '
+                                    'Tue, 14 Nov 2023 14:13:20 -0800 (PST)'},
+    {'name': 'ARC-Seal', 'value': 'i=1; a=rsa-sha256; t=1699999999; cv=none; d=google.com; s=arc-20160816; b=' + 'x' * 340},
+    {'name': 'ARC-Message-Signature', 'value': 'i=1; a=rsa-sha256; c=relaxed/relaxed; d=google.com; b=' + 'y' * 340},
+    {'name': 'ARC-Authentication-Results', 'value': 'i=1; mx.google.com; dkim=pass header.i=@example.com; spf=pass'},
+    {'name': 'Return-Path', 'value': '<bounce@example.com>'},
+    {'name': 'Received', 'value': 'from mail-sor-f41.google.com (mail-sor-f41.google.com. [209.85.220.41]) '
+                                  'by mx.google.com with SMTPS id a640c23a62f3a; Tue, 14 Nov 2023 14:13:20 -0800 (PST)'},
+    {'name': 'Received-SPF', 'value': 'pass (google.com: domain of bounce@example.com designates 209.85.220.41 '
+                                      'as permitted sender) client-ip=209.85.220.41;'},
+    {'name': 'Authentication-Results', 'value': 'mx.google.com; dkim=pass header.i=@example.com header.s=20230601; '
+                                                'spf=pass smtp.mailfrom=bounce@example.com; dmarc=pass'},
+    {'name': 'DKIM-Signature', 'value': 'v=1; a=rsa-sha256; c=relaxed/relaxed; d=example.com; s=20230601; '
+                                        'h=to:subject:message-id:date:from:mime-version; bh=' + 'z' * 44 + '; b=' + 'w' * 340},
+    {'name': 'X-Google-DKIM-Signature', 'value': 'v=1; a=rsa-sha256; c=relaxed/relaxed; d=1e100.net; b=' + 'v' * 340},
+    {'name': 'X-Gm-Message-State', 'value': 'AOJu0Yw' + 'u' * 90},
+    {'name': 'X-Google-Smtp-Source', 'value': 'AGHT+IG' + 't' * 80},
+    {'name': 'MIME-Version', 'value': '1.0'},
+    {'name': 'Message-ID', 'value': '<CAB0fixture@mail.gmail.com>'},
+]
+
+
+def make_long_message(index: int, rng: random.Random, keyword: str = None) -> Dict[str, Any]:
+    """A newsletter-sized multipart message, with `keyword` placed past the snippet if given."""
+    message = make_multipart_message(index)
+    words = [rng.choice(FILLER) for _ in range(3000)]
+    if keyword:
+        words.insert(rng.randrange(1000, len(words)), keyword)
+    text = " ".join(words)
+    html = f"<html><body><div><p>{text}</p></div></body></html>"
+    message['snippet'] = text[:200]
+    message['payload']['headers'][0]['value'] = "Monthly community roundup"
+    message['payload']['parts'][0]['body'] = {'data': base64.urlsafe_b64encode(text.encode()).decode()}
+    message['payload']['parts'][1]['body'] = {'data': base64.urlsafe_b64encode(html.encode()).decode()}
+    return message
+
+
+def make_inbox(size: int, ticket_share: float = 0.1, long_share: float = 0.02, seed: int = 7) -> List[Dict[str, Any]]:
+    """
+    Build a synthetic inbox of bug reports, short non-ticket mail and long
+    newsletters, one newsletter in ten mentioning a keyword deep in its body.
+    """
+    rng = random.Random(seed)
+    inbox = []
+    for i in range(size):
+        roll = rng.random()
+        if roll < ticket_share:
+            message = make_multipart_message(i)
+            message['payload']['headers'][0]['value'] = SUBJECTS[rng.choice(TICKET_SUBJECTS)]
+        elif roll < ticket_share + long_share:
+            message = make_long_message(i, rng, keyword='timeout' if rng.random() < 0.1 else None)
+        else:
+            message = make_multipart_message(OTHER_SUBJECTS[i % len(OTHER_SUBJECTS)])
+            message['id'] = f"msg{i:08d}"
+        message['payload']['headers'].extend(TRANSPORT_HEADERS)
+        inbox.append(message)
+    return inbox
+
+
+def load_fixtures(path: str) -> List[Dict[str, Any]]:
+    """
+    Load messages from a JSON file of Gmail API messages (a list, or a dict of
+    named messages like fixtures/gmail_payloads.json) or from an mbox file.
+    """
+    if path.endswith('.json'):
+        with open(path) as f:
+            messages = json.load(f)
+        return list(messages.values()) if isinstance(messages, dict) else messages
+
+    return [message_from_mime(mime, index) for index, mime in enumerate(mailbox.mbox(path))]
+
+
+def message_from_mime(mime: Message, index: int) -> Dict[str, Any]:
+    """Convert a parsed RFC 822 message, e.g. from an mbox, into a Gmail API message in 'full' format."""
+    try:
+        internal_date = int(parsedate_to_datetime(mime['Date']).timestamp() * 1000)
+    except (TypeError, ValueError):
+        internal_date = 1700000000000 + index * 60000
+
+    payload = _mime_payload(mime, '')
+    text = next((part.get_payload(decode=True) for part in mime.walk()
+                 if part.get_content_type() == 'text/plain' and not part.get_filename()), b'') or b''
+
+    return {
+        'id': f"mbox{index:08d}",
+        'threadId': f"mbox{index:08d}",
+        'labelIds': ['INBOX'],
+        'snippet': ' '.join(text.decode('utf-8', errors='replace').split())[:200],
+        'internalDate': str(internal_date),
+        'payload': payload,
+    }
+
+
+def _mime_payload(part: Message, part_id: str) -> Dict[str, Any]:
+    payload = {
+        'partId': part_id,
+        'mimeType': part.get_content_type(),
+        'filename': part.get_filename() or '',
+        'headers': [{'name': name, 'value': str(value)} for name, value in part.items()],
+    }
+
+    if part.is_multipart():
+        payload['body'] = {'size': 0}
+        payload['parts'] = [
+            _mime_payload(child, f"{part_id}.{number}" if part_id else str(number))
+            for number, child in enumerate(part.get_payload())
+        ]
+        return payload
+
+    data = part.get_payload(decode=True) or b''
+    if payload['filename']:
+        payload['body'] = {'attachmentId': f"att-{part_id}", 'size': len(data)}
+    else:
+        payload['body'] = {'size': len(data), 'data': base64.urlsafe_b64encode(data).decode()}
+    return payload
+
+
+def replicate(messages: List[Dict[str, Any]], size: int) -> List[Dict[str, Any]]:
+    """Repeat fixture messages up to `size`, each copy with its own ID and a later date."""
+    inbox = []
+    for index in range(size):
+        message = dict(messages[index % len(messages)])
+        message['id'] = f"msg{index:08d}"
+        message['threadId'] = f"thread{index:08d}"
+        message['internalDate'] = str(1700000000000 + index * 60000)
+        inbox.append(message)
+    return inbox
+
+
+def metadata_view(message: Dict[str, Any], headers: List[str] = None) -> Dict[str, Any]:
+    """What messages.get returns with format='metadata': no bodies, only the requested headers."""
+    wanted = {name.lower() for name in headers or ()}
+    view = {key: value for key, value in message.items() if key != 'payload'}
+    view['payload'] = {
+        'mimeType': message['payload']['mimeType'],
+        'headers': [
+            header for header in message['payload']['headers']
+            if not wanted or header['name'].lower() in wanted
+        ],
+    }
+    return view
+
+
+def message_words(message: Dict[str, Any]) -> List[str]:
+    """The words of a message's subject and text parts, as Gmail's index would see them."""
+    texts = [header['value'] for header in message['payload']['headers'] if header['name'] == 'Subject']
+    stack = [message['payload']]
+    while stack:
+        part = stack.pop()
+        stack.extend(part.get('parts', []))
+        if part.get('mimeType') == 'text/plain' and 'data' in part.get('body', {}):
+            texts.append(base64.urlsafe_b64decode(part['body']['data']).decode('utf-8', errors='replace'))
+    return re.findall(r'[a-z0-9]+', ' '.join(texts).lower())
+
+
+def matches_query(words: List[str], internal_date: int, query: str, now_ms: int) -> bool:
+    """
+    A small subset of Gmail search: an optional {any of} group of words and quoted
+    phrases, matched as whole words, and an optional newer_than:Nd filter.
+    """
+    days = re.search(r'newer_than:(\d+)d', query)
+    if days and internal_date < now_ms - int(days.group(1)) * 86400000:
+        return False
+
+    group = re.search(r'\{(.*)\}', query)
+    if not group:
+        return True
+    for phrase, word in re.findall(r'"([^"]+)"|(\S+)', group.group(1)):
+        terms = re.findall(r'[a-z0-9]+', (phrase or word).lower())
+        if any(words[i:i + len(terms)] == terms for i in range(len(words) - len(terms) + 1)):
+            return True
+    return False
+
+
+class FakeHttpError(Exception):
+    """Raised for per-message failures injected through `failing_ids`."""
+
+
+class FakeRequest:
+    def __init__(self, service: 'FakeGmailService', handler, method: str):
+        self.service = service
+        self.method = method
+        self._handler = handler
+
+    def handler(self):
+        self.service.count_call(self.method)
+        return self._handler()
+
+    def execute(self, http=None, **kwargs):
+        self.service.count_round_trip()
+        time.sleep(self.service.latency)
+        return self.handler()
+
+
+class FakeBatch:
+    def __init__(self, service: 'FakeGmailService', callback):
+        self.service = service
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request: FakeRequest, request_id: str = None):
+        self.requests.append((request_id, request))
+
+    def execute(self, http=None, **kwargs):
+        self.service.count_round_trip()
+        time.sleep(self.service.latency)
+        for request_id, request in self.requests:
+            try:
+                response, exception = request.handler(), None
+            except Exception as e:
+                response, exception = None, e
+            self.callback(request_id, response, exception)
+
+
+class FakeMessages:
+    def __init__(self, service: 'FakeGmailService'):
+        self.service = service
+
+    def list(self, userId: str = 'me', labelIds: List[str] = None, q: str = None, maxResults: int = 100,
+             pageToken: str = None, **kwargs):
+        def handler():
+            matching = self.service.inbox if not q else self.service.search(q)
+            start = int(pageToken or 0)
+            page = matching[start:start + maxResults]
+            response = {'messages': [{'id': m['id'], 'threadId': m['threadId']} for m in page]}
+            if start + maxResults < len(matching):
+                response['nextPageToken'] = str(start + maxResults)
+            return response
+        return FakeRequest(self.service, handler, 'messages.list')
+
+    def get(self, userId: str = 'me', id: str = None, format: str = 'full', metadataHeaders: List[str] = None,
+            **kwargs):
+        def handler():
+            if id in self.service.failing_ids:
+                raise FakeHttpError(f"429 Too Many Requests for {id}")
+            with self.service.lock:
+                throttled = self.service.throttled_ids.get(id, 0)
+                if throttled:
+                    self.service.throttled_ids[id] = throttled - 1
+            if throttled:
+                raise HttpError(httplib2.Response({'status': 429}), b'rateLimitExceeded')
+            message = self.service.by_id[id]
+            if format == 'metadata':
+                message = metadata_view(message, metadataHeaders)
+            self.service.count_bytes(message)
+            return message
+        return FakeRequest(self.service, handler, 'messages.get')
+
+    def send(self, userId: str = 'me', body: Dict[str, Any] = None):
+        def handler():
+            with self.service.lock:
+                if self.service.send_errors:
+                    status = self.service.send_errors.pop(0)
+                    raise HttpError(httplib2.Response({'status': status}), b'Rate limit exceeded')
+                self.service.sent.append(body)
+                return {'id': f"sent{len(self.service.sent):08d}"}
+        return FakeRequest(self.service, handler, 'messages.send')
+
+
+class FakeHistory:
+    def __init__(self, service: 'FakeGmailService'):
+        self.service = service
+
+    def list(self, userId: str = 'me', startHistoryId: str = None, pageToken: str = None, **kwargs):
+        def handler():
+            start = int(startHistoryId)
+            if start < self.service.history_floor:
+                raise HttpError(httplib2.Response({'status': 404}), b'Requested entity was not found.')
+            return {
+                'history': [
+                    {'id': str(history_id), 'messagesAdded': [{'message': {
+                        'id': message['id'], 'threadId': message['threadId'], 'labelIds': ['INBOX']
+                    }}]}
+                    for history_id, message in self.service.history_records if history_id > start
+                ],
+                'historyId': str(self.service.history_id),
+            }
+        return FakeRequest(self.service, handler, 'history.list')
+
+
+class FakeGmailService:
+    """
+    Minimal fake of googleapiclient's Gmail v1 resource.
+
+    Args:
+        messages: Gmail API message objects held in the fake INBOX
+        latency: Seconds each HTTP round trip takes
+        failing_ids: Message IDs whose get() calls fail
+        throttled_ids: Message IDs mapped to how many get() calls answer 429 before one succeeds
+        send_errors: HTTP statuses returned by the next send() calls, e.g. [429, 503]
+    """
+
+    def __init__(self, messages: List[Dict[str, Any]], latency: float = 0.0, failing_ids=(), send_errors=(),
+                 throttled_ids=None):
+        self.inbox = messages
+        self.by_id = {m['id']: m for m in messages}
+        self.latency = latency
+        self.failing_ids = set(failing_ids)
+        self.throttled_ids = dict(throttled_ids or {})
+        self.round_trips = 0
+        self.calls = Counter()  # API method -> calls, each request inside a batch counted once
+        self.bytes_received = 0  # JSON size of the message resources returned by get()
+        self.sent = []
+        self.send_errors = list(send_errors)
+        self.lock = threading.Lock()
+        self.history_id = 1000
+        self.history_floor = 0  # history().list fails with 404 for startHistoryId below this
+        self.history_records = []
+        self.words = {}  # message ID -> indexed words, built on first search
+        self.search_results = {}  # (query, inbox size) -> matching messages
+
+    def count_round_trip(self):
+        with self.lock:
+            self.round_trips += 1
+
+    def count_call(self, method: str):
+        with self.lock:
+            self.calls[method] += 1
+
+    def search(self, query: str) -> List[Dict[str, Any]]:
+        """Inbox messages matching a Gmail query, newest mail being 'now' for newer_than."""
+        key = (query, len(self.inbox))
+        if key not in self.search_results:
+            now_ms = max(int(message['internalDate']) for message in self.inbox) + 1
+            for message in self.inbox:
+                if message['id'] not in self.words:
+                    self.words[message['id']] = message_words(message)
+            self.search_results[key] = [
+                message for message in self.inbox
+                if matches_query(self.words[message['id']], int(message['internalDate']), query, now_ms)
+            ]
+        return self.search_results[key]
+
+    def count_bytes(self, response: Dict[str, Any]):
+        size = len(json.dumps(response))
+        with self.lock:
+            self.bytes_received += size
+
+    def add_message(self, message: Dict[str, Any]):
+        """Deliver a new message to the fake INBOX and record it in the history."""
+        self.history_id += 1
+        self.inbox.append(message)
+        self.by_id[message['id']] = message
+        self.history_records.append((self.history_id, message))
+
+    def getProfile(self, userId: str = 'me'):
+        return FakeRequest(self, lambda: {'historyId': str(self.history_id)}, 'getProfile')
+
+    def history(self):
+        return FakeHistory(self)
+
+    def users(self):
+        return self
+
+    def messages(self):
+        return FakeMessages(self)
+
+    def new_batch_http_request(self, callback=None):
+        return FakeBatch(self, callback)
@@ -0,0 +1,64 @@
+"""
+Offline stand-in for the Bedrock model used by HybridClassifier.
+
+It answers single and batch classification prompts with JSON verdicts derived
+from a few keywords, after sleeping `latency` seconds to mimic a model round trip.
+Batches larger than `max_batch` get a truncated (unparseable) response, the way
+long outputs get cut off by a real model's token limit.
+"""
+import re
+import json
+import time
+import threading
+
+RULES = [
+    ('Sysops', ('outage', 'gateway', 'server', 'deploy', 'dns')),
+    ('Backend', ('api', 'database', 'query', 'json')),
+    ('Frontend', ('button', 'layout', 'page', 'click')),
+]
+
+
+def stub_verdict(text: str) -> dict:
+    text = text.lower()
+    category = next((name for name, words in RULES if any(word in text for word in words)), 'Cross-Functional')
+    return {'category': category, 'is_urgent': 'urgent' in text or 'outage' in text}
+
+
+class StubModel:
+    """
+    Callable model stub that counts calls and prompt sizes.
+
+    Args:
+        latency: Seconds each call takes
+        max_batch: Largest batch answered with valid JSON
+    """
+
+    def __init__(self, latency: float = 0.0, max_batch: int = 1000):
+        self.latency = latency
+        self.max_batch = max_batch
+        self.calls = 0
+        self.prompt_chars = 0
+        self.response_chars = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, prompt: str) -> str:
+        time.sleep(self.latency)
+
+        emails = re.findall(r'^### Email (\d+)\n(.*?)(?=^### Email |\Z)', prompt, re.MULTILINE | re.DOTALL)
+        if emails:
+            response = json.dumps([{'id': int(number), **stub_verdict(text)} for number, text in emails])
+            if len(emails) > self.max_batch:
+                response = response[:len(response) // 2]
+        else:
+            subject = re.search(r'^Subject: (.*)$', prompt, re.MULTILINE)
+            response = json.dumps(stub_verdict(prompt if subject is None else prompt[subject.start():]))
+
+        with self.lock:
+            self.calls += 1
+            self.prompt_chars += len(prompt)
+            self.response_chars += len(response)
+        return response
+
+    def tokens(self) -> int:
+        """Rough token count of all prompts and responses (4 characters per token)."""
+        return (self.prompt_chars + self.response_chars) // 4
@@ -1,16 +1,14 @@
 #!/usr/bin/env python3
 import os
 import sys
+import asyncio
 import argparse
 import colorama
 from colorama import Fore
-from tabulate import tabulate
 
 # Add the src directory to the path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "src")))
 
-from src.agent import TicketRoutingAgent
-
 colorama.init(autoreset=True)
 
 def print_banner():
@@ -30,36 +28,97 @@ def format_date(date_obj):
         return "N/A"
     return date_obj.strftime("%Y-%m-%d")
 
-def main():
-    parser = argparse.ArgumentParser(description='Ticket Routing Agent')
-    parser.add_argument('--region', type=str, default='us-east-1', help='AWS region for Bedrock')
-    parser.add_argument('--profile', type=str, default='default', help='AWS profile name')
-    parser.add_argument('--export', type=str, help='Path to export CSV results')
-    args = parser.parse_args()
+def format_duration(seconds):
+    for unit, size in (('d', 86400), ('h', 3600), ('m', 60)):
+        if seconds >= size:
+            return f"{seconds / size:.1f}{unit}"
+    return f"{seconds:.0f}s"
 
-    print_banner()
+def print_history(agent, args):
+    from tabulate import tabulate
 
-    print(f"{Fore.WHITE}Initializing Ticket Routing Agent...")
-    agent = TicketRoutingAgent(region=args.region, profile_name=args.profile)
+    if args.export_history:
+        if agent.export_history(args.export_history, args.history_days):
+            print(f"{Fore.GREEN}✓ Exported stored tickets to {args.export_history}")
+        else:
+            print(f"{Fore.RED}✗ Failed to export stored tickets")
+    if args.history_report:
+        report = agent.generate_history_report(args.history_days)
+        period = f"from the last {args.history_days:g} day(s)" if args.history_days is not None else "stored"
+        print(f"{Fore.CYAN}{report['total_tickets']} ticket(s) {period}, {report['urgent_tickets']} urgent, "
+              f"{report['duplicate_reports']} duplicate report(s) folded in.\n")
+        print(tabulate(
+            sorted(report['category_breakdown'].items()),
+            headers=["Bug Type", "Tickets"],
+            tablefmt="fancy_grid"
+        ))
+
+def run_daemon(agent, args):
+    from src.daemon import ScanDaemon
+
+    def on_scan(agent):
+        if args.export and agent.tickets:
+            export_path = args.export if args.export.endswith('.csv') else f"{args.export}.csv"
+            agent.export_to_csv(export_path)
+        if args.metrics:
+            agent.export_metrics(args.metrics)
+
+    daemon = ScanDaemon(
+        agent,
+        interval=args.interval,
+        jitter=args.jitter,
+        push_port=args.push_port,
+        push_token=args.push_token,
+        on_scan=on_scan
+    )
+    print(f"{Fore.CYAN}Running as a daemon, scanning every {args.interval:.0f}s. Press Ctrl+C to stop.")
+    daemon.run()
+
+def run_scans(agent, args):
+    from tabulate import tabulate
 
     print(f"{Fore.WHITE}Authenticating with Gmail...")
     if not agent.gmail_handler.authenticate():
         print(f"{Fore.RED}Authentication failed. Check your OAuth setup.")
         sys.exit(1)
     
+    if args.daemon:
+        run_daemon(agent, args)
+        return
+
     print(f"{Fore.CYAN}Scanning Gmail for bugs reported...")
 
     try:
-        tickets = agent.scan_gmail()
+        if args.async_scan:
+            tickets = asyncio.run(agent.scan_gmail_async())
+        else:
+            tickets = agent.scan_gmail()
     except Exception as e:
         print(f"{Fore.RED}Scan failed: {e}")
         sys.exit(1)
+    finally:
+        # Written even when the scan fails, so errors and retries can be inspected
+        if args.metrics:
+            if agent.export_metrics(args.metrics):
+                print(f"{Fore.GREEN}✓ Wrote metrics to {args.metrics}")
+            else:
+                print(f"{Fore.RED}✗ Failed to write metrics")
 
     if not tickets:
         print(f"{Fore.YELLOW}No bug-related emails found.")
         return
 
     print(f"{Fore.GREEN}✓ Scan complete. Found {len(tickets)} ticket(s).\n")
+    if agent.summary.get('duplicate_reports'):
+        print(f"{Fore.CYAN}Folded {agent.summary['duplicate_reports']} duplicate report(s) into their incident tickets.\n")
+    for priority, delays in agent.summary.get('forward_delays', {}).items():
+        if delays['forwarded']:
+            print(f"{Fore.CYAN}{delays['forwarded']} {priority} ticket(s) forwarded {format_duration(delays['median_seconds'])} "
+                  f"after receipt (median), {format_duration(delays['max_seconds'])} at most.")
+        if delays['failed']:
+            print(f"{Fore.RED}✗ {delays['failed']} {priority} ticket(s) could not be forwarded.")
+    if agent.summary.get('forward_delays'):
+        print()
 
     print(f"{Fore.CYAN}🛠 Ticket Classification Results:\n")
 
@@ -95,5 +154,89 @@ def main():
         else:
             print(f"\n{Fore.RED}✗ Failed to export results to CSV")
 
+def main():
+    parser = argparse.ArgumentParser(description='Ticket Routing Agent')
+    parser.add_argument('--region', type=str, default='us-east-1', help='AWS region for Bedrock')
+    parser.add_argument('--profile', type=str, default='default', help='AWS profile name')
+    parser.add_argument('--export', type=str, help='Path to export CSV results')
+    parser.add_argument('--incremental', action='store_true', help='Only process mail added since the last run')
+    parser.add_argument('--scoring', action='store_true', help='Classify by weighted keyword scores')
+    parser.add_argument('--send-workers', type=int, default=1, help='Forwarded emails sent concurrently')
+    parser.add_argument('--digest', action='store_true', help='Send one digest per department instead of one email per ticket')
+    parser.add_argument('--digest-urgent', action='store_true', help='Hold urgent tickets for the digest too')
+    parser.add_argument('--hybrid', action='store_true', help='Escalate low-confidence keyword classifications to Bedrock')
+    parser.add_argument('--confidence-threshold', type=float, default=0.6, help='Keyword confidence needed to skip the LLM')
+    parser.add_argument('--llm-batch-size', type=int, default=10, help='Ambiguous tickets per LLM prompt')
+    parser.add_argument('--llm-concurrency', type=int, default=4, help='LLM prompts in flight at once')
+    parser.add_argument('--max-body-chars', type=int, help='Keep only the start of each email body')
+    parser.add_argument('--prefilter', action='store_true', help='Check subjects and snippets before downloading bodies')
+    parser.add_argument('--search', action='store_true', help='Let Gmail search for ticket keywords instead of listing the inbox')
+    parser.add_argument('--newer-than', type=int, metavar='DAYS', help='Only scan mail received in the last DAYS days')
+    parser.add_argument('--metrics', type=str, metavar='PATH', help='Write scan metrics to PATH (.prom for Prometheus text, otherwise JSON)')
+    parser.add_argument('--pool-size', type=int, help='Gmail connections kept open for reuse (default: send workers + 1, at least 10)')
+    parser.add_argument('--connect-timeout', type=float, default=10, metavar='SECONDS', help='Seconds to wait for a connection to Gmail')
+    parser.add_argument('--read-timeout', type=float, default=60, metavar='SECONDS', help='Seconds to wait for each read from Gmail')
+    parser.add_argument('--analysis-workers', type=int, default=1, help='Processes that extract and classify messages in parallel')
+    parser.add_argument('--async', dest='async_scan', action='store_true', help='Overlap fetching, classifying and forwarding, sending each ticket as soon as it is classified')
+    parser.add_argument('--fetch-concurrency', type=int, default=4, help='Gmail batch fetches in flight at once with --async')
+    parser.add_argument('--classify-concurrency', type=int, default=2, help='Batches of messages being extracted at once with --async')
+    parser.add_argument('--queue-size', type=int, default=200, help='Messages and tickets buffered between --async stages')
+    parser.add_argument('--cluster', action='store_true', help='Collapse near-duplicate reports of one problem into a single ticket')
+    parser.add_argument('--cluster-similarity', type=float, default=0.5, help='Word overlap (0-1) at which two reports count as the same problem')
+    parser.add_argument('--store', action='store_true', help='Record tickets, forward outcomes and runs in config/tickets.db')
+    parser.add_argument('--history-report', action='store_true', help='Report on the stored tickets instead of scanning')
+    parser.add_argument('--export-history', type=str, metavar='PATH', help='Stream the stored tickets to PATH (.jsonl for JSON Lines, otherwise CSV) instead of scanning')
+    parser.add_argument('--history-days', type=float, metavar='DAYS', help='Limit --history-report and --export-history to tickets received in the last DAYS days')
+    parser.add_argument('--daemon', action='store_true', help='Keep running and scan incrementally on a schedule')
+    parser.add_argument('--interval', type=float, default=300, metavar='SECONDS', help='Seconds between daemon scans')
+    parser.add_argument('--jitter', type=float, default=0.1, help='Fraction of the interval daemon scans may start early or late')
+    parser.add_argument('--push-port', type=int, help='Accept Gmail Pub/Sub push notifications on this local port')
+    parser.add_argument('--push-token', type=str, help='Secret push requests must carry as ?token=')
+    args = parser.parse_args()
+
+    # Imported after argument parsing so --help does not pay for the Gmail client libraries
+    from src.agent import TicketRoutingAgent
+
+    print_banner()
+
+    print(f"{Fore.WHITE}Initializing Ticket Routing Agent...")
+    agent = TicketRoutingAgent(
+        region=args.region,
+        profile_name=args.profile,
+        incremental=args.incremental or args.daemon,
+        scoring=args.scoring,
+        send_workers=args.send_workers,
+        digest=args.digest,
+        digest_urgent=args.digest_urgent,
+        hybrid=args.hybrid,
+        confidence_threshold=args.confidence_threshold,
+        llm_batch_size=args.llm_batch_size,
+        llm_concurrency=args.llm_concurrency,
+        max_body_chars=args.max_body_chars,
+        prefilter=args.prefilter,
+        search=args.search,
+        newer_than_days=args.newer_than,
+        metrics=bool(args.metrics),
+        pool_size=args.pool_size,
+        connect_timeout=args.connect_timeout,
+        read_timeout=args.read_timeout,
+        cluster=args.cluster,
+        cluster_similarity=args.cluster_similarity,
+        analysis_workers=args.analysis_workers,
+        fetch_concurrency=args.fetch_concurrency,
+        classify_concurrency=args.classify_concurrency,
+        queue_size=args.queue_size,
+        store=args.store or args.history_report or bool(args.export_history)
+    )
+
+    try:
+        if args.history_report or args.export_history:
+            print_history(agent, args)
+        else:
+            run_scans(agent, args)
+    finally:
+        # Otherwise the analysis worker processes outlive the agent
+        agent.close()
+
 if __name__ == "__main__":
     main()
@@ -1,3 +1,19 @@
 from . import agent
+from . import async_gmail_handler
+from . import async_scan
+from . import checkpoint_store
+from . import daemon
+from . import forward_scheduler
 from . import gmail_handler
+from . import keyword_matcher
+from . import llm_classifier
+from . import metrics
+from . import mime_extractor
+from . import near_duplicates
+from . import parallel_analysis
+from . import rate_limiter
+from . import records
+from . import search_query
 from . import ticket_analyzer
+from . import ticket_store
+from . import transport
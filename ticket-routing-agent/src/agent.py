@@ -1,12 +1,21 @@
+import time
 import logging
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Any, Iterable, Iterator, Callable
 
-from strands import Agent
-from strands.models import BedrockModel
-
-from .gmail_handler import GmailHandler
+from .async_gmail_handler import AsyncGmailHandler
+from .async_scan import AsyncScan, DEFAULT_CLASSIFY_CONCURRENCY, DEFAULT_FETCH_CONCURRENCY, DEFAULT_QUEUE_SIZE
+from .checkpoint_store import CheckpointStore
+from .forward_scheduler import ForwardScheduler
+from .gmail_handler import GmailHandler, InboxSnapshot
+from .llm_classifier import HybridClassifier, VerdictCache
+from .metrics import Metrics
+from .near_duplicates import IncidentClusterer, DEFAULT_SIMILARITY
+from .parallel_analysis import ParallelAnalyzer
+from .records import EmailRecord, Ticket
 from .ticket_analyzer import TicketAnalyzer
+from .ticket_store import TicketStore
+from .transport import DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT
 
 # Configure logging
 logging.basicConfig(
@@ -21,16 +30,85 @@ class TicketRoutingAgent:
     A Strands agent for scanning Gmail, classifying bug-related tickets, and forwarding them to the relevant department.
     """
 
-    def __init__(self, region: str = 'us-east-1', profile_name: str = 'default'):
+    def __init__(self, region: str = 'us-east-1', profile_name: str = 'default',
+                 incremental: bool = False, checkpoint_path: str = None, scoring: bool = False,
+                 send_workers: int = 1, digest: bool = False, digest_urgent: bool = False,
+                 hybrid: bool = False, llm_model: Callable[[str], Any] = None,
+                 confidence_threshold: float = 0.6, llm_cache_path: str = None,
+                 llm_batch_size: int = 10, llm_concurrency: int = 4, max_body_chars: int = None,
+                 prefilter: bool = False, search: bool = False, newer_than_days: int = None,
+                 metrics: bool = False, pool_size: int = None,
+                 connect_timeout: float = DEFAULT_CONNECT_TIMEOUT, read_timeout: float = DEFAULT_READ_TIMEOUT,
+                 cluster: bool = False, cluster_similarity: float = DEFAULT_SIMILARITY,
+                 analysis_workers: int = 1, fetch_concurrency: int = DEFAULT_FETCH_CONCURRENCY,
+                 classify_concurrency: int = DEFAULT_CLASSIFY_CONCURRENCY, queue_size: int = DEFAULT_QUEUE_SIZE,
+                 store: bool = False, store_path: str = None):
         self.region = region
         self.profile_name = profile_name
-        self.gmail_handler = GmailHandler()
-        self.ticket_analyzer = TicketAnalyzer()
-        self.agent = self._create_agent()
+        # Per-stage timers and API counters; a disabled instance makes them no-ops
+        self.metrics = Metrics(enabled=metrics)
+        self.gmail_handler = GmailHandler(
+            send_workers=send_workers, max_body_chars=max_body_chars, prefilter=prefilter,
+            search=search, newer_than_days=newer_than_days, metrics=self.metrics, pool_size=pool_size,
+            connect_timeout=connect_timeout, read_timeout=read_timeout
+        )
+        self.ticket_analyzer = TicketAnalyzer(scoring=scoring, metrics=self.metrics)
+        # Clustering collapses near-duplicate reports of one problem (an outage storm)
+        # into a single ticket, so only the first report is classified and forwarded
+        self.clusterer = IncidentClusterer(cluster_similarity, metrics=self.metrics) if cluster else None
+        # With several analysis workers, extraction and keyword classification run on a
+        # process pool, since they are CPU-bound and threads would share one core
+        self.parallel_analyzer = None
+        if analysis_workers > 1:
+            self.parallel_analyzer = ParallelAnalyzer(
+                analysis_workers, max_body_chars=max_body_chars, scoring=scoring,
+                ticket_queries=self.gmail_handler.ticket_queries, metrics=self.metrics
+            )
+        # Stage concurrency and queue bounds for scan_gmail_async
+        self.fetch_concurrency = fetch_concurrency
+        self.classify_concurrency = classify_concurrency
+        self.queue_size = queue_size
+        # Incremental scans only process mail added since the last checkpointed run
+        self.checkpoint = CheckpointStore(checkpoint_path) if incremental else None
+        # The ticket store keeps every run's tickets and forward outcomes for reports across runs
+        self.store = TicketStore(store_path) if store else None
+        self.run_id = None
+        # Digest mode sends one message per department; urgent tickets still go out
+        # individually unless digest_urgent is set
+        self.digest = digest
+        self.digest_urgent = digest_urgent
+        self._agent = None  # created on first use, see the agent property
+        # Hybrid mode escalates tickets with low keyword confidence to the LLM (the Strands
+        # agent unless another model callable is given) and caches its verdicts
+        self.hybrid_classifier = None
+        if hybrid:
+            self.hybrid_classifier = HybridClassifier(
+                self.ticket_analyzer,
+                llm_model or self._ask_agent,
+                VerdictCache(llm_cache_path),
+                confidence_threshold=confidence_threshold,
+                batch_size=llm_batch_size,
+                max_in_flight=llm_concurrency
+            )
+        self.inbox = None
         self.tickets = []
         self.summary = {}
+        self.forward_log = None  # forward outcomes and receipt-to-forward times of the last scan
+        self._closed = False
+
+    @property
+    def agent(self) -> "Agent":
+        """
+        The Strands agent, built on first use so keyword-only scans never import strands or boto3.
+        """
+        if self._agent is None:
+            self._agent = self._create_agent()
+        return self._agent
+
+    def _create_agent(self) -> "Agent":
+        from strands import Agent
+        from strands.models import BedrockModel
 
-    def _create_agent(self) -> Agent:
         bedrock_model = BedrockModel(
             model_id="anthropic.claude-3-5-sonnet-20240620-v1:0",
             region_name=self.region,
@@ -57,43 +135,245 @@ class TicketRoutingAgent:
 
         return agent
 
-    def scan_gmail(self) -> List[Dict[str, Any]]:
+    def _ask_agent(self, prompt: str) -> str:
+        return str(self.agent(prompt))
+
+    def scan_gmail(self) -> List[Ticket]:
+        with self.metrics.timer('scan_seconds'):
+            return self._scan_gmail()
+
+    def _scan_gmail(self) -> List[Ticket]:
         if not self.gmail_handler.authenticate():
             logger.error("Gmail authentication failed. Check credentials.")
             return []
 
         logger.info(f"Scanning inbox for bug-related tickets...")
+        if self.store:
+            self.run_id = self.store.start_run()
 
-        all_inbox_emails = self.gmail_handler.get_all_inbox_emails()
-        tickets = self.gmail_handler.query_inbox_for_ticket()
+        # The inbox is streamed once; filtering, extraction and classification
+        # consume it lazily, so classification starts while Gmail is still being listed
+        if self.checkpoint:
+            self.inbox = self.gmail_handler.fetch_new_inbox(self.checkpoint)
+        else:
+            self.inbox = self.gmail_handler.fetch_inbox()
 
         self.processed_tickets = []
+        if self.clusterer:
+            self.clusterer.reset()
+        scheduler = ForwardScheduler(self.gmail_handler, workers=self.gmail_handler.send_workers, metrics=self.metrics)
+        try:
+            return self._analyze_and_forward(scheduler)
+        finally:
+            # Urgent tickets already handed over are still sent if the scan fails
+            scheduler.close()
+
+    def _analyze_and_forward(self, scheduler: ForwardScheduler) -> List[Ticket]:
+        if self.parallel_analyzer:
+            tickets = self._analyze_in_parallel()
+        else:
+            tickets = self.gmail_handler.iter_inbox_tickets(self.inbox)
+            if self.clusterer:
+                tickets = self.clusterer.iter_first_reports(tickets)
+            tickets = self.ticket_analyzer.iter_summaries(self._process_tickets(tickets))
+        forwarded_early = set()
+        self.tickets = list(self._forward_urgent_early(tickets, scheduler, forwarded_early))
+        if self.clusterer:
+            self.clusterer.annotate(self.tickets)
+        if self.hybrid_classifier:
+            stats_before = dict(self.hybrid_classifier.stats)
+            with self.metrics.timer('stage_seconds', stage='hybrid'):
+                self.hybrid_classifier.classify_tickets(self.tickets)
+            self._count_hybrid_events(stats_before)
+        self._summarize_scan()
+        with self.metrics.timer('stage_seconds', stage='forward'):
+            send_now = []
+            held = []
+            for ticket in self.tickets:
+                if ticket.id not in forwarded_early:
+                    (send_now if self.sends_individually(ticket) else held).append(ticket)
+            scheduler.submit(send_now)
+            self.forwarded_tickets = list(scheduler.close())
+            if held:
+                statuses = self.gmail_handler.forward_digest(held, send_urgent_now=False)
+                self.forwarded_tickets += statuses
+                scheduler.log.record_digest(held, statuses)
+        self.forward_log = scheduler.log
+        self._finish_scan()
 
+        return self.tickets
+
+    def sends_individually(self, ticket: Ticket) -> bool:
+        """
+        Check whether a ticket is forwarded on its own rather than held for the digest.
+        """
+        return not self.digest or (ticket.is_urgent and not self.digest_urgent)
+
+    def _forward_urgent_early(self, tickets: Iterable[Ticket], scheduler: ForwardScheduler,
+                              forwarded_early: set) -> Iterator[Ticket]:
+        """
+        Hand urgent tickets to the forward scheduler as soon as they are classified, and yield every ticket.
+
+        Tickets the hybrid classifier may still reclassify wait for the end of
+        the scan with the rest. With clustering, an early forward does not
+        count the reports that arrive after it.
+        """
         for ticket in tickets:
-            issue_summary = self.gmail_handler.extract_issue_summary(ticket)
-            ticket['summary'] = issue_summary
-            
-            # # logs reasoning - optional
-            # analysis_result = self.agent(f"Analyze and classify this issue email: {email_content[:5000]}").message
-            # email['agent_analysis'] = analysis_result
-            # logger.info(f"Analysis result: {analysis_result}")
+            if ticket.is_urgent and self.sends_individually(ticket) and not (
+                    self.hybrid_classifier and self.hybrid_classifier.is_ambiguous(ticket)):
+                scheduler.submit([ticket])
+                forwarded_early.add(ticket.id)
+            yield ticket
 
-            self.processed_tickets.append(ticket)
+    async def scan_gmail_async(self) -> List[Ticket]:
+        """
+        Scan like scan_gmail, with fetching, classification and forwarding overlapped (see AsyncScan).
+
+        Each ticket is forwarded as soon as it is classified, so the first
+        urgent ticket goes out within seconds of the scan starting rather than
+        after the whole inbox. Digests are still sent once the inbox has been
+        read, and ambiguous tickets wait for a round of LLM batches to fill.
+        With clustering, a forward does not count the reports that arrive after
+        it; the returned tickets and the CSV do. analysis_workers is not used.
+        """
+        with self.metrics.timer('scan_seconds'):
+            # Enough threads for every fetch, extraction and send the stages may have in flight,
+            # plus the listing
+            gmail = AsyncGmailHandler(
+                self.gmail_handler,
+                max_threads=self.fetch_concurrency + self.classify_concurrency + 4 * self.gmail_handler.send_workers + 1
+            )
+            try:
+                return await self._scan_gmail_async(gmail)
+            finally:
+                gmail.close()
+
+    async def _scan_gmail_async(self, gmail: AsyncGmailHandler) -> List[Ticket]:
+        if not await gmail.authenticate():
+            logger.error("Gmail authentication failed. Check credentials.")
+            return []
+
+        logger.info(f"Scanning inbox for bug-related tickets...")
+        if self.store:
+            self.run_id = self.store.start_run()
+
+        message_ids = None
+        self.inbox = InboxSnapshot(())
+        if self.checkpoint:
+            message_ids, self.inbox.history_id = await gmail.list_new_message_ids(self.checkpoint.get_history_id())
+            message_ids = self.checkpoint.filter_unprocessed(self.checkpoint.requeue_failed(message_ids))
+        if self.gmail_handler.prefilter:
+            self.inbox.prefilter_stats = {'candidate': 0, 'undecided': 0, 'rejected': 0}
+
+        self.processed_tickets = []
+        if self.clusterer:
+            self.clusterer.reset()
+        if self.hybrid_classifier:
+            stats_before = dict(self.hybrid_classifier.stats)
+
+        scan = AsyncScan(
+            self, gmail, fetch_concurrency=self.fetch_concurrency, classify_concurrency=self.classify_concurrency,
+            send_concurrency=self.gmail_handler.send_workers, queue_size=self.queue_size
+        )
+        self.tickets = await scan.run(message_ids)
+        self.forwarded_tickets = scan.statuses
+        self.forward_log = scan.log
+        self.inbox.tickets = scan.emails
+        self.metrics.count('messages_scanned_total', len(self.inbox))
+        self.metrics.count('ticket_emails_total', len(scan.emails))
+
+        if self.clusterer:
+            self.clusterer.annotate(self.tickets)
+        if self.hybrid_classifier:
+            self._count_hybrid_events(stats_before)
+        self._summarize_scan()
+        self._finish_scan()
+
+        return self.tickets
+
+    def _count_hybrid_events(self, stats_before: dict):
+        logger.info(f"Classified by: {self.hybrid_classifier.stats}")
+        for key, value in self.hybrid_classifier.stats.items():
+            self.metrics.count('hybrid_events_total', value - stats_before.get(key, 0), event=key)
 
-        self.tickets = self.ticket_analyzer.summarize_tickets(self.processed_tickets)
-        self.summary = self.ticket_analyzer.generate_ticket_report(self.tickets)
-        self.forwarded_tickets = self.gmail_handler.forward_classified_emails(self.tickets)
+    def _summarize_scan(self):
+        if self.store:
+            with self.metrics.timer('stage_seconds', stage='store'):
+                self.store.upsert_tickets(self.run_id, self.tickets)
+            with self.metrics.timer('stage_seconds', stage='report'):
+                self.summary = self.store.generate_ticket_report(run_id=self.run_id)
+        else:
+            self.summary = self.ticket_analyzer.generate_ticket_report(self.tickets)
+        self.summary.update(self.inbox.report())
+        for category, count in self.summary['category_breakdown'].items():
+            self.metrics.count('tickets_total', count, category=category)
+        self.metrics.count('urgent_tickets_total', self.summary['urgent_tickets'])
+
+    def _finish_scan(self):
+        """
+        Checkpoint the scanned messages and log what the scan found and forwarded.
+        """
         self.forwarded_tickets_report = "\n".join(self.forwarded_tickets)
+        self.summary['forward_delays'] = self.forward_log.report()
+
+        if self.checkpoint:
+            with self.metrics.timer('stage_seconds', stage='checkpoint'):
+                self.checkpoint.record_scan(self.inbox.message_ids, self.inbox.history_id, self.inbox.failed_ids)
+        if self.store:
+            with self.metrics.timer('stage_seconds', stage='store'):
+                self.store.finish_run(self.run_id, self.summary, self.forward_log.outcomes, self.inbox.history_id)
 
-        logger.info(f"Found {len(all_inbox_emails)} emails in inbox")
-        logger.info(f"Out of which, {len(tickets)} potential bug tickets were identified")
+        logger.info(f"Found {len(self.inbox)} emails in inbox")
+        if self.inbox.failed_ids:
+            retry = "they will be retried by the next scan" if self.checkpoint else "they were skipped"
+            logger.warning(f"{len(self.inbox.failed_ids)} email(s) could not be fetched; {retry}")
+        logger.info(f"Out of which, {len(self.processed_tickets)} potential bug tickets were identified")
+        if self.clusterer:
+            logger.info(f"{self.clusterer.duplicate_reports} duplicate report(s) were folded into those tickets")
 
         logger.info(f"Forwarded Tickets: \n{self.forwarded_tickets_report}") 
+        for priority, delays in self.summary['forward_delays'].items():
+            if delays['forwarded']:
+                logger.info(
+                    f"Receipt to forward ({priority}): median {delays['median_seconds']:.0f}s, "
+                    f"max {delays['max_seconds']:.0f}s over {delays['forwarded']} ticket(s)"
+                )
+            if delays['failed']:
+                logger.warning(f"{delays['failed']} {priority} ticket(s) could not be forwarded")
 
         logger.info(f"Summary:{self.summary}")
         # logger.info(f"Tickets: {self.tickets}") # for debugging
 
-        return self.tickets
+    def _analyze_in_parallel(self) -> Iterator[Ticket]:
+        """
+        Extract, filter, summarize and classify the inbox on the worker processes, yielding tickets in inbox order.
+
+        With clustering, every ticket email is classified on the workers and
+        duplicates' tickets are then dropped here, in inbox order, so the
+        same incidents are formed as in a serial scan.
+        """
+        emails = []
+
+        for email, ticket in self.parallel_analyzer.iter_analyzed(self.inbox):
+            emails.append(email)
+            if self.clusterer and not self.clusterer.is_first_report(email):
+                continue
+            self.processed_tickets.append(email)
+            yield ticket
+
+        self.inbox.tickets = emails
+        self.metrics.count('messages_scanned_total', len(self.inbox))
+        self.metrics.count('ticket_emails_total', len(emails))
+
+    def _process_tickets(self, tickets: Iterable[EmailRecord]) -> Iterator[EmailRecord]:
+        """
+        Attach an issue summary to each ticket email as it streams past.
+        """
+        for ticket in tickets:
+            issue_summary = self.gmail_handler.extract_issue_summary(ticket)
+            ticket['summary'] = issue_summary
+            self.processed_tickets.append(ticket)
+            yield ticket
 
     def export_to_csv(self, filepath: str) -> bool:
         if not self.tickets:
@@ -105,7 +385,7 @@ class TicketRoutingAgent:
 
             with open(filepath, 'w', newline='') as csvfile:
                 fieldnames = [
-                    'subject', 'from', 'date', 'summary', 'department', 'timestamp'
+                    'subject', 'from', 'date', 'summary', 'department', 'timestamp', 'reporter_count'
                 ]
                 writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
                 writer.writeheader()
@@ -122,3 +402,63 @@ class TicketRoutingAgent:
         except Exception as e:
             logger.error(f"Error exporting to CSV: {e}")
             return False
+
+    def generate_history_report(self, since_days: float = None) -> dict:
+        """
+        Report over every stored ticket, or those received in the last since_days days.
+        """
+        since = time.time() - since_days * 86400 if since_days is not None else None
+        return self.store.generate_ticket_report(since=since)
+
+    def export_history(self, filepath: str, since_days: float = None) -> bool:
+        """
+        Stream every stored ticket, or those received in the last since_days days, to CSV or (.jsonl) JSON Lines.
+        """
+        since = time.time() - since_days * 86400 if since_days is not None else None
+        try:
+            written = self.store.export(filepath, since=since)
+            logger.info(f"Exported {written} stored ticket(s) to {filepath}")
+            return True
+
+        except Exception as e:
+            logger.error(f"Error exporting ticket history: {e}")
+            return False
+
+    def export_metrics(self, filepath: str) -> bool:
+        """
+        Write the run's metrics: Prometheus text for a .prom path, otherwise a JSON run report.
+        """
+        if not self.metrics.enabled:
+            logger.warning("Metrics were not enabled for this run")
+            return False
+
+        try:
+            self.metrics.write(filepath)
+            logger.info(f"Exported metrics to {filepath}")
+            return True
+
+        except Exception as e:
+            logger.error(f"Error exporting metrics: {e}")
+            return False
+
+    def close(self):
+        """
+        Shut down the analysis worker processes and close the agent's databases.
+
+        Safe to call more than once; the agent cannot scan again afterwards.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        if self.parallel_analyzer:
+            self.parallel_analyzer.close()
+        # An empty verdict cache is falsy, as it has a length
+        for db in (self.checkpoint, self.store, self.hybrid_classifier and self.hybrid_classifier.cache):
+            if db is not None:
+                db.close()
+
+    def __enter__(self) -> "TicketRoutingAgent":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
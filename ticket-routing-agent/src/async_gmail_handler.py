@@ -0,0 +1,126 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+from .gmail_handler import GmailHandler
+from .records import EmailRecord
+
+
+class AsyncGmailHandler:
+    """
+    Coroutine versions of the GmailHandler calls a scan makes, for use from an asyncio event loop.
+
+    googleapiclient only has a blocking interface, so each call runs on a
+    thread of this handler's own pool while the loop carries on. The threads
+    share the wrapped handler's connection pool, token bucket, retries and
+    metrics, which are all thread-safe, so any number of fetches and sends
+    can be awaited at once; callers bound them per stage.
+    """
+
+    def __init__(self, handler: GmailHandler, max_threads: int = 16):
+        """
+        Args:
+            handler: GmailHandler to run the calls on
+            max_threads: Blocking calls in progress at once, across all stages
+        """
+        self.handler = handler
+        self.executor = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix='gmail-async')
+
+    async def run(self, function, *args, **kwargs):
+        """
+        Await a blocking call on the handler's thread pool.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(function, *args, **kwargs))
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+    async def authenticate(self) -> bool:
+        return await self.run(self.handler.authenticate)
+
+    async def list_new_message_ids(self, start_history_id: str = None) -> Tuple[List[str], str]:
+        """
+        See GmailHandler.list_new_message_ids.
+        """
+        return await self.run(self.handler.list_new_message_ids, start_history_id)
+
+    async def iter_message_id_chunks(self, message_ids: Iterable[str] = None) -> AsyncIterator[List[str]]:
+        """
+        Yield message IDs a Gmail batch at a time, listing result pages as they are needed.
+
+        Args:
+            message_ids: IDs to split up; the messages a scan should look at when None
+
+        Yields:
+            Lists of at most batch_size message IDs
+        """
+        if message_ids is None:
+            message_ids = self.handler.iter_scan_message_ids()
+        message_ids = iter(message_ids)
+        batch_size = self.handler.batch_size
+
+        while True:
+            chunk = await self.run(lambda: list(islice(message_ids, batch_size)))
+            if not chunk:
+                break
+            yield chunk
+
+    async def get_messages(self, message_ids: List[str], prefilter_stats: Dict[str, int] = None) -> List[Dict[str, Any]]:
+        """
+        Fetch messages in full, or through the two-stage filter when the handler prefilters.
+
+        Args:
+            message_ids: Gmail message IDs to retrieve
+            prefilter_stats: Dict the prefilter outcomes are added to
+
+        Returns:
+            Gmail API message objects, in the order of message_ids
+        """
+        if not self.handler.prefilter:
+            return await self.run(self.handler.get_messages, message_ids)
+
+        # Counted on the loop thread, since several fetches run at once
+        stats = {}
+        messages = await self.run(lambda: list(self.handler.iter_prefiltered_messages(message_ids, stats)))
+        if prefilter_stats is not None:
+            for outcome, count in stats.items():
+                prefilter_stats[outcome] = prefilter_stats.get(outcome, 0) + count
+        return messages
+
+    async def extract_tickets(self, messages: List[Dict[str, Any]]) -> List[Optional[EmailRecord]]:
+        """
+        Extract messages and check them against the ticket queries on a worker thread.
+
+        Returns:
+            The extracted email for each ticket-related message and None for the others, in message order
+        """
+        def extract():
+            timer = self.handler.metrics.timer
+            emails = []
+            for message in messages:
+                with timer('extract_seconds'):
+                    email = self.handler.extract_ticket_content(message)
+                with timer('filter_seconds'):
+                    emails.append(email if self.handler.is_ticket(email) else None)
+            return emails
+
+        return await self.run(extract)
+
+    async def forward_classified_emails(self, emails) -> List[str]:
+        """
+        Forward emails to their departments, sending to every recipient at once.
+
+        Returns:
+            One status line per recipient, in email and recipient order
+        """
+        sends = self.handler.compose_forwards(emails)
+        return list(await asyncio.gather(*(self.run(self.handler.forward_email, *send) for send in sends)))
+
+    async def forward_digest(self, emails, send_urgent_now: bool = True) -> List[str]:
+        """
+        See GmailHandler.forward_digest.
+        """
+        return await self.run(self.handler.forward_digest, emails, send_urgent_now)
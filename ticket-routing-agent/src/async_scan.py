@@ -0,0 +1,274 @@
+import time
+import asyncio
+from itertools import count
+from typing import Dict, Iterable, List, Optional
+
+from .async_gmail_handler import AsyncGmailHandler
+from .forward_scheduler import ForwardLog, priority_key
+from .gmail_handler import missing_ids
+from .records import EmailRecord, Ticket
+
+# Default batch fetches, extraction workers and messages/tickets buffered between stages
+DEFAULT_FETCH_CONCURRENCY = 4
+DEFAULT_CLASSIFY_CONCURRENCY = 2
+DEFAULT_QUEUE_SIZE = 200
+
+
+class AsyncScan:
+    """
+    One scan of the inbox as four asyncio stages joined by bounded queues:
+
+        list IDs -> fetch (fetch_concurrency) -> classify (classify_concurrency) -> forward (send_concurrency)
+
+    Each stage starts on its first item instead of waiting for the one before
+    it to finish, so the first tickets are forwarded while later messages are
+    still being listed and fetched. A full queue makes the stage feeding it
+    wait, which bounds memory to about queue_size messages and tickets between
+    stages however large the inbox is. The forward queue is a priority queue,
+    so urgent tickets, then the ones waiting longest, are sent first; only
+    routine tickets count towards its bound, so an urgent one never waits for
+    room behind them.
+
+    Extraction runs on worker threads and may finish out of order; the
+    extracted batches are then deduplicated, clustered and classified on the
+    event loop thread in listing order, so the agent's analyzer and clusterer
+    are only ever used from one thread and the tickets and incidents match a
+    synchronous scan. Batches are only listed while fewer than queue_size
+    messages' worth, plus one per fetch and extraction worker, await their turn,
+    so the batches extracted ahead of a slow one are bounded too.
+    """
+
+    def __init__(self, agent, gmail: AsyncGmailHandler, fetch_concurrency: int = DEFAULT_FETCH_CONCURRENCY,
+                 classify_concurrency: int = DEFAULT_CLASSIFY_CONCURRENCY, send_concurrency: int = 1,
+                 queue_size: int = DEFAULT_QUEUE_SIZE):
+        """
+        Args:
+            agent: TicketRoutingAgent whose analyzer, clusterer, hybrid classifier, digest
+                settings, inbox and metrics the scan uses
+            gmail: AsyncGmailHandler wrapping the agent's GmailHandler
+            fetch_concurrency: Gmail batch fetches in flight at once
+            classify_concurrency: Batches of messages being extracted at once
+            send_concurrency: Tickets being forwarded at once
+            queue_size: Messages (and tickets) buffered between two stages
+        """
+        self.agent = agent
+        self.gmail = gmail
+        self.fetch_concurrency = max(1, fetch_concurrency)
+        self.classify_concurrency = max(1, classify_concurrency)
+        self.send_concurrency = max(1, send_concurrency)
+        self.queue_size = max(1, queue_size)
+        self.emails: List[EmailRecord] = []  # every ticket email, duplicates of an incident included
+        self.tickets: List[Ticket] = []
+        self.statuses: List[str] = []  # forward status lines in priority order, then the digests', set by run
+        self.first_forward_seconds: Optional[float] = None
+        self.first_urgent_forward_seconds: Optional[float] = None
+        self.log = ForwardLog(agent.metrics)
+        self._order = count()  # keeps queued tickets of equal priority in classification order
+        self._extracted: Dict[int, List[Optional[EmailRecord]]] = {}  # extracted batches by listing order
+        self._next_batch = 0
+        self._batch_slots = None  # batches listed but not yet taken for classification, set by run
+        self._draining = False
+        self._seen_ids = set()
+        self._ambiguous: List[Ticket] = []  # awaiting a round of LLM batches
+        self._escalations = []
+        self._digest_tickets: List[Ticket] = []
+        self._sent = []  # ((priority key, queue order), status lines) per ticket, as sends finish
+        self._digest_statuses: List[str] = []
+        self._started = None
+
+    async def run(self, message_ids: Iterable[str] = None) -> List[Ticket]:
+        """
+        Scan the given messages, or every message a scan should look at.
+
+        Returns:
+            Tickets in the order their messages were listed
+        """
+        self._started = time.monotonic()
+        batch_size = self.agent.gmail_handler.batch_size
+        self._escalation_lock = asyncio.Lock()
+
+        id_chunks = asyncio.Queue(maxsize=self.fetch_concurrency)
+        message_chunks = asyncio.Queue(maxsize=max(1, self.queue_size // batch_size))
+        # Bounded by _routine_slots instead, so urgent tickets never wait for room behind routine ones
+        tickets = asyncio.PriorityQueue()
+        self._routine_slots = asyncio.Semaphore(self.queue_size)
+        # Released as each batch is taken in listing order, so extraction cannot run ahead
+        # of a classify stage blocked on the forward queue
+        self._batch_slots = asyncio.Semaphore(
+            max(1, self.queue_size // batch_size) + self.fetch_concurrency + self.classify_concurrency
+        )
+
+        stages = [
+            self._stage(1, lambda: self._list(message_ids, id_chunks), id_chunks, self.fetch_concurrency),
+            self._stage(self.fetch_concurrency, lambda: self._fetch(id_chunks, message_chunks),
+                        message_chunks, self.classify_concurrency),
+            self._stage(self.classify_concurrency, lambda: self._classify(message_chunks, tickets),
+                        tickets, self.send_concurrency, then=lambda: self._finish_classifying(tickets),
+                        # Sorts after every ticket, so the forward stage drains its queue first
+                        stop=lambda: ((2, 0.0), next(self._order), None)),
+            self._stage(self.send_concurrency, lambda: self._forward(tickets)),
+        ]
+        tasks = [asyncio.ensure_future(stage) for stage in stages]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # One failed stage would leave the others blocked on their queues
+            for task in tasks + self._escalations:
+                task.cancel()
+            await asyncio.gather(*tasks, *self._escalations, return_exceptions=True)
+            raise
+
+        # The order a synchronous scan reports them in, as sends finish in any order
+        self.statuses = [status for _, statuses in sorted(self._sent, key=lambda sent: sent[0]) for status in statuses]
+        self.statuses += self._digest_statuses
+        return self.tickets
+
+    async def _stage(self, workers: int, worker, downstream: asyncio.Queue = None, downstream_workers: int = 0,
+                     then=None, stop=lambda: None):
+        """
+        Run a stage's workers to completion, then tell each worker of the next stage to stop.
+        """
+        await asyncio.gather(*(worker() for _ in range(workers)))
+        if then is not None:
+            await then()
+        for _ in range(downstream_workers):
+            await downstream.put(stop())
+
+    ### Stages ###
+
+    async def _list(self, message_ids: Optional[Iterable[str]], id_chunks: asyncio.Queue):
+        sequence = 0
+        async for chunk in self.gmail.iter_message_id_chunks(message_ids):
+            await self._batch_slots.acquire()
+            await id_chunks.put((sequence, chunk))
+            sequence += 1
+
+    async def _fetch(self, id_chunks: asyncio.Queue, message_chunks: asyncio.Queue):
+        inbox = self.agent.inbox
+        while True:
+            item = await id_chunks.get()
+            if item is None:
+                return
+            sequence, chunk = item
+            messages = await self.gmail.get_messages(chunk, inbox.prefilter_stats)
+            inbox.message_ids.extend(message['id'] for message in messages)
+            inbox.failed_ids.extend(missing_ids(chunk, messages))
+            await message_chunks.put((sequence, messages))
+
+    async def _classify(self, message_chunks: asyncio.Queue, tickets: asyncio.Queue):
+        while True:
+            item = await message_chunks.get()
+            if item is None:
+                return
+            sequence, messages = item
+            self._extracted[sequence] = await self.gmail.extract_tickets(messages)
+
+            # One worker at a time takes the batches that are next in order, including
+            # any that finish extracting while it awaits the forward queue
+            if self._draining:
+                continue
+            self._draining = True
+            try:
+                while self._next_batch in self._extracted:
+                    emails = self._extracted.pop(self._next_batch)
+                    self._next_batch += 1
+                    self._batch_slots.release()
+                    await self._summarize(emails, tickets)
+            finally:
+                self._draining = False
+
+    async def _summarize(self, emails: List[Optional[EmailRecord]], tickets: asyncio.Queue):
+        agent = self.agent
+
+        for email in emails:
+            if email is None or email.id in self._seen_ids:
+                continue
+            self._seen_ids.add(email.id)
+            self.emails.append(email)
+
+            if agent.clusterer and not agent.clusterer.is_first_report(email):
+                continue
+
+            email.summary = agent.gmail_handler.extract_issue_summary(email)
+            agent.processed_tickets.append(email)
+            with agent.metrics.timer('classify_seconds'):
+                ticket = agent.ticket_analyzer.summarize_ticket(email)
+            self.tickets.append(ticket)
+            await self._route(ticket, tickets)
+
+    async def _forward(self, tickets: asyncio.Queue):
+        while True:
+            key, order, ticket = await tickets.get()
+            if ticket is None:
+                return
+            if key[0]:
+                self._routine_slots.release()
+            statuses = await self.gmail.forward_classified_emails([ticket])
+            self._sent.append(((key, order), statuses))
+            self.log.record([ticket], dict(zip(ticket.forward_to, statuses)))
+            self._record_forward(ticket)
+
+    ### Routing ###
+
+    async def _route(self, ticket: Ticket, tickets: asyncio.Queue):
+        """
+        Queue a classified ticket for forwarding, unless it must first go to the LLM.
+        """
+        hybrid = self.agent.hybrid_classifier
+        if hybrid:
+            if hybrid.is_ambiguous(ticket):
+                self._ambiguous.append(ticket)
+                # Enough for every prompt the classifier may have in flight
+                if len(self._ambiguous) >= hybrid.batch_size * hybrid.max_in_flight:
+                    self._escalate_ambiguous(tickets)
+                return
+            hybrid.classify_tickets([ticket])  # keeps the keyword verdict and counts it
+
+        await self._dispatch(ticket, tickets)
+
+    def _escalate_ambiguous(self, tickets: asyncio.Queue):
+        batch, self._ambiguous = self._ambiguous, []
+        self._escalations.append(asyncio.ensure_future(self._escalate(batch, tickets)))
+
+    async def _escalate(self, batch: List[Ticket], tickets: asyncio.Queue):
+        # The verdict cache's SQLite connection is used by one thread at a time
+        async with self._escalation_lock:
+            with self.agent.metrics.timer('stage_seconds', stage='hybrid'):
+                await self.gmail.run(self.agent.hybrid_classifier.classify_tickets, batch)
+        for ticket in batch:
+            await self._dispatch(ticket, tickets)
+
+    async def _dispatch(self, ticket: Ticket, tickets: asyncio.Queue):
+        if self.agent.sends_individually(ticket):
+            key = priority_key(ticket)
+            if key[0]:
+                await self._routine_slots.acquire()
+            tickets.put_nowait((key, next(self._order), ticket))
+        else:
+            self._digest_tickets.append(ticket)
+
+    async def _finish_classifying(self, tickets: asyncio.Queue):
+        """
+        Escalate the last ambiguous tickets and send the digests, before the forward stage is told to stop.
+        """
+        if self._ambiguous:
+            self._escalate_ambiguous(tickets)
+        await asyncio.gather(*self._escalations)
+
+        if self._digest_tickets:
+            # In ticket order, as escalated tickets rejoin late
+            order = {ticket.id: index for index, ticket in enumerate(self.tickets)}
+            self._digest_tickets.sort(key=lambda ticket: order[ticket.id])
+            statuses = await self.gmail.forward_digest(self._digest_tickets, send_urgent_now=False)
+            self._digest_statuses.extend(statuses)
+            self.log.record_digest(self._digest_tickets, statuses)
+
+    def _record_forward(self, ticket: Ticket):
+        elapsed = time.monotonic() - self._started
+        metrics = self.agent.metrics
+        if self.first_forward_seconds is None:
+            self.first_forward_seconds = elapsed
+            metrics.observe('first_forward_seconds', elapsed)
+        if ticket.is_urgent and self.first_urgent_forward_seconds is None:
+            self.first_urgent_forward_seconds = elapsed
+            metrics.observe('first_urgent_forward_seconds', elapsed)
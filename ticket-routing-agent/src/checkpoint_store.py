@@ -0,0 +1,126 @@
+import os
+import time
+import sqlite3
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+# SQLite's default limit on bound parameters per statement is 999
+_ID_CHUNK_SIZE = 500
+
+# Scans that retry a message which keeps failing to fetch before it is given up on
+MAX_FETCH_ATTEMPTS = 5
+
+
+class CheckpointStore:
+    """
+    A local SQLite record of the last synced Gmail historyId, the messages already
+    processed and those a scan failed to fetch.
+
+    The history only lists a message once, so a message whose fetch failed is
+    kept here and queued again by the following scans until it is fetched.
+    """
+
+    def __init__(self, db_path: str = None):
+        """
+        Open (or create) the checkpoint database.
+
+        Args:
+            db_path: Path to the SQLite file, defaults to config/checkpoint.db
+        """
+        self.db_path = db_path or os.path.join(
+            Path(__file__).parent.parent, 'config', 'checkpoint.db'
+        )
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS sync_state (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS processed_messages (
+                id TEXT PRIMARY KEY,
+                processed_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS failed_messages (
+                id TEXT PRIMARY KEY,
+                attempts INTEGER NOT NULL,
+                failed_at REAL NOT NULL
+            );
+        """)
+
+    def get_history_id(self) -> Optional[str]:
+        """
+        Returns:
+            The historyId recorded by the last completed scan, or None before the first one
+        """
+        row = self.conn.execute(
+            "SELECT value FROM sync_state WHERE key = 'history_id'"
+        ).fetchone()
+        return row[0] if row else None
+
+    def filter_unprocessed(self, message_ids: List[str]) -> List[str]:
+        """
+        Drop message IDs that an earlier scan already processed.
+
+        Args:
+            message_ids: Gmail message IDs
+
+        Returns:
+            The IDs not yet processed, in their original order
+        """
+        processed = set()
+        for start in range(0, len(message_ids), _ID_CHUNK_SIZE):
+            chunk = message_ids[start:start + _ID_CHUNK_SIZE]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self.conn.execute(
+                f"SELECT id FROM processed_messages WHERE id IN ({placeholders})", chunk
+            )
+            processed.update(row[0] for row in rows)
+
+        return [message_id for message_id in message_ids if message_id not in processed]
+
+    def requeue_failed(self, message_ids: Iterable[str]) -> List[str]:
+        """
+        Put the messages earlier scans failed to fetch in front of message_ids.
+
+        Args:
+            message_ids: Gmail message IDs listed for this scan
+
+        Returns:
+            The failed IDs, oldest failure first, then message_ids, without duplicates
+        """
+        rows = self.conn.execute(
+            "SELECT id FROM failed_messages WHERE attempts < ? ORDER BY failed_at", (MAX_FETCH_ATTEMPTS,)
+        )
+        return list(dict.fromkeys([row[0] for row in rows] + list(message_ids)))
+
+    def record_scan(self, message_ids: List[str], history_id: Optional[str], failed_ids: Iterable[str] = ()):
+        """
+        Mark messages as processed, remember the ones that failed and advance the stored historyId in one transaction.
+
+        Args:
+            message_ids: IDs of the messages handled by the scan
+            history_id: Gmail historyId the next incremental scan should start from
+            failed_ids: IDs of the messages the scan could not fetch, to retry next time
+        """
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO processed_messages (id, processed_at) VALUES (?, ?)",
+                [(message_id, now) for message_id in message_ids]
+            )
+            self.conn.executemany(
+                "DELETE FROM failed_messages WHERE id = ?", [(message_id,) for message_id in message_ids]
+            )
+            self.conn.executemany(
+                "INSERT INTO failed_messages (id, attempts, failed_at) VALUES (?, 1, ?) "
+                "ON CONFLICT (id) DO UPDATE SET attempts = attempts + 1, failed_at = excluded.failed_at",
+                [(message_id, now) for message_id in failed_ids]
+            )
+            if history_id is not None:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO sync_state (key, value) VALUES ('history_id', ?)",
+                    (str(history_id),)
+                )
+
+    def close(self):
+        self.conn.close()
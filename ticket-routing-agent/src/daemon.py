@@ -0,0 +1,277 @@
+import json
+import time
+import base64
+import random
+import signal
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, Optional
+from urllib.parse import urlparse, parse_qs
+
+logger = logging.getLogger('ticket_routing_agent')
+
+# Default seconds between scheduled scans
+DEFAULT_INTERVAL = 300
+
+# Scheduled scans start up to this fraction of the interval early or late, so
+# several daemons sharing a Gmail project do not poll in lockstep
+DEFAULT_JITTER = 0.1
+
+# Least seconds between the end of one scan and a push-triggered scan; Gmail may
+# notify once per delivered message, and a burst should cost one scan, not one each
+DEFAULT_PUSH_DEBOUNCE = 5
+
+
+def pubsub_envelope(email_address: str, history_id: str) -> Dict[str, Any]:
+    """
+    Build the body Cloud Pub/Sub posts to a push endpoint for a Gmail watch() notification.
+
+    Args:
+        email_address: Mailbox the notification is for
+        history_id: Mailbox historyId after the change
+
+    Returns:
+        Push request body, as JSON-serializable dict
+    """
+    data = json.dumps({'emailAddress': email_address, 'historyId': history_id}).encode()
+    return {
+        'message': {
+            'data': base64.b64encode(data).decode(),
+            'messageId': str(random.getrandbits(48)),
+        },
+        'subscription': 'projects/local/subscriptions/gmail-push',
+    }
+
+
+def parse_push_notification(body: bytes) -> Optional[Dict[str, Any]]:
+    """
+    Decode the Gmail notification inside a Pub/Sub push request body.
+
+    Args:
+        body: Raw request body
+
+    Returns:
+        Dict with emailAddress and historyId, or None if the body is not a Gmail notification
+    """
+    try:
+        message = json.loads(body)['message']
+        notification = json.loads(base64.b64decode(message['data']))
+    except (ValueError, KeyError, TypeError):
+        return None
+    if not isinstance(notification, dict) or 'historyId' not in notification:
+        return None
+    return notification
+
+
+class _PushHandler(BaseHTTPRequestHandler):
+    """
+    Acknowledges Pub/Sub push requests at once and wakes the daemon; the scan runs on its own thread.
+    """
+
+    def do_POST(self):
+        daemon = self.server.scan_daemon
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length)
+
+        token = parse_qs(urlparse(self.path).query).get('token', [None])[0]
+        if daemon.push_token and token != daemon.push_token:
+            self.send_response(403)
+            self.end_headers()
+            return
+
+        notification = parse_push_notification(body)
+        if notification is None:
+            # Pub/Sub redelivers on any non-2xx answer, which would not make a bad body valid
+            self.send_response(400)
+            self.end_headers()
+            return
+
+        self.send_response(204)
+        self.end_headers()
+        daemon.notify(notification)
+
+    def log_message(self, format, *args):
+        logger.debug(f"Push endpoint: {format % args}")
+
+
+class ScanDaemon:
+    """
+    Runs incremental scans of one warm TicketRoutingAgent until stopped: on a
+    jittered interval and, with a push port, whenever Gmail notifies a change.
+
+    Scans never overlap. Notifications arriving during a scan are coalesced
+    into a single follow-up scan, and a scan that overruns the interval is
+    followed by one immediate scan rather than by every tick it missed.
+    """
+
+    def __init__(self, agent, interval: float = DEFAULT_INTERVAL, jitter: float = DEFAULT_JITTER,
+                 push_port: int = None, push_host: str = '127.0.0.1', push_token: str = None,
+                 push_debounce: float = DEFAULT_PUSH_DEBOUNCE, on_scan=None):
+        """
+        Args:
+            agent: TicketRoutingAgent with incremental scanning enabled
+            interval: Seconds between the starts of scheduled scans
+            jitter: Fraction of the interval each wait is randomly lengthened or shortened by
+            push_port: Port to accept Pub/Sub push notifications on (None disables the endpoint, 0 picks one)
+            push_host: Address the push endpoint binds to
+            push_token: Shared secret push requests must carry as ?token=
+            push_debounce: Least seconds between the end of a scan and a push-triggered scan
+            on_scan: Called with the agent after each successful scan, e.g. to export results
+        """
+        if agent.checkpoint is None:
+            raise ValueError("Daemon mode needs an incremental agent, or every scan would forward the whole inbox again")
+
+        self.agent = agent
+        self.interval = interval
+        self.jitter = jitter
+        self.push_port = push_port
+        self.push_host = push_host
+        self.push_token = push_token
+        self.push_debounce = push_debounce
+        self.on_scan = on_scan
+        self.server = None
+        self.stopping = threading.Event()
+        self.wakeup = threading.Event()  # set by push notifications and stop()
+        self.lock = threading.Lock()
+        self.notified_history_id = 0  # highest historyId push notifications have announced
+        self.last_scan_ended = None
+        self.scans = 0
+        self.failures = 0
+        self.notifications = 0
+
+    def run(self):
+        """
+        Scan until stop() is called or SIGINT/SIGTERM arrives, then finish the running scan, close the agent and return.
+        """
+        if threading.current_thread() is threading.main_thread():
+            previous_handlers = {sig: signal.signal(sig, self._handle_signal) for sig in (signal.SIGINT, signal.SIGTERM)}
+        else:
+            previous_handlers = {}
+
+        if self.push_port is not None:
+            self.start_push_server()
+
+        try:
+            next_scan = time.monotonic()  # scan once at startup
+            while not self.stopping.is_set():
+                if self.wakeup.wait(max(0.0, next_scan - time.monotonic())):
+                    if self.stopping.is_set():
+                        break
+                    # Let a burst of notifications settle, then serve all of them with one scan
+                    if self.stopping.wait(self._debounce_remaining()):
+                        break
+                    reason = 'push'
+                else:
+                    reason = 'schedule'
+
+                self.wakeup.clear()
+                started = time.monotonic()
+                self.scan_once(reason)
+                elapsed = time.monotonic() - started
+                self.last_scan_ended = time.monotonic()
+                self._drop_covered_notifications()
+
+                if elapsed > self.interval:
+                    logger.warning(f"Scan took {elapsed:.1f}s, longer than the {self.interval:g}s interval; "
+                                   f"scanning again now instead of catching up on missed runs")
+                next_scan = started + self._next_wait()
+        finally:
+            self.stop_push_server()
+            # The warm agent is only kept for the daemon's scans
+            self.agent.close()
+            for sig, handler in previous_handlers.items():
+                signal.signal(sig, handler)
+            logger.info(f"Daemon stopped after {self.scans} scan(s), {self.failures} failed")
+
+    def scan_once(self, reason: str = 'manual'):
+        """
+        Run one scan, logging rather than raising its errors so the daemon keeps running.
+        """
+        logger.info(f"Starting {reason} scan")
+        try:
+            tickets = self.agent.scan_gmail()
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"Scan failed: {e}")
+            return
+
+        self.scans += 1
+        logger.info(f"Scan complete: {len(tickets)} new ticket(s)")
+        if self.on_scan:
+            self.on_scan(self.agent)
+
+    def notify(self, notification: Dict[str, Any] = None):
+        """
+        Request a scan soon, e.g. for a Gmail push notification. Safe to call from any thread.
+        """
+        logger.debug(f"Push notification: {notification}")
+        with self.lock:
+            self.notifications += 1
+            history_id = _history_id(notification)
+            self.notified_history_id = max(self.notified_history_id, history_id or 0)
+            self.wakeup.set()
+
+    def stop(self):
+        """
+        Ask the daemon to stop once the running scan, if any, has finished. Safe to call from any thread.
+        """
+        self.stopping.set()
+        self.wakeup.set()
+
+    def _drop_covered_notifications(self):
+        """
+        Forget notifications that arrived during the scan but announced changes it already read.
+
+        Gmail notifies after the change is recorded, so a notification often lands just
+        after the scan read the mailbox historyId; a follow-up scan would find nothing.
+        """
+        inbox = self.agent.inbox
+        covered = _history_id({'historyId': inbox.history_id}) if inbox is not None else None
+        with self.lock:
+            if covered is not None and self.notified_history_id <= covered and not self.stopping.is_set():
+                self.wakeup.clear()
+
+    def _handle_signal(self, signum, frame):
+        logger.info(f"Received {signal.Signals(signum).name}, stopping after the current scan")
+        self.stop()
+        # A second signal falls back to the default handler, e.g. to interrupt a hung scan
+        signal.signal(signum, signal.SIG_DFL)
+
+    def _next_wait(self) -> float:
+        return self.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _debounce_remaining(self) -> float:
+        if self.last_scan_ended is None:
+            return 0.0
+        return max(0.0, self.last_scan_ended + self.push_debounce - time.monotonic())
+
+    ### Push Endpoint ###
+
+    def start_push_server(self) -> int:
+        """
+        Serve the push endpoint on a background thread.
+
+        Returns:
+            Port the endpoint listens on
+        """
+        self.server = ThreadingHTTPServer((self.push_host, self.push_port), _PushHandler)
+        self.server.daemon_threads = True
+        self.server.scan_daemon = self
+        threading.Thread(target=self.server.serve_forever, name='push-endpoint', daemon=True).start()
+        port = self.server.server_address[1]
+        logger.info(f"Accepting push notifications on http://{self.push_host}:{port}/")
+        return port
+
+    def stop_push_server(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+def _history_id(notification: Optional[Dict[str, Any]]) -> Optional[int]:
+    try:
+        return int(notification['historyId'])
+    except (TypeError, KeyError, ValueError):
+        return None
@@ -0,0 +1,183 @@
+import time
+import threading
+from datetime import datetime
+from itertools import count
+from queue import PriorityQueue
+from statistics import median
+from typing import Any, Dict, Iterable, List, Tuple
+
+from .metrics import Metrics, NULL_METRICS
+
+# Priority classes, in the order their tickets are forwarded
+URGENT = 'urgent'
+NORMAL = 'normal'
+
+# Sorts after every ticket, so workers stop only once the queue is drained
+_STOP = (2, 0.0)
+
+
+def priority_class(ticket) -> str:
+    return URGENT if ticket.get('is_urgent') is True else NORMAL
+
+
+def received_at(ticket) -> float:
+    """
+    Seconds since the epoch at which a ticket's email was received.
+    """
+    timestamp = ticket.get('timestamp')
+    if isinstance(timestamp, datetime):
+        return timestamp.timestamp()
+    return float(timestamp or 0)
+
+
+def priority_key(ticket) -> Tuple[int, float]:
+    """
+    Sort key putting urgent tickets first and, within each class, the ones waiting longest.
+    """
+    return (0 if priority_class(ticket) == URGENT else 1, received_at(ticket))
+
+
+class ForwardLog:
+    """
+    The outcome of each forward and the ticket's time from receipt to forward, by priority class.
+
+    A ticket counts as forwarded once any of its departments received it; one
+    whose sends all failed is counted as failed and adds no delay.
+    """
+
+    def __init__(self, metrics: Metrics = None):
+        """
+        Args:
+            metrics: Metrics to add each delay to, as the forward_delay_seconds histogram
+        """
+        self.metrics = metrics or NULL_METRICS
+        self.delays = {URGENT: [], NORMAL: []}
+        self.failed = {URGENT: 0, NORMAL: 0}
+        # (ticket id, recipient, forwarded at, delivered, status line)
+        self.outcomes: List[Tuple[str, str, float, bool, str]] = []
+        self.lock = threading.Lock()
+
+    def record(self, tickets: Iterable[Any], statuses: Dict[str, str] = None):
+        """
+        Record tickets as forwarded now.
+
+        Args:
+            tickets: Forwarded tickets
+            statuses: ForwardStatus of the send to each recipient, as GmailHandler returns them
+        """
+        now = time.time()
+        statuses = statuses or {}
+        for ticket in tickets:
+            priority = priority_class(ticket)
+            delay = max(0.0, now - received_at(ticket))
+            recipients = ticket.get('forward_to', [])
+            sent = [getattr(statuses.get(recipient), 'delivered', False) for recipient in recipients]
+            delivered = any(sent)
+            with self.lock:
+                if delivered:
+                    self.delays[priority].append(delay)
+                else:
+                    self.failed[priority] += 1
+                for recipient, accepted in zip(recipients, sent):
+                    self.outcomes.append((ticket.get('id'), recipient, now, accepted, statuses.get(recipient, '')))
+            if delivered:
+                self.metrics.observe('forward_delay_seconds', delay, priority=priority)
+
+    def record_digest(self, tickets: List[Any], statuses: List[str]):
+        """
+        Record tickets as forwarded in the digests GmailHandler.forward_digest just sent.
+        """
+        # One digest per recipient, in the order the recipients first appear
+        recipients = dict.fromkeys(recipient for ticket in tickets for recipient in ticket.get('forward_to', []))
+        self.record(tickets, dict(zip(recipients, statuses)))
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        """
+        Forwarded and failed tickets, and the median and longest delay in seconds of the
+        forwarded ones, per priority class that had any.
+        """
+        with self.lock:
+            delays = {priority: list(values) for priority, values in self.delays.items()}
+            failed = dict(self.failed)
+
+        report = {}
+        for priority, values in delays.items():
+            if not values and not failed[priority]:
+                continue
+            report[priority] = {'forwarded': len(values), 'failed': failed[priority]}
+            if values:
+                report[priority].update(median_seconds=median(values), max_seconds=max(values))
+        return report
+
+
+class ForwardScheduler:
+    """
+    Forwards tickets from a priority queue on worker threads: urgent tickets
+    first and, within each class, the ones waiting longest.
+
+    Tickets can be submitted while a scan is still classifying, so urgent ones
+    are sent as soon as they are known instead of after the whole inbox, and
+    a free worker always takes the most pressing ticket queued so far rather
+    than the next one in inbox order.
+    """
+
+    def __init__(self, handler, workers: int = 1, metrics: Metrics = None):
+        """
+        Args:
+            handler: GmailHandler to compose and send the forwards with
+            workers: Tickets being forwarded at once
+            metrics: Metrics to record receipt-to-forward delays in
+        """
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.log = ForwardLog(metrics)
+        self.statuses: List[str] = []  # one line per recipient, in priority order once closed
+        self._sent = []  # ((priority key, submission order), status lines) per ticket, as sends finish
+        self._queue = PriorityQueue()
+        self._order = count()  # keeps tickets of equal priority in submission order
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def submit(self, tickets: Iterable[Any]):
+        """
+        Queue tickets for forwarding, starting the workers on first use.
+        """
+        if not self._threads:
+            self._threads = [
+                threading.Thread(target=self._work, name=f"forward-{number}", daemon=True)
+                for number in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+
+        # Most pressing first, so a worker that is already waiting takes the right one
+        for ticket in sorted(tickets, key=priority_key):
+            self._queue.put((priority_key(ticket), next(self._order), ticket))
+
+    def close(self) -> List[str]:
+        """
+        Wait until every submitted ticket has been forwarded and stop the workers.
+
+        Returns:
+            One status line per recipient, urgent tickets first and the longest waiting
+            first within each class, as forward_classified_emails returns them
+        """
+        for _ in self._threads:
+            self._queue.put((_STOP, next(self._order), None))
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        # Sends finish in any order across workers
+        self.statuses = [status for _, statuses in sorted(self._sent, key=lambda sent: sent[0]) for status in statuses]
+        return self.statuses
+
+    def _work(self):
+        while True:
+            key, order, ticket = self._queue.get()
+            if ticket is None:
+                return
+            sends = self.handler.compose_forwards([ticket])
+            statuses = [self.handler.forward_email(*send) for send in sends]
+            self.log.record([ticket], {recipient: status for (_, recipient, _, _), status in zip(sends, statuses)})
+            with self._lock:
+                self._sent.append(((key, order), statuses))
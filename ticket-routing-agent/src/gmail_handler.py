@@ -1,36 +1,154 @@
 import os
+import html
+import time
 import base64
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from itertools import islice
 from pathlib import Path
-from typing import List, Dict, Any
-
-import html2text
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+from typing import List, Dict, Any, Iterable, Iterator, Tuple
 
 import base64
 from email.mime.text import MIMEText
 
+from .forward_scheduler import priority_key
+from .keyword_matcher import KeywordMatcher
+from .metrics import Metrics, NULL_METRICS
+from .mime_extractor import MimeExtractor
+from .rate_limiter import TokenBucket
+from .records import EmailRecord
+from .search_query import compile_search_queries
+from .transport import PooledHttp, DEFAULT_CONNECT_TIMEOUT, DEFAULT_POOL_SIZE, DEFAULT_READ_TIMEOUT
+
 # Define the scopes required for Gmail API
 SCOPES = [
     'https://www.googleapis.com/auth/gmail.readonly', # Read emails for classification
     'https://www.googleapis.com/auth/gmail.compose',  # Compose and send forwarded emails
 ]
 
+# Gmail accepts at most 100 calls in a single batch HTTP request
+MAX_BATCH_SIZE = 100
+
+# Gmail recommends at most 50 calls per batch, as larger ones trip its per-user rate limit
+DEFAULT_BATCH_SIZE = 50
+
+# Largest page messages().list will return
+LIST_PAGE_SIZE = 500
+
+# messages.send costs 100 of the 250 quota units a user may spend per second
+SEND_RATE = 2.5
+
+# Gmail quota units charged per call, by method
+QUOTA_UNITS = {
+    'messages.list': 5,
+    'messages.get': 5,
+    'messages.send': 100,
+    'history.list': 2,
+    'getProfile': 1,
+}
+
+# Access tokens are refreshed in the background this many seconds before they expire
+TOKEN_REFRESH_MARGIN = 300
+
+# Delay before retrying a failed background token refresh
+TOKEN_REFRESH_RETRY = 60
+
+# Responses worth retrying: rate limiting and transient server errors
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+# Gmail cuts snippets at about 200 characters, so a shorter one holds the whole body text
+FULL_SNIPPET_LENGTH = 180
+
+
+class ForwardStatus(str):
+    """
+    The status line of one forwarded email, which also records whether Gmail accepted it.
+
+    It is a str so lists of statuses print and join as before.
+    """
+
+    def __new__(cls, line: str, delivered: bool):
+        status = super().__new__(cls, line)
+        status.delivered = delivered
+        return status
+
+
+class InboxSnapshot:
+    """
+    The inbox messages seen during one scan, shared by every pipeline stage.
+
+    Messages are streamed through the snapshot once and are not retained; it
+    keeps only their IDs and, after filtering, the ticket-related emails.
+    """
+
+    def __init__(self, messages: Iterable[Dict[str, Any]]):
+        """
+        Args:
+            messages: Gmail API messages in 'full' format, typically a lazy generator
+        """
+        self._messages = messages
+        self.message_ids = []  # IDs of every message streamed so far
+        self.tickets = None  # ticket-related emails, filled by query_inbox_for_ticket
+        self.history_id = None  # mailbox historyId at fetch time, set by incremental syncs
+        self.prefilter_stats = None  # stage-one outcome counts, set when the handler prefilters
+        self.failed_ids = []  # IDs of messages that could not be fetched, retried by the next incremental scan
+
+    def __len__(self) -> int:
+        return len(self.message_ids)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        """
+        Yield each message once, recording its ID.
+        """
+        messages, self._messages = self._messages, ()
+        for message in messages:
+            self.message_ids.append(message['id'])
+            yield message
+
+    def report(self) -> Dict[str, int]:
+        """
+        Counts for this snapshot, computed without further API calls.
+        """
+        report = {
+            'inbox_emails': len(self.message_ids),
+            'ticket_emails': len(self.tickets) if self.tickets is not None else 0,
+        }
+        if self.prefilter_stats is not None:
+            report.update({f"prefilter_{outcome}": count for outcome, count in self.prefilter_stats.items()})
+        return report
+
 
 class GmailHandler:
     """ 
     A class to handle Gmail API authentication, scan for bug tickets, and forward tickets to relevant departments.
     """
     
-    def __init__(self, credentials_path: str = None, token_path: str = None):
+    def __init__(self, credentials_path: str = None, token_path: str = None, batch_size: int = DEFAULT_BATCH_SIZE,
+                 send_workers: int = 1, send_rate: float = SEND_RATE, send_burst: int = 5, max_retries: int = 5,
+                 max_body_chars: int = None, prefilter: bool = False, search: bool = False,
+                 newer_than_days: int = None, metrics: Metrics = None, pool_size: int = None,
+                 connect_timeout: float = DEFAULT_CONNECT_TIMEOUT, read_timeout: float = DEFAULT_READ_TIMEOUT):
         """
         Initialize the agent for classifying bug tickets into development departments.
         
         Args:
             credentials_path: Path to the credentials.json file
             token_path: Path to the token.json file
+            batch_size: Messages fetched per Gmail batch request (1 disables batching)
+            send_workers: Forwarded emails sent concurrently (1 sends them one by one)
+            send_rate: Sustained sends per second allowed across all workers
+            send_burst: Sends allowed back to back before send_rate applies
+            max_retries: Retries of a request answered with 429 or 5xx
+            max_body_chars: Keep only this much of each email body (None keeps all of it)
+            prefilter: Fetch subjects and snippets first and download full messages only when needed
+            search: Let Gmail search for the ticket queries instead of listing the whole inbox
+            newer_than_days: Only scan mail received in this many days
+            metrics: Records API calls, quota units, retries and per-message latency (off when None)
+            pool_size: Gmail connections kept open for reuse (default: enough for every send worker, at least 10)
+            connect_timeout: Seconds to wait for a connection to Gmail
+            read_timeout: Seconds to wait for each read from Gmail
         """
 
         self.credentials_path = credentials_path or os.path.join(
@@ -40,6 +158,23 @@ class GmailHandler:
             Path(__file__).parent.parent, 'config', 'token.json'
         )
         self.service = None
+        self.credentials = None
+        self._auth_lock = threading.Lock()
+        self._refresh_timer = None
+        self.batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+        self.send_workers = max(1, send_workers)
+        self.http = None  # shared connection pool, created by authenticate
+        self.pool_size = pool_size or max(DEFAULT_POOL_SIZE, self.send_workers + 1)
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.send_limiter = TokenBucket(send_rate, send_burst)
+        self.max_retries = max_retries
+        self.retry_base_delay = 0.5
+        self.extractor = MimeExtractor(max_chars=max_body_chars)
+        self.prefilter = prefilter
+        self.search = search
+        self.newer_than_days = newer_than_days
+        self.metrics = metrics or NULL_METRICS
 
         # Define search queries for finding bug report emails
         self.ticket_queries = [
@@ -61,6 +196,7 @@ class GmailHandler:
             "page not loading",
             "site is down"
         ]
+        self.ticket_matcher = KeywordMatcher({'ticket': self.ticket_queries})
         
         # Define keywords or categories to help classify tickets
         self.classification_keywords = {
@@ -71,98 +207,170 @@ class GmailHandler:
         }
 
     ### Authenticate Email ###
-    
+
+    @property
+    def service(self):
+        """
+        The Gmail API service. Setting it also caches its users(), messages() and history()
+        collections: googleapiclient builds each one anew from the discovery document on
+        every call, which costs about 2 ms per request made through the full chain.
+        """
+        return self._service
+
+    @service.setter
+    def service(self, service):
+        self._service = service
+        self.users_api = service.users() if service is not None else None
+        self.messages_api = self.users_api.messages() if service is not None else None
+        self.history_api = self.users_api.history() if service is not None else None
+
     def authenticate(self) -> bool:
         """
         Authenticate with the Gmail API using OAuth2.
+
+        The credentials and service are kept on the handler, so later calls return
+        at once while the access token is valid; it is refreshed in the background
+        shortly before it expires.
         
         Returns:
             bool: True if authentication was successful, False otherwise
         """
-        creds = None
-        
-        # Check if token.json exists with valid credentials
-        if os.path.exists(self.token_path):
-            creds = Credentials.from_authorized_user_info(
-                eval(open(self.token_path, 'r').read()), SCOPES
-            )
-        
-        # If credentials don't exist or are invalid, refresh or get new ones
-        if not creds or not creds.valid:
-            if creds and creds.expired and creds.refresh_token:
-                creds.refresh(Request())
-            else:
-                if not os.path.exists(self.credentials_path):
-                    return False
-                
-                flow = InstalledAppFlow.from_client_secrets_file(
-                    self.credentials_path, SCOPES
+        if self.service is not None and self.credentials is not None and self.credentials.valid:
+            return True
+
+        with self._auth_lock:
+            # The Google client libraries are slow to import; only load them once they are needed
+            from google.auth.transport.requests import Request
+            from google.oauth2.credentials import Credentials
+            from google_auth_oauthlib.flow import InstalledAppFlow
+            from googleapiclient.discovery import build
+
+            creds = self.credentials
+
+            # Check if token.json exists with valid credentials
+            if creds is None and os.path.exists(self.token_path):
+                creds = Credentials.from_authorized_user_file(self.token_path, SCOPES)
+
+            # If credentials don't exist or are invalid, refresh or get new ones
+            if not creds or not creds.valid:
+                if creds and creds.expired and creds.refresh_token:
+                    creds.refresh(Request())
+                else:
+                    if not os.path.exists(self.credentials_path):
+                        return False
+
+                    flow = InstalledAppFlow.from_client_secrets_file(
+                        self.credentials_path, SCOPES
+                    )
+                    creds = flow.run_local_server(port=0)
+
+                # Save the credentials for future use
+                self._save_credentials(creds)
+
+            # Build the Gmail API service from the discovery document bundled with
+            # google-api-python-client rather than fetching it; a refreshed token
+            # keeps the service, which holds the same credentials object
+            if self.service is None or creds is not self.credentials:
+                if self.http is not None:
+                    self.http.close()
+                self.credentials = creds
+                self.http = PooledHttp(
+                    creds, pool_size=self.pool_size,
+                    connect_timeout=self.connect_timeout, read_timeout=self.read_timeout
                 )
-                creds = flow.run_local_server(port=0)
-            
-            # Save the credentials for future use
-            with open(self.token_path, 'w') as token:
-                token.write(str(creds.to_json()))
-        
-        # Build the Gmail API service
-        self.service = build('gmail', 'v1', credentials=creds)
+                self.service = build('gmail', 'v1', http=self.http, static_discovery=True, cache_discovery=False)
+
+        self._schedule_refresh()
         return True
+
+    def _save_credentials(self, creds):
+        """
+        Write credentials to token.json, replacing the file atomically so a crash cannot truncate it.
+        """
+        temp_path = f"{self.token_path}.tmp"
+        with open(temp_path, 'w') as token:
+            token.write(creds.to_json())
+        os.replace(temp_path, self.token_path)
+
+    def _schedule_refresh(self, delay: float = None):
+        """
+        Start a background timer refreshing the access token TOKEN_REFRESH_MARGIN seconds before it expires.
+
+        Args:
+            delay: Seconds to wait instead, e.g. before retrying a failed refresh
+        """
+        creds = self.credentials
+        if self._refresh_timer is not None:
+            self._refresh_timer.cancel()
+            self._refresh_timer = None
+        if creds is None or not creds.refresh_token or creds.expiry is None:
+            return
+
+        if delay is None:
+            # google-auth keeps expiry as a naive UTC datetime
+            now = datetime.now(timezone.utc).replace(tzinfo=None)
+            delay = max(0.0, (creds.expiry - now).total_seconds() - TOKEN_REFRESH_MARGIN)
+
+        self._refresh_timer = threading.Timer(delay, self._refresh_in_background)
+        self._refresh_timer.daemon = True
+        self._refresh_timer.start()
+
+    def _refresh_in_background(self):
+        from google.auth.transport.requests import Request
+
+        try:
+            with self._auth_lock:
+                self.credentials.refresh(Request())
+                self._save_credentials(self.credentials)
+        except Exception as e:
+            # Requests still refresh an expired token themselves, so a failure here only costs latency
+            print(f"Background token refresh failed, retrying in {TOKEN_REFRESH_RETRY}s: {e}")
+            self._schedule_refresh(TOKEN_REFRESH_RETRY)
+            return
+
+        self._schedule_refresh()
+
+    def _execute_with_retry(self, request, method: str):
+        """
+        Execute an API request, retrying 429 and 5xx responses with exponential backoff and jitter.
+        """
+        from googleapiclient.errors import HttpError
+
+        for attempt in range(self.max_retries + 1):
+            self._record_calls(method)
+            try:
+                with self.metrics.timer('gmail_request_seconds', method=method):
+                    return request.execute()
+            except HttpError as e:
+                self.metrics.count('gmail_errors_total', method=method, status=e.resp.status)
+                if e.resp.status not in RETRYABLE_STATUSES or attempt == self.max_retries:
+                    raise
+                self.metrics.count('gmail_retries_total', method=method)
+                time.sleep(self.retry_base_delay * 2 ** attempt * random.uniform(1, 2))
+
+    def _call(self, method: str, request):
+        """
+        Execute an API request once, recording its latency, quota units and any error.
+        """
+        self._record_calls(method)
+        try:
+            with self.metrics.timer('gmail_request_seconds', method=method):
+                return request.execute()
+        except Exception as e:
+            self.metrics.count('gmail_errors_total', method=method, status=_error_status(e))
+            raise
+
+    def _record_calls(self, method: str, calls: int = 1):
+        self.metrics.count('gmail_calls_total', calls, method=method)
+        self.metrics.count('gmail_quota_units_total', calls * QUOTA_UNITS[method], method=method)
     
     ### Retrieve Emails from Inbox ###
     
-    def extract_email_content(self, message: Dict[str, Any]) -> Dict[str, Any]:
+    def extract_email_content(self, message: Dict[str, Any]) -> EmailRecord:
         """
-        Extract relevant content from an email message.
-        
-        Args:
-            message: Gmail API message object
-            
-        Returns:
-            Dictionary with extracted email content
+        Same as extract_ticket_content.
         """
-        headers = {header['name']: header['value'] for header in message['payload']['headers']}
-        
-        # Extract basic email metadata
-        email_data = {
-            'id': message['id'],
-            'thread_id': message['threadId'],
-            'subject': headers.get('Subject', ''),
-            'from': headers.get('From', ''),
-            'to': headers.get('To', ''),
-            'date': headers.get('Date', ''),
-            'timestamp': int(message['internalDate']) / 1000,  # Convert to seconds
-            'body_text': '',
-            'body_html': ''
-        }
-        
-        # Extract email body
-        if 'parts' in message['payload']:
-            for part in message['payload']['parts']:
-                if part['mimeType'] == 'text/plain':
-                    if 'data' in part['body']:
-                        email_data['body_text'] = base64.urlsafe_b64decode(
-                            part['body']['data']).decode('utf-8')
-                elif part['mimeType'] == 'text/html':
-                    if 'data' in part['body']:
-                        email_data['body_html'] = base64.urlsafe_b64decode(
-                            part['body']['data']).decode('utf-8')
-        elif 'body' in message['payload'] and 'data' in message['payload']['body']:
-            # Handle single-part messages
-            data = message['payload']['body']['data']
-            decoded_data = base64.urlsafe_b64decode(data).decode('utf-8')
-            
-            if message['payload']['mimeType'] == 'text/plain':
-                email_data['body_text'] = decoded_data
-            elif message['payload']['mimeType'] == 'text/html':
-                email_data['body_html'] = decoded_data
-        
-        # If we have HTML but no plain text, convert HTML to text
-        if not email_data['body_text'] and email_data['body_html']:
-            h = html2text.HTML2Text()
-            h.ignore_links = False
-            email_data['body_text'] = h.handle(email_data['body_html'])
-        
-        return email_data
+        return self.extract_ticket_content(message)
                
     def get_all_inbox_emails(self):
         """
@@ -172,52 +380,476 @@ class GmailHandler:
             List[Dict[str, Any]]: List of email message dictionaries.
         """
         try:
-            response = self.service.users().messages().list(userId='me', labelIds=['INBOX']).execute()
-            
-            messages = response.get('messages', [])
+            return list(self.iter_inbox_messages())
+
+        except Exception as e:
+            print(f"An error occurred: {e}")
+            return -100
+
+    def iter_inbox_message_ids(self, query: str = None) -> Iterator[str]:
+        """
+        Yield the IDs of the messages in the user's inbox, following every result page.
+
+        Args:
+            query: Gmail search query the messages must match
+
+        Yields:
+            Gmail message IDs
+        """
+        page_token = None
+
+        while True:
+            response = self._call('messages.list', self.messages_api.list(
+                userId='me', labelIds=['INBOX'], q=query, maxResults=LIST_PAGE_SIZE, pageToken=page_token
+            ))
+
+            for message in response.get('messages', []):
+                yield message['id']
+
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                break
+
+    def list_inbox_message_ids(self) -> List[str]:
+        """
+        List the IDs of the messages in the user's inbox.
+
+        Returns:
+            List of Gmail message IDs
+        """
+        return list(self.iter_inbox_message_ids())
+
+    def iter_scan_message_ids(self) -> Iterator[str]:
+        """
+        Yield the IDs of the inbox messages a scan should look at: those matching the
+        ticket queries in search mode, otherwise all of them, within newer_than_days if set.
+
+        Yields:
+            Gmail message IDs
+        """
+        if self.search:
+            return self.iter_search_message_ids()
+        return self.iter_inbox_message_ids(self._date_filter() or None)
+
+    def iter_inbox_messages(self) -> Iterator[Dict[str, Any]]:
+        """
+        Yield every inbox message as it is fetched.
+
+        Listing and fetching are interleaved one batch at a time, so consumers
+        start work before the listing finishes and memory holds at most one batch.
+
+        Yields:
+            Gmail API message objects
+        """
+        return self.iter_messages(self.iter_inbox_message_ids())
+
+    def iter_messages(self, message_ids: Iterable[str], failed: List[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Fetch messages lazily, batch_size messages at a time.
+
+        Args:
+            message_ids: Gmail message IDs to retrieve
+            failed: Optional list the IDs of messages that could not be fetched are added to
+
+        Yields:
+            Gmail API message objects
+        """
+        message_ids = iter(message_ids)
+
+        while True:
+            chunk = list(islice(message_ids, self.batch_size))
+            if not chunk:
+                break
+            messages = self.get_messages(chunk)
+            if failed is not None:
+                failed.extend(missing_ids(chunk, messages))
+            yield from messages
+
+    def get_messages(self, message_ids: List[str], format: str = 'full',
+                     metadata_headers: List[str] = None) -> List[Dict[str, Any]]:
+        """
+        Retrieve messages, batched unless batch_size is 1.
+
+        Args:
+            message_ids: Gmail message IDs to retrieve
+            format: Gmail message format ('full', 'metadata', 'minimal' or 'raw')
+            metadata_headers: Headers to include with format='metadata' (all when None)
+
+        Returns:
+            List of Gmail API message objects
+        """
+        if self.batch_size > 1:
+            detailed_messages = self.get_messages_batch(message_ids, format, metadata_headers)
+        else:
             detailed_messages = []
 
-            for message in messages:
-                msg = self.service.users().messages().get(
-                    userId='me', id=message['id'], format='full'
-                ).execute()
+            for message_id in message_ids:
+                msg = self._call('messages.get', self.messages_api.get(
+                    userId='me', id=message_id, format=format, metadataHeaders=metadata_headers
+                ))
                 detailed_messages.append(msg)
 
-            return detailed_messages
+        self.metrics.count('messages_fetched_total', len(detailed_messages), format=format)
+        return detailed_messages
 
-        except Exception as e:
-            print(f"An error occurred: {e}")
-            return -100
+    def get_messages_batch(self, message_ids: List[str], format: str = 'full',
+                           metadata_headers: List[str] = None) -> List[Dict[str, Any]]:
+        """
+        Retrieve messages with Gmail batch HTTP requests, `batch_size` messages per round trip.
 
-    def query_inbox_for_ticket(self) -> List[Dict[str, Any]]:
+        Messages answered with 429 or 5xx inside a batch are batched again after an
+        exponential backoff, up to max_retries times. Messages that still fail are
+        counted as messages_failed_total and left out of the result, so callers
+        find them with missing_ids.
+
+        Args:
+            message_ids: Gmail message IDs to retrieve
+            format: Gmail message format ('full', 'metadata', 'minimal' or 'raw')
+            metadata_headers: Headers to include with format='metadata' (all when None)
+
+        Returns:
+            List of Gmail API message objects, in the order of message_ids
         """
-        Scan Gmail for bug ticket-related emails.
+        message_ids = list(dict.fromkeys(message_ids))  # batch request IDs must be unique
+        fetched = {}
+        failed = self._execute_batches(message_ids, format, metadata_headers, fetched)
+
+        for attempt in range(self.max_retries):
+            retryable = [message_id for message_id, status in failed.items() if status in RETRYABLE_STATUSES]
+            if not retryable:
+                break
+            self.metrics.count('gmail_retries_total', len(retryable), method='messages.get')
+            time.sleep(self.retry_base_delay * 2 ** attempt * random.uniform(1, 2))
+            for message_id in retryable:
+                del failed[message_id]
+            failed.update(self._execute_batches(retryable, format, metadata_headers, fetched))
+
+        if failed:
+            self.metrics.count('messages_failed_total', len(failed), format=format)
+        return [fetched[message_id] for message_id in message_ids if message_id in fetched]
+
+    def _execute_batches(self, message_ids: List[str], format: str, metadata_headers: List[str],
+                         fetched: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Send one round of batch requests, adding each message fetched to `fetched`.
+
+        Returns:
+            The error status (see _error_status) of each message that failed
+        """
+        failed = {}
+
+        def on_response(request_id, response, exception):
+            if exception is not None:
+                status = _error_status(exception)
+                self.metrics.count('gmail_errors_total', method='messages.get', status=status)
+                failed[request_id] = status
+            else:
+                fetched[request_id] = response
+
+        for start in range(0, len(message_ids), self.batch_size):
+            batch = self.service.new_batch_http_request(callback=on_response)
+            chunk = message_ids[start:start + self.batch_size]
+            for message_id in chunk:
+                batch.add(
+                    self.messages_api.get(
+                        userId='me', id=message_id, format=format, metadataHeaders=metadata_headers
+                    ),
+                    request_id=message_id
+                )
+            # Gmail charges each call inside a batch as if it were sent on its own
+            self._record_calls('messages.get', len(chunk))
+            with self.metrics.timer('gmail_request_seconds', method='batch'):
+                batch.execute()
+
+        return failed
+
+    def fetch_inbox(self) -> InboxSnapshot:
+        """
+        Prepare the inbox for a scan. Messages are fetched lazily while the snapshot is consumed.
+
+        Returns:
+            InboxSnapshot streaming every inbox message
+        """
+        return self._snapshot(self.iter_scan_message_ids())
+
+    def _snapshot(self, message_ids: Iterable[str]) -> InboxSnapshot:
+        """
+        Snapshot streaming the given messages, through the two-stage filter when prefilter is set.
+        """
+        failed = []
+        if not self.prefilter:
+            inbox = InboxSnapshot(self.iter_messages(message_ids, failed))
+        else:
+            stats = {'candidate': 0, 'undecided': 0, 'rejected': 0}
+            inbox = InboxSnapshot(self.iter_prefiltered_messages(message_ids, stats, failed))
+            inbox.prefilter_stats = stats
+        inbox.failed_ids = failed
+        return inbox
+
+    ### Two-Stage Filtering ###
+
+    def iter_prefiltered_messages(self, message_ids: Iterable[str], stats: Dict[str, int] = None,
+                                  failed: List[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Fetch messages in two stages: subject and snippet for every message, then
+        the full message only for those that may be tickets.
+
+        Messages that stage one rules out are yielded in metadata form. Without
+        a body, and with a subject that matched no query, they never pass is_ticket.
 
         Args:
-            days_back: Number of days back to search
-            max_results: Maximum number of results per query
+            message_ids: Gmail message IDs to retrieve
+            stats: Optional dict counting each prefilter_message outcome
+            failed: Optional list the IDs of messages that could not be fetched are added to
+
+        Yields:
+            Gmail API message objects, 'full' or 'metadata' format, in the order of message_ids
+        """
+        message_ids = iter(message_ids)
+
+        while True:
+            chunk = list(islice(message_ids, self.batch_size))
+            if not chunk:
+                break
+
+            metadata = self.get_messages(chunk, format='metadata', metadata_headers=['Subject'])
+            if failed is not None:
+                failed.extend(missing_ids(chunk, metadata))
+
+            needs_body = []
+            for message in metadata:
+                outcome = self.prefilter_message(message)
+                if stats is not None:
+                    stats[outcome] = stats.get(outcome, 0) + 1
+                if outcome != 'rejected':
+                    needs_body.append(message['id'])
+
+            full = {message['id']: message for message in self.get_messages(needs_body)} if needs_body else {}
+            needs_body = set(needs_body)
+
+            for message in metadata:
+                if message['id'] not in needs_body:
+                    yield message
+                elif message['id'] in full:
+                    yield full[message['id']]
+                elif failed is not None:
+                    # Left out of the snapshot, so it is not checkpointed as processed
+                    failed.append(message['id'])
+
+    def prefilter_message(self, message: Dict[str, Any]) -> str:
+        """
+        Decide from a message's subject and snippet whether its body must be downloaded.
+
+        Args:
+            message: Gmail API message in 'metadata' format
 
         Returns:
-            List of ticket-related emails
+            'candidate' if a ticket query matches, 'rejected' if none does and the
+            snippet holds the whole body, otherwise 'undecided'
+        """
+        headers = {header['name']: header['value'] for header in message['payload'].get('headers', [])}
+        snippet = html.unescape(message.get('snippet', ''))  # Gmail HTML-escapes snippets
+
+        if self.ticket_matcher.contains_any(f"{headers.get('Subject', '')}\n{snippet}"):
+            return 'candidate'
+        if len(snippet) < FULL_SNIPPET_LENGTH:
+            return 'rejected'
+        return 'undecided'
+
+    ### Server-Side Search ###
+
+    def search_queries(self) -> List[str]:
+        """
+        Returns:
+            Gmail search queries that together match any of the ticket queries
+        """
+        return compile_search_queries(self.ticket_queries, self._date_filter())
+
+    def iter_search_message_ids(self) -> Iterator[str]:
+        """
+        Yield the IDs of inbox messages Gmail's search finds for the ticket queries.
+
+        Gmail matches whole words, so results can differ slightly from the substring
+        check in is_ticket, which still runs on every fetched message.
+
+        Yields:
+            Gmail message IDs, each once, in the order the queries return them
+        """
+        seen_ids = set()
+
+        for query in self.search_queries():
+            for message_id in self.iter_inbox_message_ids(query):
+                if message_id not in seen_ids:
+                    seen_ids.add(message_id)
+                    yield message_id
+
+    def _date_filter(self) -> str:
+        return f"newer_than:{self.newer_than_days}d" if self.newer_than_days else ''
+
+    ### Incremental Sync ###
+
+    def get_history_id(self) -> str:
+        """
+        Returns:
+            The mailbox's current Gmail historyId
+        """
+        return self._call('getProfile', self.users_api.getProfile(userId='me'))['historyId']
+
+    def list_history_message_ids(self, start_history_id: str) -> List[str]:
+        """
+        List the IDs of messages added to the inbox since a historyId.
+
+        Args:
+            start_history_id: historyId recorded by the previous sync
+
+        Returns:
+            List of Gmail message IDs, or None if the history has expired and a full sync is needed
         """
-        all_queried_emails = []
-        all_inbox_emails = self.get_all_inbox_emails()
+        from googleapiclient.errors import HttpError
+
+        message_ids = []
+        page_token = None
+
+        try:
+            while True:
+                response = self._call('history.list', self.history_api.list(
+                    userId='me',
+                    startHistoryId=start_history_id,
+                    historyTypes=['messageAdded'],
+                    labelId='INBOX',
+                    pageToken=page_token
+                ))
+
+                for record in response.get('history', []):
+                    for added in record.get('messagesAdded', []):
+                        message = added['message']
+                        if 'INBOX' in message.get('labelIds', ['INBOX']):
+                            message_ids.append(message['id'])
+
+                page_token = response.get('nextPageToken')
+                if not page_token:
+                    break
+        except HttpError as e:
+            # Gmail answers 404 once startHistoryId is older than the history it keeps
+            if e.resp.status == 404:
+                return None
+            raise
+
+        return list(dict.fromkeys(message_ids))
+
+    def fetch_new_inbox(self, checkpoint) -> InboxSnapshot:
+        """
+        Fetch only the inbox messages that arrived since the last checkpointed scan.
+
+        Falls back to listing the whole inbox on the first run or when the
+        stored historyId has expired. Messages the checkpoint already marks
+        as processed are never fetched again; those an earlier scan failed to
+        fetch are tried again first, since the history will not list them again.
+
+        Args:
+            checkpoint: CheckpointStore holding the last historyId and processed message IDs
+
+        Returns:
+            InboxSnapshot of unprocessed messages, with history_id set for the next checkpoint
+        """
+        message_ids, latest_history_id = self.list_new_message_ids(checkpoint.get_history_id())
+        inbox = self._snapshot(checkpoint.filter_unprocessed(checkpoint.requeue_failed(message_ids)))
+        inbox.history_id = latest_history_id
+        return inbox
+
+    def list_new_message_ids(self, start_history_id: str = None) -> Tuple[List[str], str]:
+        """
+        List the messages added since a historyId, or every message to scan when there is none or it has expired.
+
+        Args:
+            start_history_id: historyId recorded by the last checkpointed scan
+
+        Returns:
+            (message IDs, the mailbox's current historyId) tuple
+        """
+        # Read the historyId before listing so mail arriving mid-scan is picked up next time
+        latest_history_id = self.get_history_id()
+
+        message_ids = None
+        if start_history_id is not None:
+            message_ids = self.list_history_message_ids(start_history_id)
+            if message_ids is None:
+                print(f"History since {start_history_id} has expired, running a full sync")
+
+        if message_ids is None:
+            message_ids = list(self.iter_scan_message_ids())
+
+        return message_ids, latest_history_id
+
+    def iter_inbox_tickets(self, inbox: InboxSnapshot = None) -> Iterator[Dict[str, Any]]:
+        """
+        Yield ticket-related emails as the inbox streams in.
+
+        The first full pass stores its result on the snapshot; later calls replay it.
+
+        Args:
+            inbox: Previously fetched inbox; fetched from Gmail when not given
+
+        Yields:
+            Extracted ticket-related emails, without duplicates
+        """
+        if inbox is None:
+            inbox = self.fetch_inbox()
+
+        if inbox.tickets is not None:
+            yield from inbox.tickets
+            return
+
+        seen_ids = set()
+        tickets = []
+        timer = self.metrics.timer
 
         # Search using bug/ticket-related queries
-        for email in all_inbox_emails:
-            extracted_email = self.extract_ticket_content(email)
+        for email in inbox:
+            with timer('extract_seconds'):
+                extracted_email = self.extract_ticket_content(email)
+
+            if extracted_email['id'] in seen_ids:
+                continue
 
-            body_text = extracted_email.get('body_text', '').lower()
-            subject = extracted_email.get('subject', '').lower()
+            with timer('filter_seconds'):
+                is_ticket = self.is_ticket(extracted_email)
 
-            for query in self.ticket_queries:
-                if query.lower() in subject:
-                    all_queried_emails.append(extracted_email)
-                elif query.lower() in body_text:
-                    all_queried_emails.append(extracted_email)
-        
-        unique_queried_emails = self.filter_duplicate_emails(all_queried_emails)
-        return unique_queried_emails
+            if is_ticket:
+                seen_ids.add(extracted_email['id'])
+                tickets.append(extracted_email)
+                yield extracted_email
+
+        inbox.tickets = tickets
+        self.metrics.count('messages_scanned_total', len(inbox))
+        self.metrics.count('ticket_emails_total', len(tickets))
+
+    def is_ticket(self, email_data: Dict[str, Any]) -> bool:
+        """
+        Check whether an extracted email matches any of the ticket search queries.
+
+        Args:
+            email_data: Email data dictionary
+
+        Returns:
+            True if a query occurs in the subject or body
+        """
+        # Newline-separated so a query cannot match across the subject/body boundary
+        return self.ticket_matcher.contains_any(
+            f"{email_data.get('subject', '')}\n{email_data.get('body_text', '')}"
+        )
+
+    def query_inbox_for_ticket(self, inbox: InboxSnapshot = None) -> List[Dict[str, Any]]:
+        """
+        Scan Gmail for bug ticket-related emails.
+
+        Args:
+            inbox: Previously fetched inbox; fetched from Gmail when not given
+
+        Returns:
+            List of ticket-related emails
+        """
+        return list(self.iter_inbox_tickets(inbox))
 
     def filter_duplicate_emails(self, email_data_list: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         seen_ids = set()
@@ -231,7 +863,7 @@ class GmailHandler:
         return unique_emails
 
     
-    def extract_ticket_content(self, message: Dict[str, Any]) -> Dict[str, Any]:
+    def extract_ticket_content(self, message: Dict[str, Any]) -> EmailRecord:
         """
         Extract relevant content from an email message.
         
@@ -239,51 +871,21 @@ class GmailHandler:
             message: Gmail API message object
             
         Returns:
-            Dictionary with extracted email content
+            EmailRecord with the extracted email content
         """
         headers = {header['name']: header['value'] for header in message['payload']['headers']}
-        
-        # Extract basic email metadata
-        email_data = {
-            'id': message['id'],
-            'thread_id': message['threadId'],
-            'subject': headers.get('Subject', ''),
-            'from': headers.get('From', ''),
-            'to': headers.get('To', ''),
-            'date': headers.get('Date', ''),
-            'timestamp': int(message['internalDate']) / 1000,  # Convert to seconds
-            'body_text': '',
-            'body_html': ''
-        }
-        
-        # Extract email body
-        if 'parts' in message['payload']:
-            for part in message['payload']['parts']:
-                if part['mimeType'] == 'text/plain':
-                    if 'data' in part['body']:
-                        email_data['body_text'] = base64.urlsafe_b64decode(
-                            part['body']['data']).decode('utf-8')
-                elif part['mimeType'] == 'text/html':
-                    if 'data' in part['body']:
-                        email_data['body_html'] = base64.urlsafe_b64decode(
-                            part['body']['data']).decode('utf-8')
-        elif 'body' in message['payload'] and 'data' in message['payload']['body']:
-            # Handle single-part messages
-            data = message['payload']['body']['data']
-            decoded_data = base64.urlsafe_b64decode(data).decode('utf-8')
-            
-            if message['payload']['mimeType'] == 'text/plain':
-                email_data['body_text'] = decoded_data
-            elif message['payload']['mimeType'] == 'text/html':
-                email_data['body_html'] = decoded_data
-        
-        # If we have HTML but no plain text, convert HTML to text
-        if not email_data['body_text'] and email_data['body_html']:
-            h = html2text.HTML2Text()
-            h.ignore_links = False
-            email_data['body_text'] = h.handle(email_data['body_html'])
-        
-        return email_data
+
+        return EmailRecord(
+            id=message['id'],
+            thread_id=message['threadId'],
+            subject=headers.get('Subject', ''),
+            sender=headers.get('From', ''),
+            to=headers.get('To', ''),
+            date=headers.get('Date', ''),
+            timestamp=int(message['internalDate']) / 1000,  # Convert to seconds
+            body_text=self.extractor.body_text(message['payload']),
+            summary=None
+        )
     
     def extract_issue_summary(self, email_data: Dict[str, Any]) -> str:
         """
@@ -319,12 +921,31 @@ class GmailHandler:
     def forward_classified_emails(self, emails):
         """
         Forwards each email to its respective department(s) using Gmail's 'compose' API.
+
+        Urgent emails are sent first, then the rest, oldest first within each
+        group. Sends go through a token bucket that keeps within Gmail's send
+        quota and are retried on 429/5xx responses. With send_workers > 1 they
+        run on a thread pool; the result keeps the send order either way.
         
         Args:
             emails: List of email dictionaries.
+
+        Returns:
+            One status line per recipient, including the send latency
         """
+        return self._send_all(self.compose_forwards(sorted(emails, key=priority_key)))
 
-        forwarded_emails = []
+    def compose_forwards(self, emails) -> List[Tuple[str, str, str, str]]:
+        """
+        Compose the forwarded copy of each email for each of its departments.
+
+        Args:
+            emails: List of email dictionaries.
+
+        Returns:
+            (description, recipient, subject, body) tuples, as forward_email takes them
+        """
+        sends = []
 
         for email in emails:
             forward_to = email.get('forward_to', [])
@@ -337,33 +958,124 @@ class GmailHandler:
             email_id = email.get('id', 'Unknown ID')
             body = email.get('body', '')
             urgent = "URGENT -" if email.get('is_urgent') is True else "-"
+            incident = "".join(f"{line}\n" for line in _incident_lines(email))
+            subject = f"[FORWARDED] {urgent} {original_subject}"
+            if email.get('reporter_count', 1) > 1:
+                # One forward stands for a whole cluster of reports of the same problem
+                subject += f" ({email.get('reporter_count')} reporters)"
 
             # Compose the forwarded content
             forwarded_body = (
                 f"Forwarded message from: {original_sender}\n"
                 f"Subject: {original_subject}\n"
-                f"Ticket ID: {email_id}\n\n"
+                f"Ticket ID: {email_id}\n"
+                f"{incident}\n"
                 f"{body}"
             )
         
             for recipient in forward_to:
-                try:
-                    raw = self.create_raw_email(
-                        to=recipient,
-                        subject=f"[FORWARDED] {urgent} {original_subject}",
-                        body=forwarded_body
-                    )
+                sends.append((f"'{original_subject}'", recipient, subject, forwarded_body))
 
-                    self.service.users().messages().send(
-                        userId='me',
-                        body={'raw': raw}
-                    ).execute()
+        return sends
+
+    def forward_digest(self, emails, send_urgent_now: bool = True):
+        """
+        Forwards classified emails as one digest message per department address.
 
-                    forwarded_emails.append(f"'{original_subject}' to {recipient} - ✓ Forwarded successfully")
-                except Exception as e:
-                    forwarded_emails.append(f"'{original_subject}' to {recipient} - ✗ Failed to forward: {e}")
+        Args:
+            emails: List of email dictionaries.
+            send_urgent_now: Forward urgent emails individually instead of holding them for the digest
 
-        return forwarded_emails
+        Returns:
+            One status line per digest (and per urgent recipient), including the send latency
+        """
+        digests = {}
+        urgent_emails = []
+
+        for email in emails:
+            if send_urgent_now and email.get('is_urgent') is True:
+                urgent_emails.append(email)
+                continue
+
+            for recipient in email.get('forward_to', []):
+                digests.setdefault(recipient, []).append(email)
+
+        statuses = self.forward_classified_emails(urgent_emails) if urgent_emails else []
+
+        sends = []
+        for recipient, digest_emails in digests.items():
+            count = len(digest_emails)
+            sends.append((
+                f"Digest of {count} ticket(s)",
+                recipient,
+                f"[DIGEST] {count} ticket(s) for {recipient}",
+                self.create_digest_body(digest_emails)
+            ))
+
+        return statuses + self._send_all(sends)
+
+    def create_digest_body(self, emails, excerpt_length: int = 500) -> str:
+        """
+            Helper to compose the text of a digest message listing several tickets.
+        """
+        sections = [f"Ticket digest: {len(emails)} ticket(s)\n"]
+
+        for number, email in enumerate(emails, start=1):
+            urgent = "[URGENT] " if email.get('is_urgent') is True else ""
+            body = email.get('body', '').strip()
+            if len(body) > excerpt_length:
+                body = body[:excerpt_length] + "..."
+            incident = "".join(f"   {line}\n" for line in _incident_lines(email))
+
+            sections.append(
+                f"{number}. {urgent}{email.get('subject', '(No Subject)')}\n"
+                f"   From: {email.get('from', 'Unknown')}\n"
+                f"   Ticket ID: {email.get('id', 'Unknown ID')}\n"
+                f"   Received: {email.get('timestamp', 'Unknown')}\n"
+                f"{incident}\n"
+                f"{body}\n"
+            )
+
+        return "\n".join(sections)
+
+    def _send_all(self, sends) -> List[str]:
+        """
+        Send (description, recipient, subject, body) tuples, on the worker pool when configured.
+        """
+        if self.send_workers > 1 and len(sends) > 1:
+            with ThreadPoolExecutor(max_workers=self.send_workers) as pool:
+                return list(pool.map(lambda send: self.forward_email(*send), sends))
+
+        return [self.forward_email(*send) for send in sends]
+
+    def forward_email(self, description: str, recipient: str, subject: str, body: str) -> ForwardStatus:
+        """
+        Send one forwarded email and describe the outcome.
+
+        Returns:
+            Status line, with delivered set to whether the send succeeded
+        """
+        self.metrics.observe('send_wait_seconds', self.send_limiter.acquire())
+        start = time.perf_counter()
+
+        try:
+            raw = self.create_raw_email(
+                to=recipient,
+                subject=subject,
+                body=body
+            )
+
+            self._execute_with_retry(self.messages_api.send(
+                userId='me',
+                body={'raw': raw}
+            ), 'messages.send')
+
+            latency_ms = (time.perf_counter() - start) * 1000
+            return ForwardStatus(f"{description} to {recipient} - ✓ Forwarded successfully ({latency_ms:.0f} ms)", True)
+        except Exception as e:
+            self.metrics.count('forward_failures_total')
+            latency_ms = (time.perf_counter() - start) * 1000
+            return ForwardStatus(f"{description} to {recipient} - ✗ Failed to forward: {e} ({latency_ms:.0f} ms)", False)
 
     def create_raw_email(self, to, subject, body):
         """
@@ -376,3 +1088,35 @@ class GmailHandler:
 
         raw = base64.urlsafe_b64encode(mime_msg.as_bytes()).decode()
         return raw
+
+
+def _error_status(error: Exception):
+    """
+    HTTP status of a failed API call, or the exception's class name when it never got a response.
+    """
+    from googleapiclient.errors import HttpError
+
+    if isinstance(error, HttpError):
+        return error.resp.status
+    return type(error).__name__
+
+
+def missing_ids(message_ids: List[str], messages: List[Dict[str, Any]]) -> List[str]:
+    """
+    The requested message IDs that get_messages returned no message for, because fetching them failed.
+    """
+    fetched = {message['id'] for message in messages}
+    return [message_id for message_id in dict.fromkeys(message_ids) if message_id not in fetched]
+
+
+def _incident_lines(email) -> List[str]:
+    """
+    Lines naming how many people reported a clustered incident and its other messages; none for a single report.
+    """
+    duplicate_ids = email.get('duplicate_ids', [])
+    if not duplicate_ids:
+        return []
+    return [
+        f"Reporters: {email.get('reporter_count', 1)}",
+        f"Related messages: {', '.join(duplicate_ids)}",
+    ]
@@ -0,0 +1,164 @@
+import re
+from typing import List, Dict, Iterable, NamedTuple, Set, Tuple
+
+try:
+    import ahocorasick
+except ImportError:  # pyahocorasick is optional; fall back to a compiled regex
+    ahocorasick = None
+
+
+class KeywordMatch(NamedTuple):
+    start: int
+    keyword: str
+    labels: Tuple[str, ...]
+    whole_word: bool  # not preceded or followed by a letter or digit
+
+
+class KeywordMatcher:
+    """
+    Finds every occurrence of a fixed set of labelled keywords in one pass over a text.
+
+    Matching is case-insensitive and reports overlapping occurrences, just like
+    running `keyword in text.lower()` for every keyword, but costs a single scan.
+    An Aho-Corasick automaton (pyahocorasick) is used when installed, otherwise
+    one compiled regular expression built from a trie of the keywords.
+    """
+
+    def __init__(self, keywords: Dict[str, Iterable[str]], use_automaton: bool = True):
+        """
+        Build the matcher.
+
+        Args:
+            keywords: Mapping of label to the keywords that signal it
+            use_automaton: Use pyahocorasick when it is installed
+        """
+        self.keyword_labels = {}
+        for label, words in keywords.items():
+            for word in words:
+                word = word.lower()
+                if word:
+                    labels = self.keyword_labels.setdefault(word, ())
+                    if label not in labels:
+                        self.keyword_labels[word] = labels + (label,)
+
+        self._automaton = None
+        self._pattern = None
+
+        if use_automaton and ahocorasick is not None:
+            self._automaton = ahocorasick.Automaton()
+            for word, labels in self.keyword_labels.items():
+                self._automaton.add_word(word, (word, labels))
+            self._automaton.make_automaton()
+        else:
+            self._pattern = re.compile(_trie_pattern(self.keyword_labels))
+            # Keywords that are prefixes of a longer keyword match at the same position,
+            # but the regex only reports the longest one; kept longest first, like find_all's results
+            self._prefixes = {
+                word: sorted((other for other in self.keyword_labels if other != word and word.startswith(other)),
+                             key=len, reverse=True)
+                for word in self.keyword_labels
+            }
+
+    def find_all(self, text: str) -> List[KeywordMatch]:
+        """
+        Find every keyword occurrence, including overlapping ones.
+
+        Args:
+            text: Text to scan
+
+        Returns:
+            Matches ordered by start position (in the lowercased text), longest keyword first
+        """
+        text = text.lower()
+
+        if self._automaton is not None:
+            matches = []
+            for end, (word, labels) in self._automaton.iter(text):
+                start = end - len(word) + 1
+                matches.append(KeywordMatch(start, word, labels, _is_whole_word(text, start, end + 1)))
+            matches.sort(key=lambda match: (match.start, -len(match.keyword)))
+            return matches
+
+        matches = []
+        if not self.keyword_labels:
+            return matches
+
+        position = 0
+        while True:
+            found = self._pattern.search(text, position)
+            if found is None:
+                break
+
+            word = found.group()
+            start = found.start()
+            matches.append(KeywordMatch(
+                start, word, self.keyword_labels[word], _is_whole_word(text, start, found.end())
+            ))
+            for prefix in self._prefixes[word]:
+                matches.append(KeywordMatch(
+                    start, prefix, self.keyword_labels[prefix], _is_whole_word(text, start, start + len(prefix))
+                ))
+            position = start + 1
+
+        return matches
+
+    def labels(self, text: str) -> Set[str]:
+        """
+        Args:
+            text: Text to scan
+
+        Returns:
+            Set of labels with at least one keyword in the text
+        """
+        found = set()
+
+        if self._automaton is not None:
+            for _, (_, labels) in self._automaton.iter(text.lower()):
+                found.update(labels)
+            return found
+
+        for match in self.find_all(text):
+            found.update(match.labels)
+        return found
+
+    def contains_any(self, text: str) -> bool:
+        """
+        Args:
+            text: Text to scan
+
+        Returns:
+            True if any keyword occurs in the text, stopping at the first hit
+        """
+        text = text.lower()
+
+        if self._automaton is not None:
+            return next(self._automaton.iter(text), None) is not None
+
+        return bool(self.keyword_labels) and self._pattern.search(text) is not None
+
+
+def _is_whole_word(text: str, start: int, end: int) -> bool:
+    return (start == 0 or not text[start - 1].isalnum()) and (end == len(text) or not text[end].isalnum())
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """
+    Build a regex from a trie of the words, so each text position is tried
+    against one branch per distinct next character instead of every word.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def build(node: dict) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # A word may end here; the optional group keeps matching greedy (longest first)
+        return f'(?:{body})?' if '' in node else body
+
+    return build(trie)
@@ -0,0 +1,464 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import deque
+from itertools import count
+from pathlib import Path
+from queue import Queue, Empty
+from typing import List, Dict, Any, Callable, Optional
+
+from .records import Ticket
+
+# Bump when the prompt changes so cached verdicts from the old prompt are not reused
+PROMPT_VERSION = 1
+
+CATEGORIES = ['Frontend', 'Backend', 'Sysops', 'Cross-Functional']
+
+CLASSIFY_PROMPT = """Classify this support email into exactly one department: Frontend, Backend, Sysops or Cross-Functional.
+Also decide whether it is urgent.
+Reply with JSON only: {{"category": "<department>", "is_urgent": true or false}}
+
+Subject: {subject}
+Body:
+{body}"""
+
+BATCH_PROMPT = """Classify each support email below into exactly one department: Frontend, Backend, Sysops or Cross-Functional.
+Also decide whether each one is urgent.
+Reply with a JSON array only, one object per email:
+[{{"id": <email number>, "category": "<department>", "is_urgent": true or false}}]
+
+{emails}"""
+
+BATCH_EMAIL = """### Email {number}
+Subject: {subject}
+Body:
+{body}
+"""
+
+
+def content_key(subject: str, body: str) -> str:
+    """
+    Hash of a ticket's normalized content, identical for re-scanned and duplicate emails.
+    """
+    text = " ".join(f"{subject}\n{body}".lower().split())
+    return hashlib.sha256(f"{PROMPT_VERSION}:{text}".encode('utf-8')).hexdigest()
+
+
+def parse_verdict(data: Any) -> Optional[Dict[str, Any]]:
+    """
+    Validate a model verdict, from a JSON object or the text of a model response.
+
+    Returns:
+        {'category': ..., 'is_urgent': ...}, or None if the verdict is unusable
+    """
+    if isinstance(data, str):
+        found = re.search(r'\{.*\}', data, re.DOTALL)
+        if not found:
+            return None
+        try:
+            data = json.loads(found.group())
+        except ValueError:
+            return None
+
+    if not isinstance(data, dict):
+        return None
+
+    category = str(data.get('category', '')).strip().lower().replace('_', '-')
+    for name in CATEGORIES:
+        if name.lower() == category:
+            return {'category': name, 'is_urgent': data.get('is_urgent') is True}
+
+    return None
+
+
+def parse_batch_verdicts(text: str, size: int) -> Optional[List[Optional[Dict[str, Any]]]]:
+    """
+    Parse the response to a batch prompt.
+
+    Args:
+        text: Model response, expected to hold a JSON array of verdicts with 1-based ids
+        size: Number of emails in the batch
+
+    Returns:
+        Verdicts in email order, None for emails without a usable verdict;
+        None if the response is not a JSON array at all
+    """
+    found = re.search(r'\[.*\]', text, re.DOTALL)
+    if not found:
+        return None
+    try:
+        items = json.loads(found.group())
+    except ValueError:
+        return None
+    if not isinstance(items, list):
+        return None
+
+    verdicts = [None] * size
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        try:
+            number = int(item.get('id'))
+        except (TypeError, ValueError):
+            continue
+        if 1 <= number <= size:
+            verdicts[number - 1] = parse_verdict(item)
+
+    return verdicts
+
+
+class VerdictCache:
+    """
+    A persistent SQLite cache of LLM verdicts keyed by content hash, with TTL and size-based eviction.
+    """
+
+    def __init__(self, db_path: str = None, ttl: float = 30 * 24 * 3600, max_entries: int = 100000):
+        """
+        Open (or create) the cache.
+
+        Args:
+            db_path: Path to the SQLite file, defaults to config/llm_cache.db
+            ttl: Seconds a verdict stays valid
+            max_entries: Verdicts kept; the least recently used are evicted beyond this
+        """
+        self.db_path = db_path or os.path.join(
+            Path(__file__).parent.parent, 'config', 'llm_cache.db'
+        )
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._writes = 0
+        # The async scan escalates tickets on worker threads, one batch at a time
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS verdicts (
+                key TEXT PRIMARY KEY,
+                verdict TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                used_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS verdicts_used_at ON verdicts (used_at);
+        """)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns:
+            The cached verdict, or None if missing or older than the TTL
+        """
+        row = self.conn.execute(
+            "SELECT verdict, created_at FROM verdicts WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        now = time.time()
+        with self.conn:
+            if now - row[1] > self.ttl:
+                self.conn.execute("DELETE FROM verdicts WHERE key = ?", (key,))
+                return None
+            self.conn.execute("UPDATE verdicts SET used_at = ? WHERE key = ?", (now, key))
+
+        return json.loads(row[0])
+
+    def put(self, key: str, verdict: Dict[str, Any]):
+        now = time.time()
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO verdicts (key, verdict, created_at, used_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(verdict), now, now)
+            )
+
+        # Evicting on every write would cost a count per insert; every 100 writes is enough
+        self._writes += 1
+        if self._writes % 100 == 0:
+            self.evict()
+
+    def evict(self):
+        """
+        Drop expired verdicts, then the least recently used ones beyond max_entries.
+        """
+        with self.conn:
+            self.conn.execute("DELETE FROM verdicts WHERE created_at < ?", (time.time() - self.ttl,))
+            self.conn.execute("""
+                DELETE FROM verdicts WHERE key IN (
+                    SELECT key FROM verdicts ORDER BY used_at DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,))
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM verdicts").fetchone()[0]
+
+    def close(self):
+        self.evict()
+        self.conn.close()
+
+
+class HybridClassifier:
+    """
+    Keeps confident keyword classifications and escalates ambiguous tickets to an LLM.
+
+    The model is any callable taking a prompt and returning the response text, so a
+    stub can stand in for Bedrock offline. Verdicts are cached by content hash.
+    """
+
+    def __init__(self, analyzer, model: Callable[[str], Any], cache: VerdictCache = None,
+                 confidence_threshold: float = 0.6, max_body_chars: int = 5000,
+                 batch_size: int = 10, max_in_flight: int = 4, batch_timeout: float = 60.0):
+        """
+        Args:
+            analyzer: TicketAnalyzer providing keyword scores and department routing
+            model: Callable mapping a prompt to the model's response
+            cache: Verdict cache; verdicts are not cached when None
+            confidence_threshold: Keyword confidence at or above which the LLM is skipped
+            max_body_chars: Body characters included in the prompt per ticket
+            batch_size: Tickets packed into one prompt by classify_tickets
+            max_in_flight: Batch prompts awaiting the model at once, counting ones that timed out
+                and are still running
+            batch_timeout: Seconds to wait for one batch before treating it as failed
+        """
+        self.analyzer = analyzer
+        self.model = model
+        self.cache = cache
+        self.confidence_threshold = confidence_threshold
+        self.max_body_chars = max_body_chars
+        self.batch_size = max(1, batch_size)
+        self.max_in_flight = max(1, max_in_flight)
+        self.batch_timeout = batch_timeout
+        # A model call cannot be cancelled, so a batch that times out keeps its slot until
+        # the call returns; the bound then holds however slow the model gets
+        self._slots = threading.BoundedSemaphore(self.max_in_flight)
+        self.stats = {
+            'keywords': 0, 'cache': 0, 'llm': 0, 'llm_failed': 0,
+            'batches': 0, 'batch_splits': 0, 'batch_timeouts': 0,
+        }
+
+    def is_ambiguous(self, ticket: Ticket) -> bool:
+        """
+        Check whether the keyword classification of a ticket is too weak to trust.
+
+        The confidence is the share of the weighted keyword evidence behind the
+        category the ticket was given. First-match classification can pick a
+        category that scoring ranks low or not at all (a substring such as "ui"
+        in "build"), and such a ticket is escalated rather than trusted.
+        """
+        if 'confidence' not in ticket:
+            ranking = dict(self.analyzer.score_ticket(ticket.get('subject', ''), ticket.get('body', '')))
+            ticket['confidence'] = ranking.get(ticket.get('category'), 0.0)
+
+        return ticket['confidence'] < self.confidence_threshold
+
+    def classify_tickets(self, tickets: List[Ticket]) -> List[Ticket]:
+        """
+        Refine ticket summaries in place, escalating only the ambiguous ones.
+
+        Ambiguous tickets without a cached verdict are sent to the model in
+        batches (see analyze_batch); duplicates in the list share one verdict.
+
+        Args:
+            tickets: Ticket summaries from TicketAnalyzer.summarize_tickets
+
+        Returns:
+            The same tickets, each with 'classified_by' set to 'keywords', 'cache' or 'llm'
+        """
+        pending = {}
+
+        for ticket in tickets:
+            if not self.is_ambiguous(ticket):
+                self._keep_keywords(ticket)
+                continue
+
+            key = content_key(ticket.get('subject', ''), ticket.get('body', ''))
+            verdict = self.cache.get(key) if self.cache is not None else None
+            if verdict is not None:
+                self.stats['cache'] += 1
+                self.apply_verdict(ticket, verdict, 'cache')
+            else:
+                pending.setdefault(key, []).append(ticket)
+
+        keys = list(pending)
+        verdicts = self.analyze_batch([pending[key][0] for key in keys])
+
+        for key, verdict in zip(keys, verdicts):
+            if verdict is not None and self.cache is not None:
+                self.cache.put(key, verdict)
+
+            for ticket in pending[key]:
+                if verdict is None:
+                    self.stats['llm_failed'] += 1
+                    self._keep_keywords(ticket)
+                else:
+                    self.stats['llm'] += 1
+                    self.apply_verdict(ticket, verdict, 'llm')
+
+        return tickets
+
+    def analyze_batch(self, tickets: List[Ticket]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Ask the model for verdicts on many tickets, batch_size tickets per prompt.
+
+        Up to max_in_flight prompts run concurrently. A batch whose response
+        cannot be parsed, or that exceeds batch_timeout, is split in half and
+        retried; tickets missing from an otherwise valid response are retried
+        together. A single ticket that still fails gets no verdict.
+
+        A batch that timed out still holds its model slot until the call
+        returns, and if it returns before this call finishes, its verdicts fill
+        in the tickets that have none yet. Should every slot stay held for
+        batch_timeout with nothing else running, the remaining tickets get no
+        verdict rather than waiting indefinitely.
+
+        Args:
+            tickets: Ticket summaries
+
+        Returns:
+            Verdicts in ticket order, None where the model gave no usable answer
+        """
+        verdicts = [None] * len(tickets)
+        queue = deque(
+            list(range(start, min(start + self.batch_size, len(tickets))))
+            for start in range(0, len(tickets), self.batch_size)
+        )
+        results = Queue()
+        running = {}
+        timed_out = {}  # batch id -> indices, for batches still holding a slot after timing out
+        batch_ids = count()
+
+        while queue or running:
+            while queue:
+                if running:
+                    acquired = self._slots.acquire(blocking=False)
+                else:
+                    # Every slot is held by timed-out calls, ours or an earlier scan's: wait for one to return
+                    acquired = self._slots.acquire(timeout=self.batch_timeout)
+                if not acquired:
+                    if not running:
+                        print(f"No LLM slot freed up in {self.batch_timeout}s; "
+                              f"{sum(map(len, queue))} ticket(s) get no verdict")
+                        queue.clear()
+                    break
+                indices = queue.popleft()
+                batch_id = next(batch_ids)
+                running[batch_id] = (indices, time.monotonic() + self.batch_timeout)
+                self.stats['batches'] += 1
+                # Daemon threads: a batch that times out is not waited for, only its slot is kept
+                threading.Thread(
+                    target=self._run_batch,
+                    args=(batch_id, [tickets[i] for i in indices], results),
+                    daemon=True
+                ).start()
+
+            if not running:
+                break
+
+            finished = {}
+            wait = min(deadline for _, deadline in running.values()) - time.monotonic()
+            try:
+                batch_id, batch_verdicts = results.get(timeout=max(wait, 0))
+                if batch_id in running:
+                    finished[batch_id] = batch_verdicts
+                elif batch_id in timed_out and batch_verdicts is not None:
+                    self._apply_late_verdicts(timed_out.pop(batch_id), batch_verdicts, verdicts, queue)
+            except Empty:
+                pass
+
+            now = time.monotonic()
+            for batch_id, (indices, deadline) in running.items():
+                if batch_id not in finished and deadline <= now:
+                    self.stats['batch_timeouts'] += 1
+                    timed_out[batch_id] = indices
+                    finished[batch_id] = None
+
+            for batch_id, batch_verdicts in finished.items():
+                indices, _ = running.pop(batch_id)
+                failed = []
+                for position, index in enumerate(indices):
+                    if batch_verdicts is not None and batch_verdicts[position] is not None:
+                        verdicts[index] = batch_verdicts[position]
+                    else:
+                        failed.append(index)
+
+                if len(failed) == len(indices) and len(failed) > 1:
+                    self.stats['batch_splits'] += 1
+                    half = len(failed) // 2
+                    queue.append(failed[:half])
+                    queue.append(failed[half:])
+                elif 0 < len(failed) < len(indices):
+                    queue.append(failed)
+
+        return verdicts
+
+    def _apply_late_verdicts(self, indices: List[int], batch_verdicts: List[Optional[Dict[str, Any]]],
+                             verdicts: List[Optional[Dict[str, Any]]], queue: deque):
+        """
+        Use the answer of a batch that returned after timing out, and stop retrying the tickets it covered.
+        """
+        for position, index in enumerate(indices):
+            if verdicts[index] is None and batch_verdicts[position] is not None:
+                verdicts[index] = batch_verdicts[position]
+
+        retries = [[index for index in batch if verdicts[index] is None] for batch in queue]
+        queue.clear()
+        queue.extend(batch for batch in retries if batch)
+
+    def _run_batch(self, batch_id: int, tickets: List[Ticket], results: Queue):
+        emails = "\n".join(
+            BATCH_EMAIL.format(
+                number=number,
+                subject=ticket.get('subject', ''),
+                body=ticket.get('body', '')[:self.max_body_chars]
+            )
+            for number, ticket in enumerate(tickets, start=1)
+        )
+
+        verdicts = None
+        try:
+            verdicts = parse_batch_verdicts(str(self.model(BATCH_PROMPT.format(emails=emails))), len(tickets))
+        except Exception as e:
+            print(f"LLM batch of {len(tickets)} ticket(s) failed: {e}")
+        finally:
+            results.put((batch_id, verdicts))
+            self._slots.release()
+
+    def classify_ticket(self, ticket: Ticket) -> Ticket:
+        if not self.is_ambiguous(ticket):
+            return self._keep_keywords(ticket)
+
+        key = content_key(ticket.get('subject', ''), ticket.get('body', ''))
+        verdict = self.cache.get(key) if self.cache is not None else None
+        if verdict is not None:
+            self.stats['cache'] += 1
+            return self.apply_verdict(ticket, verdict, 'cache')
+
+        prompt = CLASSIFY_PROMPT.format(
+            subject=ticket.get('subject', ''), body=ticket.get('body', '')[:self.max_body_chars]
+        )
+        try:
+            verdict = parse_verdict(str(self.model(prompt)))
+        except Exception as e:
+            print(f"LLM classification failed for ticket {ticket.get('id')}: {e}")
+            verdict = None
+
+        if verdict is None:
+            # Unusable answers are not cached, so the ticket is retried next scan
+            self.stats['llm_failed'] += 1
+            return self._keep_keywords(ticket)
+
+        if self.cache is not None:
+            self.cache.put(key, verdict)
+        self.stats['llm'] += 1
+        return self.apply_verdict(ticket, verdict, 'llm')
+
+    def apply_verdict(self, ticket: Ticket, verdict: Dict[str, Any], source: str) -> Ticket:
+        ticket['category'] = verdict['category']
+        ticket['is_urgent'] = ticket.get('is_urgent') is True or verdict['is_urgent']
+        ticket['forward_to'] = self.analyzer.classify_department(verdict['category'])
+        ticket['classified_by'] = source
+        return ticket
+
+    def _keep_keywords(self, ticket: Ticket) -> Ticket:
+        self.stats['keywords'] += 1
+        ticket['classified_by'] = 'keywords'
+        return ticket
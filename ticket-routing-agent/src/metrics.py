@@ -0,0 +1,258 @@
+import json
+import time
+import threading
+from bisect import bisect_left
+from datetime import datetime
+from typing import Dict, Any, Tuple, Iterator
+
+# Prefix of every exported Prometheus metric name
+METRIC_PREFIX = 'ticket_router_'
+
+# Upper bounds (seconds) of the latency histogram buckets, Prometheus' defaults
+# extended down to a tenth of a millisecond for per-message work
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Upper bounds (seconds) for receipt-to-forward delays, which run from seconds to days
+DELAY_BUCKETS = (1.0, 5.0, 15.0, 30.0, 60.0, 300.0, 900.0, 1800.0, 3600.0, 7200.0,
+                 21600.0, 86400.0, 259200.0, 604800.0)
+
+# Histograms that do not measure processing latency, and their bucket bounds
+HISTOGRAM_BUCKETS = {'forward_delay_seconds': DELAY_BUCKETS}
+
+
+class Histogram:
+    """
+    Cumulative-bucket latency histogram in the Prometheus style.
+    """
+
+    __slots__ = ('bounds', 'bucket_counts', 'count', 'sum', 'max')
+
+    def __init__(self, bounds: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.bucket_counts = [0] * (len(bounds) + 1)  # the last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.bucket_counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def cumulative_buckets(self) -> Iterator[Tuple[str, int]]:
+        """
+        Yield (upper bound, observations at or below it) pairs, ending with '+Inf'.
+        """
+        total = 0
+        for bound, count in zip(self.bounds + ('+Inf',), self.bucket_counts):
+            total += count
+            yield str(bound), total
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimate a quantile as the upper bound of the bucket it falls in.
+        """
+        rank = q * self.count
+        for bound, total in self.cumulative_buckets():
+            if total >= rank:
+                return self.max if bound == '+Inf' else min(float(bound), self.max)
+        return self.max
+
+
+class _Timer:
+    """
+    Context manager adding the duration of its block to a histogram.
+    """
+
+    __slots__ = ('histogram', 'lock', 'start')
+
+    def __init__(self, histogram: Histogram, lock: threading.Lock):
+        self.histogram = histogram
+        self.lock = lock
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        with self.lock:
+            self.histogram.observe(elapsed)
+        return False
+
+
+class _NullTimer:
+    """
+    Context manager that does nothing, returned by timer() while metrics are off.
+    """
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Metrics:
+    """
+    Counters and latency histograms for one agent run, exported as a Prometheus
+    text file or a JSON run report.
+
+    A disabled instance ignores every update, so instrumented code costs only
+    a method call when metrics are off. Updates are thread-safe.
+    """
+
+    def __init__(self, enabled: bool = True):
+        """
+        Args:
+            enabled: Record updates; when False every method is a no-op
+        """
+        self.enabled = enabled
+        self.started = datetime.now()
+        self.counters = {}  # (name, labels) -> value
+        self.histograms = {}  # (name, labels) -> Histogram
+        self.lock = threading.Lock()
+
+    def count(self, name: str, value: float = 1, **labels):
+        """
+        Add to a counter.
+
+        Args:
+            name: Counter name, ending in _total by convention
+            value: Amount to add
+            **labels: Label values distinguishing series of the same counter
+        """
+        if not self.enabled:
+            return
+        key = _series_key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels):
+        """
+        Record one latency observation in a histogram.
+
+        Args:
+            name: Histogram name, ending in _seconds by convention
+            seconds: Observed duration
+            **labels: Label values distinguishing series of the same histogram
+        """
+        if not self.enabled:
+            return
+        histogram = self._histogram(name, labels)
+        with self.lock:
+            histogram.observe(seconds)
+
+    def timer(self, name: str, **labels):
+        """
+        Context manager observing the duration of its block in a histogram.
+        """
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self._histogram(name, labels), self.lock)
+
+    def _histogram(self, name: str, labels: Dict[str, Any]) -> Histogram:
+        key = _series_key(name, labels)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            with self.lock:
+                histogram = self.histograms.setdefault(key, Histogram(HISTOGRAM_BUCKETS.get(name, LATENCY_BUCKETS)))
+        return histogram
+
+    ### Export ###
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        JSON-serializable run report with every counter and histogram summary.
+        """
+        with self.lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(self.histograms.items())
+
+        report = {
+            'started': self.started.isoformat(timespec='seconds'),
+            'duration_seconds': (datetime.now() - self.started).total_seconds(),
+            'counters': {},
+            'histograms': {},
+        }
+        for (name, labels), value in counters:
+            report['counters'].setdefault(name, []).append({'labels': dict(labels), 'value': value})
+        for (name, labels), histogram in histograms:
+            report['histograms'].setdefault(name, []).append({
+                'labels': dict(labels),
+                'count': histogram.count,
+                'sum': histogram.sum,
+                'mean': histogram.sum / histogram.count if histogram.count else 0.0,
+                'p50': histogram.quantile(0.5),
+                'p95': histogram.quantile(0.95),
+                'p99': histogram.quantile(0.99),
+                'max': histogram.max,
+                'buckets': dict(histogram.cumulative_buckets()),
+            })
+        return report
+
+    def to_prometheus(self) -> str:
+        """
+        The metrics in the Prometheus text exposition format, e.g. for node_exporter's textfile collector.
+        """
+        with self.lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(self.histograms.items())
+
+        lines = []
+        typed = set()
+        for (name, labels), value in counters:
+            name = METRIC_PREFIX + name
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+        for (name, labels), histogram in histograms:
+            name = METRIC_PREFIX + name
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} histogram")
+            for bound, total in histogram.cumulative_buckets():
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', bound),))} {total}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum}")
+            lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, filepath: str):
+        """
+        Write the metrics to a file: Prometheus text for a .prom path, otherwise a JSON run report.
+
+        Args:
+            filepath: Destination path
+        """
+        with open(filepath, 'w') as f:
+            if filepath.endswith('.prom'):
+                f.write(self.to_prometheus())
+            else:
+                json.dump(self.to_dict(), f, indent=2)
+
+
+def _series_key(name: str, labels: Dict[str, Any]) -> Tuple[str, Tuple[Tuple[str, str], ...]]:
+    # Label values are kept as strings so series of one metric always sort
+    return name, tuple(sorted((key, str(value)) for key, value in labels.items())) if labels else ()
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(key, value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in labels
+    )
+    return '{' + pairs + '}'
+
+
+# Shared disabled instance for components created without metrics
+NULL_METRICS = Metrics(enabled=False)
@@ -0,0 +1,233 @@
+import re
+import hashlib
+import operator
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .metrics import Metrics, NULL_METRICS
+from .records import EmailRecord, Ticket
+
+# Estimated Jaccard similarity of two reports' word sets above which they are one incident
+DEFAULT_SIMILARITY = 0.5
+
+# MinHash signature length, and the LSH bands it is cut into. With 16 bands of
+# 4 values, pairs become candidates around a similarity of (1/16) ** (1/4) = 0.5:
+# about 64% of pairs at 0.5, 89% at 0.6 and 99% at 0.7
+DEFAULT_NUM_PERM = 64
+DEFAULT_BANDS = 16
+
+# Only the start of a body is compared; quoted replies and signatures follow it
+DEFAULT_COMPARE_CHARS = 1000
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+
+# Words every report shares, and reply/forward subject prefixes
+_STOPWORDS = frozenset("""
+    a an and are as at be but by can do for from has have hi hello i if in is it its me my
+    no not of on or our please re fw fwd so that the this to was we when with you your
+""".split())
+
+
+def shingles(text: str) -> Set[str]:
+    """
+    Split text into the words and word pairs its signature is computed from.
+
+    Args:
+        text: Text to split
+
+    Returns:
+        Set of lowercase words and adjacent word pairs, without stopwords or long numbers
+    """
+    words = [
+        word for word in _TOKEN.findall(text.lower())
+        # Order and ticket numbers differ between otherwise identical reports
+        if word not in _STOPWORDS and not (len(word) > 3 and word.isdigit())
+    ]
+    result = set(words)
+    result.update(f"{first} {second}" for first, second in zip(words, words[1:]))
+    return result
+
+
+class MinHashIndex:
+    """
+    Finds previously added texts that are probably similar to a new one, without comparing it to each.
+
+    Each text gets a MinHash signature: for every one of num_perm independent
+    hash functions, the least hash of its shingles. One SHAKE-128 digest gives
+    all num_perm 32-bit hashes of a shingle, and the per-position minimums are
+    taken by builtins, not Python loops. Two signatures agree at a
+    position with probability equal to the texts' Jaccard similarity. The
+    signature is cut into bands, and texts sharing any whole band land in the
+    same bucket (locality-sensitive hashing), so a lookup only touches texts
+    that collide with it rather than everything added so far.
+    """
+
+    def __init__(self, num_perm: int = DEFAULT_NUM_PERM, bands: int = DEFAULT_BANDS, seed: int = 1):
+        """
+        Args:
+            num_perm: Signature length
+            bands: Number of LSH bands; must divide num_perm
+            seed: Seed for the hash functions
+        """
+        if num_perm % bands:
+            raise ValueError(f"{bands} bands do not divide a signature of {num_perm} values")
+
+        self.salt = f"{seed}:".encode()
+        self.digest_size = 4 * num_perm
+        self.rows = num_perm // bands
+        # Per band: band values -> key of the first text added with them. Later texts in
+        # the same bucket are near-duplicates of that one, so one key per bucket bounds
+        # a lookup to `bands` comparisons however large a cluster grows
+        self.buckets = [{} for _ in range(bands)]
+        self.signatures = {}
+
+    def signature(self, text: str) -> Optional[Tuple[int, ...]]:
+        """
+        Compute the MinHash signature of a text.
+
+        Returns:
+            Signature, or None if the text has no words to compare
+        """
+        salt, digest_size = self.salt, self.digest_size
+        hashes = [array('I', hashlib.shake_128(salt + shingle.encode()).digest(digest_size))
+                  for shingle in shingles(text)]
+        if not hashes:
+            return None
+        return tuple(map(min, zip(*hashes)))
+
+    def _bands(self, signature: Tuple[int, ...]):
+        rows = self.rows
+        return (signature[start:start + rows] for start in range(0, len(signature), rows))
+
+    def candidates(self, signature: Tuple[int, ...]) -> List[str]:
+        """
+        Keys of added signatures that share at least one band with the given one (the first added per band), in band order.
+        """
+        found = {}
+        for buckets, band in zip(self.buckets, self._bands(signature)):
+            key = buckets.get(band)
+            if key is not None:
+                found[key] = None
+        return list(found)
+
+    def insert(self, key: str, signature: Tuple[int, ...]):
+        self.signatures[key] = signature
+        for buckets, band in zip(self.buckets, self._bands(signature)):
+            buckets.setdefault(band, key)
+
+    @staticmethod
+    def similarity(first: Tuple[int, ...], second: Tuple[int, ...]) -> float:
+        """
+        Estimated Jaccard similarity: the share of signature positions that agree.
+        """
+        return sum(map(operator.eq, first, second)) / len(first)
+
+
+class IncidentClusterer:
+    """
+    Groups ticket emails that report the same problem into incidents as they stream past.
+
+    A report joins an incident when it is a reply in a thread the incident
+    already covers, or when its subject and body are near-duplicates of any
+    report in it (single linkage). Only the first report of each incident is
+    passed on, so classification and forwarding cost one ticket per incident
+    however many people report it; annotate() then records the other reports
+    on that ticket.
+    """
+
+    def __init__(self, similarity: float = DEFAULT_SIMILARITY, num_perm: int = DEFAULT_NUM_PERM,
+                 bands: int = DEFAULT_BANDS, compare_chars: int = DEFAULT_COMPARE_CHARS,
+                 metrics: Metrics = None):
+        """
+        Args:
+            similarity: Least estimated Jaccard similarity for two reports to be the same incident
+            num_perm: MinHash signature length
+            bands: LSH bands the signature is cut into
+            compare_chars: Characters of each body compared
+            metrics: Metrics to record clustering time in
+        """
+        self.similarity = similarity
+        self.num_perm = num_perm
+        self.bands = bands
+        self.compare_chars = compare_chars
+        self.metrics = metrics or NULL_METRICS
+        self.reset()
+
+    def reset(self):
+        """
+        Forget all incidents, e.g. before the next scan.
+        """
+        self.index = MinHashIndex(self.num_perm, self.bands)
+        self.incidents: Dict[str, List[EmailRecord]] = {}  # first report's id -> all its reports
+        self._incident_of: Dict[str, str] = {}  # report id -> incident id
+        self._thread_incidents: Dict[str, str] = {}  # thread id -> incident id
+
+    def add(self, email: EmailRecord) -> Optional[str]:
+        """
+        Assign a report to an incident.
+
+        Args:
+            email: Extracted ticket email
+
+        Returns:
+            Id of the existing incident it joined, or None if it opened a new one
+        """
+        text = f"{email.get('subject', '')}\n{email.get('body_text', '')[:self.compare_chars]}"
+        signature = self.index.signature(text)
+        incident_id = self._thread_incidents.get(email.thread_id) if email.thread_id else None
+
+        if incident_id is None and signature is not None:
+            best = self.similarity
+            for key in self.index.candidates(signature):
+                score = self.index.similarity(signature, self.index.signatures[key])
+                if score > best or (score == best and incident_id is None):
+                    best, incident_id = score, self._incident_of[key]
+
+        if incident_id is None:
+            incident_id = email.id
+            self.incidents[incident_id] = [email]
+        else:
+            self.incidents[incident_id].append(email)
+
+        self._incident_of[email.id] = incident_id
+        if email.thread_id:
+            self._thread_incidents.setdefault(email.thread_id, incident_id)
+        if signature is not None:
+            self.index.insert(email.id, signature)
+
+        return None if incident_id == email.id else incident_id
+
+    def iter_first_reports(self, emails: Iterable[EmailRecord]) -> Iterator[EmailRecord]:
+        """
+        Pass on the first report of each incident, holding back the rest.
+        """
+        for email in emails:
+            if self.is_first_report(email):
+                yield email
+
+    def is_first_report(self, email: EmailRecord) -> bool:
+        """
+        Assign a report to an incident, recording the time taken and any duplicate in the metrics.
+
+        Returns:
+            True if the report opened a new incident
+        """
+        with self.metrics.timer('cluster_seconds'):
+            joined = self.add(email)
+        if joined is not None:
+            self.metrics.count('duplicate_reports_total')
+        return joined is None
+
+    def annotate(self, tickets: Iterable[Ticket]):
+        """
+        Record on each incident's ticket how many people reported it and which messages were folded into it.
+        """
+        for ticket in tickets:
+            reports = self.incidents.get(ticket.id)
+            if reports:
+                ticket.reporter_count = len({report.sender for report in reports})
+                ticket.duplicate_ids = [report.id for report in reports[1:]]
+
+    @property
+    def duplicate_reports(self) -> int:
+        return len(self._incident_of) - len(self.incidents)
@@ -0,0 +1,198 @@
+import os
+import time
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .metrics import Metrics, NULL_METRICS
+from .records import EmailRecord, Ticket
+
+# Worker time each chunk of messages should take. Shorter chunks spend relatively more
+# on pickling and inter-process round trips; longer ones make the pipeline lumpier
+TARGET_CHUNK_SECONDS = 0.05
+
+# Chunk size limits; the first chunks are small, until the cost per message is known
+MIN_CHUNK_SIZE = 4
+MAX_CHUNK_SIZE = 1000
+INITIAL_CHUNK_SIZE = 16
+
+# Chunks queued per worker, so workers never wait for the main process to hand out work
+CHUNKS_PER_WORKER = 2
+
+# Headers extract_ticket_content reads; the rest (Received, DKIM and ARC signatures, often
+# a few KB) is dropped before a message is pickled for a worker
+EXTRACTED_HEADERS = frozenset(['Subject', 'From', 'To', 'Date'])
+
+# Analyzer state each worker process builds once, on start, and keeps for its lifetime
+_worker = None
+
+
+def _init_worker(max_body_chars: Optional[int], scoring: bool, ticket_queries: List[str]):
+    global _worker
+    from .gmail_handler import GmailHandler
+    from .keyword_matcher import KeywordMatcher
+    from .ticket_analyzer import TicketAnalyzer
+
+    handler = GmailHandler(max_body_chars=max_body_chars)
+    handler.ticket_queries = ticket_queries
+    handler.ticket_matcher = KeywordMatcher({'ticket': ticket_queries})
+    _worker = (handler, TicketAnalyzer(scoring=scoring))
+
+
+def _ready() -> int:
+    return os.getpid()
+
+
+def _analyze_chunk(messages: List[Dict[str, Any]]) -> Tuple[List[Tuple[EmailRecord, Ticket]], float]:
+    """
+    Extract, filter and classify a chunk of messages in a worker process, the way the serial pipeline does.
+
+    Returns:
+        (email, ticket) pairs for the ticket-related messages in chunk order, and the seconds the chunk took
+    """
+    start = time.perf_counter()
+    handler, analyzer = _worker
+    analyzed = []
+
+    for message in messages:
+        email = handler.extract_ticket_content(message)
+        if handler.is_ticket(email):
+            email.summary = handler.extract_issue_summary(email)
+            analyzed.append((email, analyzer.summarize_ticket(email)))
+
+    return analyzed, time.perf_counter() - start
+
+
+class ParallelAnalyzer:
+    """
+    Runs body extraction, ticket filtering and keyword classification on a pool of worker processes.
+
+    Decoding bodies, converting HTML and the keyword passes are pure-Python CPU
+    work, so threads would take turns on one core. Messages are streamed to
+    the workers in chunks whose size adapts to keep each one near
+    TARGET_CHUNK_SECONDS, and results come back in inbox order, so tickets,
+    clusters and forwards are the same as in a serial scan.
+
+    The workers start with the first scan (or start()) and stay up, with
+    their extractor, matchers and analyzer built, until close().
+    """
+
+    def __init__(self, workers: int, max_body_chars: int = None, scoring: bool = False,
+                 ticket_queries: List[str] = None, metrics: Metrics = None):
+        """
+        Args:
+            workers: Worker processes
+            max_body_chars: Keep only this much of each email body, as GmailHandler does
+            scoring: Classify by weighted keyword scores, as TicketAnalyzer does
+            ticket_queries: Ticket search queries to filter by (GmailHandler's defaults when None)
+            metrics: Metrics to record chunk sizes and times in
+        """
+        self.workers = max(1, workers)
+        self.max_body_chars = max_body_chars
+        self.scoring = scoring
+        self.ticket_queries = ticket_queries
+        self.metrics = metrics or NULL_METRICS
+        self.chunk_size = INITIAL_CHUNK_SIZE
+        self._seconds_per_message = None
+        self._pool = None
+
+    def start(self) -> List[int]:
+        """
+        Start the worker processes and wait until each has built its analyzer state.
+
+        Returns:
+            Worker process IDs
+        """
+        pool = self._get_pool()
+        return [future.result() for future in [pool.submit(_ready) for _ in range(self.workers)]]
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            ticket_queries = self.ticket_queries
+            if ticket_queries is None:
+                from .gmail_handler import GmailHandler
+                ticket_queries = GmailHandler().ticket_queries
+            # Spawned workers do not inherit locks held by the scan's other threads
+            # (token refresh, send pool, push endpoint) the way forked ones would
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(self.max_body_chars, self.scoring, ticket_queries)
+            )
+        return self._pool
+
+    def iter_analyzed(self, messages: Iterable[Dict[str, Any]]) -> Iterator[Tuple[EmailRecord, Ticket]]:
+        """
+        Analyze Gmail messages on the workers as they stream in.
+
+        Args:
+            messages: Gmail API messages in 'full' format, typically an InboxSnapshot
+
+        Yields:
+            (email, ticket) pairs for ticket-related messages, without duplicates, in message order
+        """
+        pool = self._get_pool()
+        in_flight = deque()
+        seen_ids = set()
+        chunk = []
+
+        try:
+            for message in messages:
+                if message['id'] in seen_ids:
+                    continue
+                seen_ids.add(message['id'])
+
+                chunk.append(_strip_headers(message))
+                if len(chunk) >= self.chunk_size:
+                    in_flight.append((len(chunk), pool.submit(_analyze_chunk, chunk)))
+                    chunk = []
+                    # Hand back the oldest chunk's results before queueing more
+                    while len(in_flight) >= self.workers * CHUNKS_PER_WORKER:
+                        yield from self._collect(*in_flight.popleft())
+
+            if chunk:
+                in_flight.append((len(chunk), pool.submit(_analyze_chunk, chunk)))
+            while in_flight:
+                yield from self._collect(*in_flight.popleft())
+
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); the next scan starts a fresh pool
+            self._pool = None
+            raise
+
+        finally:
+            for _, future in in_flight:
+                future.cancel()
+
+    def _collect(self, size: int, future) -> List[Tuple[EmailRecord, Ticket]]:
+        analyzed, seconds = future.result()
+        self.metrics.observe('analysis_chunk_seconds', seconds)
+        self.metrics.count('analysis_messages_total', size)
+        self._adjust_chunk_size(seconds / size)
+        return analyzed
+
+    def _adjust_chunk_size(self, seconds_per_message: float):
+        """
+        Size later chunks to take about TARGET_CHUNK_SECONDS, going by a moving average of the cost per message.
+        """
+        if self._seconds_per_message is None:
+            self._seconds_per_message = seconds_per_message
+        else:
+            self._seconds_per_message = 0.8 * self._seconds_per_message + 0.2 * seconds_per_message
+
+        size = int(TARGET_CHUNK_SECONDS / max(self._seconds_per_message, 1e-6))
+        self.chunk_size = max(MIN_CHUNK_SIZE, min(MAX_CHUNK_SIZE, size))
+
+
+def _strip_headers(message: Dict[str, Any]) -> Dict[str, Any]:
+    payload = message['payload']
+    headers = [header for header in payload.get('headers', []) if header['name'] in EXTRACTED_HEADERS]
+    return {**message, 'payload': {**payload, 'headers': headers}}
@@ -0,0 +1,89 @@
+from dataclasses import dataclass, fields
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+
+class _Record:
+    """
+    Dict-style access to a record's fields, so code written against the old
+    per-message dicts (`record['subject']`, `record.get('from', '')`) keeps working.
+    """
+
+    __slots__ = ()
+
+    # Dict keys that are not valid attribute names
+    _aliases = {'from': 'sender'}
+    _keys = {'sender': 'from'}
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, self._aliases.get(key, key))
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key: str, value: Any):
+        try:
+            setattr(self, self._aliases.get(key, key), value)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __contains__(self, key: str) -> bool:
+        return getattr(self, self._aliases.get(key, key), None) is not None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """
+        Like dict.get; unset (None) fields return the default.
+        """
+        value = getattr(self, self._aliases.get(key, key), None)
+        return default if value is None else value
+
+    def keys(self) -> List[str]:
+        return [self._keys.get(field.name, field.name) for field in fields(self)]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: self[key] for key in self.keys()}
+
+
+@dataclass
+class EmailRecord(_Record):
+    """
+    The parts of a Gmail message the pipeline uses; HTML bodies are converted to text and not kept.
+    """
+
+    __slots__ = ('id', 'thread_id', 'subject', 'sender', 'to', 'date', 'timestamp', 'body_text', 'summary')
+
+    id: str
+    thread_id: str
+    subject: str
+    sender: str
+    to: str
+    date: str
+    timestamp: float  # seconds since the epoch
+    body_text: str
+    summary: Optional[str]
+
+
+@dataclass
+class Ticket(_Record):
+    """
+    A classified support ticket. `body` is the same string object as the email's body_text, not a copy.
+    """
+
+    __slots__ = (
+        'id', 'subject', 'category', 'is_urgent', 'timestamp', 'sender', 'forward_to', 'body',
+        'summary', 'confidence', 'classified_by', 'reporter_count', 'duplicate_ids'
+    )
+
+    id: str
+    subject: str
+    category: str
+    is_urgent: bool
+    timestamp: datetime
+    sender: str
+    forward_to: List[str]
+    body: str
+    summary: Optional[str]
+    confidence: Optional[float]  # only set by the scoring classifier
+    classified_by: Optional[str]  # only set by the hybrid classifier
+    reporter_count: int  # distinct senders of the reports clustered into this ticket
+    duplicate_ids: List[str]  # ids of the other reports clustered into this ticket
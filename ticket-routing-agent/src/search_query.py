@@ -0,0 +1,55 @@
+from typing import List, Iterable
+
+# Gmail does not document a limit on q=, but very long searches are rejected; stay well below it
+MAX_QUERY_LENGTH = 1024
+
+
+def quote_term(term: str) -> str:
+    """
+    Quote a search term for Gmail's query syntax.
+
+    Args:
+        term: Word or phrase to search for
+
+    Returns:
+        The term as is if it is a single plain word, otherwise as a quoted phrase
+    """
+    term = term.replace('"', ' ').strip()
+    if term.replace('-', '').replace('_', '').isalnum():
+        return term
+    return f'"{term}"'
+
+
+def compile_search_queries(terms: Iterable[str], filters: str = '',
+                           max_length: int = MAX_QUERY_LENGTH) -> List[str]:
+    """
+    Compile search terms into Gmail queries matching any of them, e.g.
+    '{bug issue "not working"} newer_than:7d'.
+
+    Terms are packed into as few queries as the length limit allows; a
+    message matches the terms if it matches any of the queries.
+
+    Args:
+        terms: Words or phrases, any of which makes a message match
+        filters: Gmail search operators added to every query, e.g. 'newer_than:7d'
+        max_length: Longest query to produce
+
+    Returns:
+        List of Gmail search queries
+    """
+    suffix = f" {filters}" if filters else ''
+    queries = []
+    group = []
+
+    for term in dict.fromkeys(quote_term(term) for term in terms):
+        if not term.strip('"'):
+            continue
+        if group and len('{' + ' '.join(group + [term]) + '}' + suffix) > max_length:
+            queries.append('{' + ' '.join(group) + '}' + suffix)
+            group = []
+        group.append(term)
+
+    if group:
+        queries.append('{' + ' '.join(group) + '}' + suffix)
+
+    return queries
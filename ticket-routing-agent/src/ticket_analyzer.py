@@ -1,6 +1,21 @@
 import re
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Iterable, Iterator, Set
+
+from .keyword_matcher import KeywordMatcher
+from .metrics import Metrics, NULL_METRICS
+from .records import EmailRecord, Ticket
+
+# Matcher label for urgency keywords, kept apart from the department categories
+URGENT_LABEL = 'urgent'
+
+
+def _category_name(category: str) -> str:
+    """
+    Display name of an issue category key, e.g. 'cross_functional' -> 'Cross-Functional'.
+    """
+    return category.replace('_', '-').title()
+
 
 class TicketAnalyzer:
     """
@@ -12,10 +27,16 @@ class TicketAnalyzer:
     backend_support_email = "backend@fakemail.com"
     sysops_support_email = "sysops@fakemail.com"
 
-    def __init__(self):
+    def __init__(self, scoring: bool = False, metrics: Metrics = None):
         """
         Initialize the TicketAnalyzer.
+
+        Args:
+            scoring: Classify by weighted keyword scores instead of the first matching category
+            metrics: Records per-ticket classification latency (off when None)
         """
+        self.scoring = scoring
+        self.metrics = metrics or NULL_METRICS
 
         # Define department categories for ticket classification
         self.issue_categories = {
@@ -42,6 +63,26 @@ class TicketAnalyzer:
             ]
         }
 
+        self.urgent_keywords = ['urgent', 'asap', 'immediately', 'critical', 'important', 'high priority', '500', '502', 'crash']
+
+        # One matcher covers every category and the urgency keywords, so a ticket is scanned once
+        self.matcher = KeywordMatcher({**self.issue_categories, URGENT_LABEL: self.urgent_keywords})
+
+        # Scoring mode: a match in the subject counts more than one in the body
+        self.field_weights = {'subject': 2.0, 'body': 1.0}
+
+        # Multi-word phrases are more specific than single words; keywords shared
+        # between categories split their weight
+        self.keyword_specificity = {}
+        self._keyword_categories = {}
+        for keyword, labels in self.matcher.keyword_labels.items():
+            categories = tuple(label for label in labels if label in self.issue_categories)
+            if categories:
+                self.keyword_specificity[keyword] = len(keyword.split()) / len(categories)
+                self._keyword_categories[keyword] = categories
+
+        self._category_order = {category: index for index, category in enumerate(self.issue_categories)}
+
 
     def classify_ticket(self, subject: str, body: str) -> str:
         """
@@ -54,12 +95,60 @@ class TicketAnalyzer:
         Returns:
             A string representing the issue category
         """
-        text = f"{subject} {body}".lower()
+        if self.scoring:
+            return self._category_from_ranking(self.score_ticket(subject, body))
+
+        return self._category_from_labels(self.matcher.labels(f"{subject} {body}"))
+
+    def score_ticket(self, subject: str, body: str) -> List[Tuple[str, float]]:
+        """
+        Rank categories by weighted whole-word keyword matches.
+
+        Each match adds the keyword's specificity times the weight of the field
+        (subject or body) it was found in.
+
+        Args:
+            subject: The email subject
+            body: The email body content
+
+        Returns:
+            (category, confidence) pairs, best first, with confidences summing to 1;
+            empty when no category keyword matched
+        """
+        return self._rank_matches(self.matcher.find_all(f"{subject}\n{body}"), len(subject))
 
-        for category, keywords in self.issue_categories.items():
-            for keyword in keywords:
-                if keyword in text:
-                    return category.title()
+    def _rank_matches(self, matches, subject_length: int) -> List[Tuple[str, float]]:
+        subject_weight = self.field_weights['subject']
+        body_weight = self.field_weights['body']
+        scores = {}
+
+        for match in matches:
+            if not match.whole_word or match.keyword not in self._keyword_categories:
+                continue
+
+            field_weight = subject_weight if match.start < subject_length else body_weight
+            weight = field_weight * self.keyword_specificity[match.keyword]
+            for category in self._keyword_categories[match.keyword]:
+                scores[category] = scores.get(category, 0.0) + weight
+
+        if not scores:
+            return []
+
+        total = sum(scores.values())
+        # Ties go to the category listed first in issue_categories
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], self._category_order[item[0]]))
+        return [(_category_name(category), score / total) for category, score in ranked]
+
+    def _category_from_ranking(self, ranking: List[Tuple[str, float]]) -> str:
+        return ranking[0][0] if ranking else "Cross-Functional"
+
+    def _category_from_labels(self, labels: Set[str]) -> str:
+        """
+        Pick the first category, in issue_categories order, that has a keyword match.
+        """
+        for category in self.issue_categories:
+            if category in labels:
+                return _category_name(category)
 
         return "Cross-Functional"
     
@@ -101,44 +190,77 @@ class TicketAnalyzer:
         Returns:
             Boolean indicating urgency
         """
-        urgent_keywords = ['urgent', 'asap', 'immediately', 'critical', 'important', 'high priority', '500', '502', 'crash']
-        combined = f"{subject} {body}".lower()
-        return any(word in combined for word in urgent_keywords)
+        return URGENT_LABEL in self.matcher.labels(f"{subject} {body}")
+
+    def summarize_ticket(self, email: EmailRecord) -> Ticket:
+        """
+        Analyze and categorize a single support ticket email.
 
-    def summarize_tickets(self, emails: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        Args:
+            email: Extracted email record
+
+        Returns:
+            Ticket summary
+        """
+        subject = email.get('subject', '')
+        body = email.get('body_text', '')
+        timestamp = datetime.fromtimestamp(email.get('timestamp', 0))
+
+        confidence = None
+        if self.scoring:
+            matches = self.matcher.find_all(f"{subject}\n{body}")
+            ranking = self._rank_matches(matches, len(subject))
+            category = self._category_from_ranking(ranking)
+            is_urgent = any(URGENT_LABEL in match.labels for match in matches)
+            confidence = ranking[0][1] if ranking else 0.0
+        else:
+            labels = self.matcher.labels(f"{subject} {body}")
+            category = self._category_from_labels(labels)
+            is_urgent = URGENT_LABEL in labels
+
+        return Ticket(
+            id=email.get('id'),
+            subject=subject,
+            category=category,
+            is_urgent=is_urgent,
+            timestamp=timestamp,
+            sender=email.get('from'),
+            forward_to=self.classify_department(category),
+            body=body,
+            summary=email.get('summary'),
+            confidence=confidence,
+            classified_by=None,
+            reporter_count=1,
+            duplicate_ids=[]
+        )
+
+    def summarize_tickets(self, emails: Iterable[EmailRecord]) -> List[Ticket]:
         """
         Analyze and categorize a list of support ticket emails.
 
+        Emails are consumed one at a time, so a lazy generator is classified
+        while it is still being produced.
+
         Args:
-            emails: List of email data dictionaries
+            emails: Iterable of extracted email records
 
         Returns:
             List of ticket summaries
         """
-        tickets = []
-        for email in emails:
-            subject = email.get('subject', '')
-            body = email.get('body_text', '')
-            timestamp = datetime.fromtimestamp(email.get('timestamp', 0))
+        return list(self.iter_summaries(emails))
 
-            category = self.classify_ticket(subject, body)
-            is_urgent = self.is_urgent(subject, body)
-
-            ticket = {
-                'id': email.get('id'),
-                'subject': subject,
-                'category': category,
-                'is_urgent': is_urgent,
-                'timestamp': timestamp,
-                'from': email.get('from'),
-                'forward_to': self.classify_department(category),
-                'body': body,
-            }
-            tickets.append(ticket)
+    def iter_summaries(self, emails: Iterable[EmailRecord]) -> Iterator[Ticket]:
+        """
+        Yield the ticket summary of each email as soon as it is classified.
+        """
+        timer = self.metrics.timer
 
-        return tickets
+        for email in emails:
+            with timer('classify_seconds'):
+                ticket = self.summarize_ticket(email)
+            yield ticket
 
-    def generate_ticket_report(self, tickets: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def generate_ticket_report(self, tickets: List[Ticket]) -> Dict[str, Any]:
         """
         Generate summary statistics and insights from ticket data.
 
@@ -148,9 +270,14 @@ class TicketAnalyzer:
         Returns:
             A report dictionary
         """
+        with self.metrics.timer('stage_seconds', stage='report'):
+            return self._ticket_report(tickets)
+
+    def _ticket_report(self, tickets: List[Ticket]) -> Dict[str, Any]:
         total = len(tickets)
         category_counts = {}
         urgent_count = 0
+        duplicate_reports = 0
 
         for ticket in tickets:
             category = ticket['category']
@@ -161,8 +288,11 @@ class TicketAnalyzer:
             if ticket['is_urgent']:
                 urgent_count += 1
 
+            duplicate_reports += len(ticket.get('duplicate_ids', []))
+
         return {
             'total_tickets': total,
             'category_breakdown': category_counts,
             'urgent_tickets': urgent_count,
+            'duplicate_reports': duplicate_reports,
         }
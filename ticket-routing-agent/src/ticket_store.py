@@ -0,0 +1,260 @@
+import os
+import csv
+import json
+import time
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .forward_scheduler import received_at
+
+# Rows fetched from SQLite at a time while exporting
+EXPORT_FETCH_SIZE = 1000
+
+# Ticket columns in export order; list columns are stored as JSON arrays
+TICKET_COLUMNS = (
+    'id', 'run_id', 'subject', 'category', 'is_urgent', 'received_at', 'sender', 'forward_to',
+    'summary', 'confidence', 'classified_by', 'reporter_count', 'duplicate_count', 'duplicate_ids'
+)
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS runs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        started_at REAL NOT NULL,
+        finished_at REAL,
+        inbox_emails INTEGER,
+        ticket_emails INTEGER,
+        tickets INTEGER,
+        urgent_tickets INTEGER,
+        duplicate_reports INTEGER,
+        forwards INTEGER,
+        failed_forwards INTEGER,
+        history_id TEXT
+    );
+    CREATE TABLE IF NOT EXISTS tickets (
+        id TEXT PRIMARY KEY,
+        run_id INTEGER NOT NULL,
+        subject TEXT,
+        category TEXT NOT NULL,
+        is_urgent INTEGER NOT NULL,
+        received_at REAL NOT NULL,
+        sender TEXT,
+        forward_to TEXT,
+        summary TEXT,
+        confidence REAL,
+        classified_by TEXT,
+        reporter_count INTEGER NOT NULL DEFAULT 1,
+        duplicate_count INTEGER NOT NULL DEFAULT 0,
+        duplicate_ids TEXT
+    );
+    -- The report groups by category; the other columns it reads are in the index, so reports
+    -- over all tickets or a time window never read the table
+    CREATE INDEX IF NOT EXISTS idx_tickets_category ON tickets (category, is_urgent, duplicate_count, received_at);
+    CREATE INDEX IF NOT EXISTS idx_tickets_urgent ON tickets (is_urgent, received_at);
+    CREATE INDEX IF NOT EXISTS idx_tickets_sender ON tickets (sender);
+    CREATE INDEX IF NOT EXISTS idx_tickets_received ON tickets (received_at);
+    CREATE INDEX IF NOT EXISTS idx_tickets_run ON tickets (run_id);
+    CREATE TABLE IF NOT EXISTS forwards (
+        run_id INTEGER NOT NULL,
+        ticket_id TEXT NOT NULL,
+        recipient TEXT NOT NULL,
+        forwarded_at REAL NOT NULL,
+        delivered INTEGER NOT NULL,
+        status TEXT,
+        PRIMARY KEY (run_id, ticket_id, recipient)
+    );
+    CREATE INDEX IF NOT EXISTS idx_forwards_ticket ON forwards (ticket_id);
+"""
+
+
+class TicketStore:
+    """
+    A local SQLite history of scans, the tickets they classified and the outcome of each forward.
+
+    The database is in WAL mode, so reports and exports can read it while a
+    daemon scan writes. Each scan's tickets are upserted in one transaction
+    (a ticket seen again takes its latest classification), and reports are
+    aggregate queries answered from the indexes, so they stay fast over
+    millions of tickets.
+    """
+
+    def __init__(self, db_path: str = None):
+        """
+        Open (or create) the ticket database.
+
+        Args:
+            db_path: Path to the SQLite file, defaults to config/tickets.db
+        """
+        self.db_path = db_path or os.path.join(
+            Path(__file__).parent.parent, 'config', 'tickets.db'
+        )
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # Durable at each checkpoint rather than each commit, which WAL makes safe against corruption
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+
+    ### Recording Scans ###
+
+    def start_run(self) -> int:
+        """
+        Returns:
+            ID of a new scan run
+        """
+        with self.conn:
+            return self.conn.execute("INSERT INTO runs (started_at) VALUES (?)", (time.time(),)).lastrowid
+
+    def upsert_tickets(self, run_id: int, tickets: Iterable[Any]):
+        """
+        Insert or update tickets in one transaction.
+
+        Args:
+            run_id: Run that classified the tickets
+            tickets: Ticket records or dicts, streamed into the statement
+        """
+        with self.conn:
+            self.conn.executemany(
+                f"""
+                INSERT INTO tickets ({', '.join(TICKET_COLUMNS)})
+                VALUES ({', '.join('?' * len(TICKET_COLUMNS))})
+                ON CONFLICT (id) DO UPDATE SET
+                    {', '.join(f'{column} = excluded.{column}' for column in TICKET_COLUMNS[1:])}
+                """,
+                (_ticket_row(run_id, ticket) for ticket in tickets)
+            )
+
+    def finish_run(self, run_id: int, summary: Dict[str, Any], outcomes: Iterable[Tuple[str, str, float, bool, str]],
+                   history_id: Optional[str] = None):
+        """
+        Record a scan's forwards and totals in one transaction.
+
+        Args:
+            run_id: Run to finish
+            summary: The scan's ticket report (see generate_ticket_report) with its inbox counts
+            outcomes: (ticket id, recipient, forwarded at, delivered, status line) per forward, as ForwardLog
+                collects them
+            history_id: Gmail historyId the scan synced to
+        """
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO forwards (run_id, ticket_id, recipient, forwarded_at, delivered, status) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                ((run_id, ticket_id, recipient, forwarded_at, int(delivered), status)
+                 for ticket_id, recipient, forwarded_at, delivered, status in outcomes)
+            )
+            forwards, delivered = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(delivered), 0) FROM forwards WHERE run_id = ?", (run_id,)
+            ).fetchone()
+            self.conn.execute(
+                """
+                UPDATE runs SET finished_at = ?, inbox_emails = ?, ticket_emails = ?, tickets = ?,
+                    urgent_tickets = ?, duplicate_reports = ?, forwards = ?, failed_forwards = ?, history_id = ?
+                WHERE id = ?
+                """,
+                (time.time(), summary.get('inbox_emails'), summary.get('ticket_emails'),
+                 summary.get('total_tickets'), summary.get('urgent_tickets'), summary.get('duplicate_reports'),
+                 forwards, forwards - delivered, None if history_id is None else str(history_id), run_id)
+            )
+
+    ### Queries ###
+
+    def generate_ticket_report(self, run_id: int = None, since: float = None) -> Dict[str, Any]:
+        """
+        Summary statistics over stored tickets, in the shape of TicketAnalyzer.generate_ticket_report.
+
+        Args:
+            run_id: Only tickets last classified by this run
+            since: Only tickets received at or after this time, in seconds since the epoch
+
+        Returns:
+            A report dictionary
+        """
+        where, params = _ticket_filter(run_id, since)
+        rows = self.conn.execute(
+            f"SELECT category, COUNT(*), SUM(is_urgent), SUM(duplicate_count) FROM tickets{where} "
+            f"GROUP BY category ORDER BY category",
+            params
+        ).fetchall()
+
+        return {
+            'total_tickets': sum(row[1] for row in rows),
+            'category_breakdown': {category: count for category, count, _, _ in rows},
+            'urgent_tickets': sum(row[2] for row in rows),
+            'duplicate_reports': sum(row[3] for row in rows),
+        }
+
+    def iter_tickets(self, run_id: int = None, since: float = None) -> Iterator[Dict[str, Any]]:
+        """
+        Yield stored tickets oldest first, a batch of rows at a time.
+
+        Yields:
+            Dicts keyed by TICKET_COLUMNS, with list columns decoded
+        """
+        where, params = _ticket_filter(run_id, since)
+        cursor = self.conn.execute(
+            f"SELECT {', '.join(TICKET_COLUMNS)} FROM tickets{where} ORDER BY received_at", params
+        )
+        while True:
+            rows = cursor.fetchmany(EXPORT_FETCH_SIZE)
+            if not rows:
+                return
+            for row in rows:
+                ticket = dict(zip(TICKET_COLUMNS, row))
+                ticket['is_urgent'] = bool(ticket['is_urgent'])
+                ticket['forward_to'] = json.loads(ticket['forward_to'] or '[]')
+                ticket['duplicate_ids'] = json.loads(ticket['duplicate_ids'] or '[]')
+                yield ticket
+
+    def export(self, filepath: str, run_id: int = None, since: float = None) -> int:
+        """
+        Stream stored tickets to a file: JSON Lines for a .jsonl path, otherwise CSV.
+
+        Args:
+            filepath: Destination path
+            run_id: Only tickets last classified by this run
+            since: Only tickets received at or after this time, in seconds since the epoch
+
+        Returns:
+            Number of tickets written
+        """
+        written = 0
+        with open(filepath, 'w', newline='') as f:
+            if filepath.endswith('.jsonl'):
+                for ticket in self.iter_tickets(run_id, since):
+                    f.write(json.dumps(ticket) + "\n")
+                    written += 1
+            else:
+                writer = csv.DictWriter(f, fieldnames=TICKET_COLUMNS)
+                writer.writeheader()
+                for ticket in self.iter_tickets(run_id, since):
+                    ticket['received_at'] = datetime.fromtimestamp(ticket['received_at']).isoformat(timespec='seconds')
+                    ticket['forward_to'] = " ".join(ticket['forward_to'])
+                    ticket['duplicate_ids'] = " ".join(ticket['duplicate_ids'])
+                    writer.writerow(ticket)
+                    written += 1
+        return written
+
+    def close(self):
+        self.conn.close()
+
+
+def _ticket_row(run_id: int, ticket: Any) -> Tuple:
+    duplicate_ids = ticket.get('duplicate_ids', [])
+    return (
+        ticket.get('id'), run_id, ticket.get('subject'), ticket.get('category'), int(ticket.get('is_urgent') is True),
+        received_at(ticket), ticket.get('from'), json.dumps(ticket.get('forward_to', [])), ticket.get('summary'),
+        ticket.get('confidence'), ticket.get('classified_by'), ticket.get('reporter_count', 1), len(duplicate_ids),
+        json.dumps(duplicate_ids)
+    )
+
+
+def _ticket_filter(run_id: Optional[int], since: Optional[float]) -> Tuple[str, List[Any]]:
+    conditions, params = [], []
+    if run_id is not None:
+        conditions.append("run_id = ?")
+        params.append(run_id)
+    if since is not None:
+        conditions.append("received_at >= ?")
+        params.append(since)
+    return (" WHERE " + " AND ".join(conditions) if conditions else ""), params
@@ -0,0 +1,72 @@
+# Connections kept open to each Gmail host, shared by every thread
+DEFAULT_POOL_SIZE = 10
+
+# Seconds to wait for a connection to Gmail, and for each read once connected
+DEFAULT_CONNECT_TIMEOUT = 10
+DEFAULT_READ_TIMEOUT = 60
+
+# Same as httplib2.DEFAULT_MAX_REDIRECTS, which is not imported until a request is sent
+DEFAULT_MAX_REDIRECTS = 5
+
+
+class PooledHttp:
+    """
+    A thread-safe stand-in for the httplib2.Http object googleapiclient sends requests through.
+
+    Requests go through a google-auth AuthorizedSession, which adds (and refreshes)
+    the OAuth token, over a urllib3 pool of keep-alive connections shared by all
+    threads. Concurrent fetches and sends therefore reuse TLS connections, also
+    across worker pools and daemon scans, instead of each thread opening its own.
+    """
+
+    def __init__(self, credentials, pool_size: int = DEFAULT_POOL_SIZE,
+                 connect_timeout: float = DEFAULT_CONNECT_TIMEOUT, read_timeout: float = DEFAULT_READ_TIMEOUT):
+        """
+        Args:
+            credentials: google-auth credentials to authorize requests with
+            pool_size: Most connections kept open per host; more threads than this still
+                run concurrently, but the extra connections are closed after use
+            connect_timeout: Seconds to wait for a connection
+            read_timeout: Seconds to wait for each read from the server
+        """
+        from google.auth.transport.requests import AuthorizedSession
+        from requests.adapters import HTTPAdapter
+
+        # googleapiclient reads this to authorize each part of a batch request
+        self.credentials = credentials
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = AuthorizedSession(credentials)
+        # Gmail requests are retried by GmailHandler, not by the transport
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def request(self, uri, method='GET', body=None, headers=None,
+                redirections=DEFAULT_MAX_REDIRECTS, connection_type=None):
+        """
+        Send a request the way httplib2.Http.request does.
+
+        Returns:
+            (httplib2.Response, bytes) tuple of the response headers and status, and its body
+        """
+        # Loaded with the Gmail client it serves, not when the agent is imported
+        import httplib2
+
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+
+        response = self.session.request(
+            method, uri, data=body, headers=headers, timeout=self.timeout, allow_redirects=redirections > 0
+        )
+
+        info = {key.lower(): value for key, value in response.headers.items()}
+        # requests has already decompressed the body; httplib2 marks that the same way
+        if 'content-encoding' in info:
+            info['-content-encoding'] = info.pop('content-encoding')
+        info['status'] = str(response.status_code)
+        resp = httplib2.Response(info)
+        resp.reason = response.reason
+        return resp, response.content
+
+    def close(self):
+        self.session.close()
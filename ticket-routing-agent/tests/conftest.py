@@ -0,0 +1,36 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.agent import TicketRoutingAgent  # noqa: E402
+from src.rate_limiter import TokenBucket  # noqa: E402
+
+
+@pytest.fixture
+def make_agent(tmp_path):
+    """
+    Build TicketRoutingAgents that scan a fake Gmail service with sends unthrottled.
+
+    Their checkpoint, ticket store and verdict cache live in the test's tmp_path,
+    and every agent built is closed when the test ends.
+    """
+    agents = []
+
+    def make(service, **options):
+        options.setdefault('checkpoint_path', str(tmp_path / 'checkpoint.db'))
+        options.setdefault('store_path', str(tmp_path / 'tickets.db'))
+        options.setdefault('llm_cache_path', str(tmp_path / 'llm_cache.db'))
+        agent = TicketRoutingAgent(**options)
+        handler = agent.gmail_handler
+        handler.service = service
+        handler.authenticate = lambda: True
+        handler.send_limiter = TokenBucket(1e12, 1e12)
+        agents.append(agent)
+        return agent
+
+    yield make
+    for agent in agents:
+        agent.close()
@@ -0,0 +1,36 @@
+"""
+Closing the agent must stop its analysis worker processes, whether a scan or the daemon used them.
+"""
+import os
+
+import pytest
+
+from src.daemon import ScanDaemon
+from benchmarks.fake_gmail import FakeGmailService, make_message
+
+
+def inbox():
+    return FakeGmailService([make_message(index) for index in range(40)])
+
+
+def assert_exited(pids):
+    for pid in pids:
+        with pytest.raises(ProcessLookupError):
+            os.kill(pid, 0)
+
+
+def test_close_shuts_down_analysis_workers(make_agent):
+    with make_agent(inbox(), analysis_workers=2) as agent:
+        pids = agent.parallel_analyzer.start()
+        assert len(agent.scan_gmail()) == 25
+    assert_exited(pids)
+    agent.close()  # a second close is harmless
+
+
+def test_daemon_closes_agent_when_stopped(make_agent):
+    agent = make_agent(inbox(), analysis_workers=2, incremental=True)
+    pids = agent.parallel_analyzer.start()
+    daemon = ScanDaemon(agent)
+    daemon.stop()
+    daemon.run()
+    assert_exited(pids)
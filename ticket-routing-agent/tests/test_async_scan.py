@@ -0,0 +1,35 @@
+"""
+Memory bounds of the asyncio scan, against the fake Gmail service.
+"""
+import time
+import asyncio
+
+from src.async_scan import AsyncScan
+from benchmarks.fake_gmail import FakeGmailService, make_inbox
+
+
+def test_extracted_batches_are_bounded_while_sends_are_slow(make_agent, monkeypatch):
+    agent = make_agent(FakeGmailService(make_inbox(1000, ticket_share=0.5)), queue_size=20)
+    handler = agent.gmail_handler
+    handler.batch_size = 10
+    forward_email = handler.forward_email
+
+    def slow_forward_email(*send):
+        time.sleep(0.002)
+        return forward_email(*send)
+
+    handler.forward_email = slow_forward_email
+
+    peak = [0]
+    summarize = AsyncScan._summarize
+
+    async def measured_summarize(scan, emails, tickets):
+        peak[0] = max(peak[0], len(scan._extracted))
+        await summarize(scan, emails, tickets)
+
+    monkeypatch.setattr(AsyncScan, '_summarize', measured_summarize)
+
+    tickets = asyncio.run(agent.scan_gmail_async())
+    assert len(tickets) > 400
+    # queue_size // batch_size, plus one batch per fetch and extraction worker
+    assert peak[0] <= 20 // 10 + agent.fetch_concurrency + agent.classify_concurrency
@@ -0,0 +1,47 @@
+"""
+Batched message fetches against the fake Gmail service, when Gmail throttles some calls inside a batch.
+"""
+from src.gmail_handler import DEFAULT_BATCH_SIZE, GmailHandler
+from src.metrics import Metrics
+from benchmarks.fake_gmail import FakeGmailService, make_message
+
+
+def make_handler(service, **options):
+    handler = GmailHandler(metrics=Metrics(), **options)
+    handler.service = service
+    handler.retry_base_delay = 0
+    return handler
+
+
+def counter(handler, name, **labels):
+    return handler.metrics.counters.get((name, tuple(sorted((key, str(value)) for key, value in labels.items()))), 0)
+
+
+def test_default_batch_size_is_gmails_recommended_limit():
+    assert GmailHandler().batch_size == DEFAULT_BATCH_SIZE == 50
+
+
+def test_throttled_messages_are_fetched_again_after_backoff():
+    messages = [make_message(index) for index in range(120)]
+    throttled = {message['id']: 2 for message in messages[::7]}
+    handler = make_handler(FakeGmailService(messages, throttled_ids=throttled))
+
+    fetched = handler.get_messages([message['id'] for message in messages])
+
+    assert [message['id'] for message in fetched] == [message['id'] for message in messages]
+    assert counter(handler, 'gmail_retries_total', method='messages.get') == 2 * len(throttled)
+    assert counter(handler, 'messages_failed_total', format='full') == 0
+
+
+def test_messages_still_throttled_are_reported_as_failed():
+    messages = [make_message(index) for index in range(60)]
+    stuck = [messages[3]['id'], messages[55]['id']]
+    service = FakeGmailService(messages, throttled_ids={stuck[0]: 10, stuck[1]: 10, messages[9]['id']: 1})
+    handler = make_handler(service, max_retries=2)
+
+    inbox = handler.fetch_inbox()
+    fetched = list(inbox)
+
+    assert len(fetched) == len(messages) - 2
+    assert inbox.failed_ids == stuck
+    assert counter(handler, 'messages_failed_total', format='full') == 2
@@ -0,0 +1,47 @@
+"""
+Forward order and outcomes of the urgent-first forward scheduler, against the fake Gmail service.
+"""
+import re
+import asyncio
+
+import pytest
+
+from src.forward_scheduler import ForwardScheduler
+from src.gmail_handler import GmailHandler
+from src.rate_limiter import TokenBucket
+from benchmarks.fake_gmail import FakeGmailService, make_inbox
+
+
+def without_latency(statuses):
+    return [re.sub(r' \(\d+ ms\)$', '', status) for status in statuses]
+
+
+@pytest.mark.parametrize('use_async', [False, True], ids=['sync', 'async'])
+def test_statuses_keep_forward_classified_emails_order(make_agent, use_async):
+    service = FakeGmailService(make_inbox(400, ticket_share=0.5), latency=0.001)
+    agent = make_agent(service, send_workers=4)
+
+    tickets = asyncio.run(agent.scan_gmail_async()) if use_async else agent.scan_gmail()
+
+    handler = make_agent(FakeGmailService([])).gmail_handler
+    expected = handler.forward_classified_emails(tickets)
+    assert len(tickets) > 100
+    assert without_latency(agent.forwarded_tickets) == without_latency(expected)
+
+
+def test_failed_sends_are_not_counted_as_forwarded(make_agent):
+    handler = GmailHandler(send_workers=2, max_retries=0)
+    service = FakeGmailService(make_inbox(200, ticket_share=0.5), send_errors=[400] * 3)
+    handler.service = service
+    handler.send_limiter = TokenBucket(1e12, 1e12)
+    tickets = [ticket for ticket in make_agent(service).ticket_analyzer.summarize_tickets(
+        handler.query_inbox_for_ticket(handler.fetch_inbox())) if len(ticket.forward_to) == 1]
+
+    scheduler = ForwardScheduler(handler, workers=2)
+    scheduler.submit(tickets)
+    statuses = scheduler.close()
+
+    assert [status.delivered for status in statuses].count(False) == 3
+    report = scheduler.log.report()
+    assert sum(delays['failed'] for delays in report.values()) == 3
+    assert sum(delays['forwarded'] for delays in report.values()) == len(tickets) - 3
@@ -0,0 +1,66 @@
+"""
+Incremental scans against the offline fake Gmail service: a message whose fetch
+fails must be retried by the following scans, not dropped with the history it was listed in.
+"""
+import asyncio
+
+import pytest
+
+from benchmarks.fake_gmail import FakeGmailService, make_message
+
+TICKET_INDEXES = [0, 1, 2, 5, 7]  # make_message indexes whose subjects are bug reports
+
+
+def scan(agent, use_async):
+    if use_async:
+        return asyncio.run(agent.scan_gmail_async())
+    return agent.scan_gmail()
+
+
+def deliver_tickets(service, first, count):
+    """Add count bug-report messages to the inbox, with IDs numbered from first."""
+    ids = []
+    for number in range(first, first + count):
+        message = make_message(TICKET_INDEXES[number % len(TICKET_INDEXES)])
+        message['id'] = f"new{number:08d}"
+        service.add_message(message)
+        ids.append(message['id'])
+    return ids
+
+
+@pytest.mark.parametrize('options', [{}, {'prefilter': True}], ids=['full', 'prefilter'])
+@pytest.mark.parametrize('use_async', [False, True], ids=['sync', 'async'])
+def test_failed_fetch_is_retried_by_next_scan(make_agent, use_async, options):
+    service = FakeGmailService([make_message(index) for index in range(40)])
+    agent = make_agent(service, incremental=True, **options)
+
+    tickets = scan(agent, use_async)
+    assert len(tickets) == 25
+
+    new_ids = deliver_tickets(service, 0, 3)
+    service.failing_ids = {new_ids[1]}
+    tickets = scan(agent, use_async)
+    assert [ticket.id for ticket in tickets] == [new_ids[0], new_ids[2]]
+    assert agent.inbox.failed_ids == [new_ids[1]]
+
+    # Nothing new arrives, but the failed message is fetched once Gmail serves it again
+    service.failing_ids = set()
+    tickets = scan(agent, use_async)
+    assert [ticket.id for ticket in tickets] == [new_ids[1]]
+    assert agent.inbox.failed_ids == []
+
+    assert scan(agent, use_async) == []
+
+
+def test_failed_fetch_is_retried_alongside_new_mail(make_agent):
+    service = FakeGmailService([make_message(index) for index in range(10)])
+    agent = make_agent(service, incremental=True)
+    agent.scan_gmail()
+
+    failing = deliver_tickets(service, 0, 1)
+    service.failing_ids = set(failing)
+    assert agent.scan_gmail() == []
+
+    service.failing_ids = set()
+    arrived = deliver_tickets(service, 1, 2)
+    assert [ticket.id for ticket in agent.scan_gmail()] == failing + arrived
@@ -0,0 +1,85 @@
+"""
+KeywordMatcher's Aho-Corasick and trie-regex backends against the naive per-keyword scan they replace.
+"""
+import pytest
+
+from src import keyword_matcher
+from src.keyword_matcher import KeywordMatch, KeywordMatcher
+
+KEYWORDS = {
+    'backend': ['API', 'api error', 'error', 'err', 'server error', 'timeout'],
+    'frontend': ['ui', 'button', 'api', 'layout'],
+    'urgent': ['down', 'outage', 'urgent'],
+}
+
+TEXTS = [
+    "API error: the Server Error page times out (timeout) and the UI button is DOWN",
+    "apiapi errerror buttons buttonhole",
+    "Erroneous layout-outage, down-time; urgent!!",
+    "nothing to see here",
+    "",
+]
+
+BACKENDS = [
+    pytest.param(True, id='automaton', marks=pytest.mark.skipif(
+        keyword_matcher.ahocorasick is None, reason='pyahocorasick is not installed')),
+    pytest.param(False, id='regex'),
+]
+
+
+def naive_matches(keywords, text):
+    """Every occurrence of every keyword found by `keyword in text.lower()`, one keyword at a time."""
+    text = text.lower()
+    labels = {}
+    for label, words in keywords.items():
+        for word in words:
+            labels.setdefault(word.lower(), [])
+            if label not in labels[word.lower()]:
+                labels[word.lower()].append(label)
+
+    matches = []
+    for word, word_labels in labels.items():
+        start = text.find(word)
+        while start != -1:
+            end = start + len(word)
+            whole_word = (start == 0 or not text[start - 1].isalnum()) and (end == len(text) or not text[end].isalnum())
+            matches.append(KeywordMatch(start, word, tuple(word_labels), whole_word))
+            start = text.find(word, start + 1)
+    return sorted(matches, key=lambda match: (match.start, -len(match.keyword)))
+
+
+@pytest.mark.parametrize('use_automaton', BACKENDS)
+@pytest.mark.parametrize('text', TEXTS)
+def test_matches_agree_with_naive_scan(use_automaton, text):
+    matcher = KeywordMatcher(KEYWORDS, use_automaton=use_automaton)
+    expected = naive_matches(KEYWORDS, text)
+
+    assert matcher.find_all(text) == expected
+    assert matcher.labels(text) == {label for match in expected for label in match.labels}
+    assert matcher.contains_any(text) == bool(expected)
+
+
+@pytest.mark.parametrize('use_automaton', BACKENDS)
+def test_prefix_keywords_match_at_the_same_position_longest_first(use_automaton):
+    matcher = KeywordMatcher({'a': ['e', 'er', 'err', 'error'], 'b': ['errors']}, use_automaton=use_automaton)
+
+    assert [(match.start, match.keyword) for match in matcher.find_all("Errors")] == [
+        (0, 'errors'), (0, 'error'), (0, 'err'), (0, 'er'), (0, 'e')
+    ]
+
+
+@pytest.mark.parametrize('use_automaton', BACKENDS)
+def test_whole_word_flag(use_automaton):
+    matcher = KeywordMatcher({'frontend': ['button', 'ui']}, use_automaton=use_automaton)
+
+    matches = matcher.find_all("Button, buttons; ui-kit, guide")
+    assert [(match.keyword, match.whole_word) for match in matches] == [
+        ('button', True), ('button', False), ('ui', True), ('ui', False)
+    ]
+
+
+@pytest.mark.parametrize('use_automaton', BACKENDS)
+def test_shared_keyword_carries_every_label(use_automaton):
+    matcher = KeywordMatcher(KEYWORDS, use_automaton=use_automaton)
+
+    assert [match.labels for match in matcher.find_all("api")] == [('backend', 'frontend')]
@@ -0,0 +1,118 @@
+"""
+HybridClassifier.analyze_batch with stub models: batch prompts, splitting failed batches and timeouts.
+"""
+import time
+
+from src.llm_classifier import HybridClassifier
+from src.records import EmailRecord
+from src.ticket_analyzer import TicketAnalyzer
+from benchmarks.stub_model import StubModel, stub_verdict
+
+SUBJECTS = ["Layout and api", "Deploy broke the page", "Query slow on click", "Gateway timeout on checkout"]
+
+
+def make_tickets(analyzer, count):
+    tickets = []
+    for number in range(count):
+        subject = f"{SUBJECTS[number % len(SUBJECTS)]} #{number}"
+        email = EmailRecord(
+            id=f"msg{number}", thread_id=f"msg{number}", subject=subject, sender='user@example.com',
+            to='support@example.com', date='', timestamp=1700000000, body_text="Please take a look.", summary=subject
+        )
+        tickets.append(analyzer.summarize_ticket(email))
+    return tickets
+
+
+class SlowFirstCall(StubModel):
+    """Stub model whose first call takes `delay` seconds, recording the most calls ever in progress."""
+
+    def __init__(self, delay: float):
+        super().__init__()
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self.started = 0
+
+    def __call__(self, prompt: str) -> str:
+        with self.lock:
+            self.started += 1
+            first = self.started == 1
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            if first:
+                time.sleep(self.delay)
+            return super().__call__(prompt)
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+def test_tickets_are_sent_batch_size_per_prompt():
+    analyzer = TicketAnalyzer()
+    prompts = []
+    model = StubModel()
+
+    def recording_model(prompt):
+        prompts.append(prompt)
+        return model(prompt)
+
+    classifier = HybridClassifier(analyzer, recording_model, batch_size=10, max_in_flight=2)
+    tickets = make_tickets(analyzer, 25)
+
+    verdicts = classifier.analyze_batch(tickets)
+
+    assert sorted(prompt.count("### Email ") for prompt in prompts) == [5, 10, 10]
+    assert verdicts == [stub_verdict(f"{ticket.subject}\nBody:\n{ticket.body}\n") for ticket in tickets]
+    assert classifier.stats['batches'] == 3
+
+
+def test_unparseable_batches_are_split_until_answered():
+    analyzer = TicketAnalyzer()
+    model = StubModel(max_batch=3)
+    classifier = HybridClassifier(analyzer, model, batch_size=10)
+    tickets = make_tickets(analyzer, 10)
+
+    verdicts = classifier.analyze_batch(tickets)
+
+    assert all(verdict is not None for verdict in verdicts)
+    assert classifier.stats['batch_splits'] == 3  # 10 -> 5 + 5 -> 2 + 3 + 2 + 3
+    assert model.calls == 7
+
+
+def test_failed_single_ticket_gets_no_verdict():
+    analyzer = TicketAnalyzer()
+    classifier = HybridClassifier(analyzer, lambda prompt: "[{\"id\": 1, \"category\": \"Nonsense\"}]", batch_size=4)
+
+    assert classifier.analyze_batch(make_tickets(analyzer, 4)) == [None] * 4
+    assert classifier.stats['batch_splits'] == 3
+
+
+def test_timed_out_batch_keeps_its_slot_and_late_verdicts_are_used():
+    analyzer = TicketAnalyzer()
+    # Times out at 0.2 s and returns at 0.3 s, within the next 0.2 s wait for its slot
+    model = SlowFirstCall(delay=0.3)
+    classifier = HybridClassifier(analyzer, model, batch_size=4, max_in_flight=1, batch_timeout=0.2)
+    tickets = make_tickets(analyzer, 4)
+
+    verdicts = classifier.analyze_batch(tickets)
+
+    assert classifier.stats['batch_timeouts'] == 1
+    assert model.peak == 1
+    assert all(verdict is not None for verdict in verdicts)
+    # The late answer covered every ticket, so only the first retry was sent
+    assert model.started == 2
+
+
+def test_slots_held_by_an_earlier_call_bound_the_next_one():
+    analyzer = TicketAnalyzer()
+    model = SlowFirstCall(delay=0.3)
+    classifier = HybridClassifier(analyzer, model, batch_size=1, max_in_flight=2, batch_timeout=0.05)
+
+    classifier.analyze_batch(make_tickets(analyzer, 1))
+    assert classifier.stats['batch_timeouts'] == 1
+
+    # The first call is still running, so only one slot is free for these
+    verdicts = classifier.analyze_batch(make_tickets(analyzer, 4))
+    assert all(verdict is not None for verdict in verdicts)
+    assert model.peak == 2
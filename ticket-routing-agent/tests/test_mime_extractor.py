@@ -0,0 +1,96 @@
+"""
+Body extraction from Gmail message payloads by the recursive MIME walker.
+"""
+import base64
+
+from src import mime_extractor
+from src.mime_extractor import MimeExtractor, find_body_parts
+
+
+def encode(data) -> str:
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return base64.urlsafe_b64encode(data).decode()
+
+
+def part(mime_type, data, **fields):
+    return {'mimeType': mime_type, 'body': {'data': encode(data)}, **fields}
+
+
+def multipart(mime_type, *parts):
+    return {'mimeType': mime_type, 'body': {'size': 0}, 'parts': list(parts)}
+
+
+HTML = '<html><body><p>The <b>checkout</b> button is broken.</p><a href="https://shop.example.com">shop</a></body></html>'
+
+
+def test_plain_text_inside_nested_multipart_is_found():
+    payload = multipart(
+        'multipart/mixed',
+        multipart('multipart/alternative', part('text/plain', 'Checkout is broken.'), part('text/html', HTML)),
+        part('application/pdf', b'%PDF-1.4', filename='screenshot.pdf'),
+    )
+
+    assert MimeExtractor().body_text(payload) == 'Checkout is broken.'
+
+
+def test_html_is_not_converted_when_there_is_plain_text(monkeypatch):
+    def fail(html):
+        raise AssertionError("HTML converted")
+
+    monkeypatch.setattr(mime_extractor, 'html_to_text', fail)
+    payload = multipart('multipart/alternative', part('text/html', HTML), part('text/plain', 'Checkout is broken.'))
+
+    assert MimeExtractor().body_text(payload) == 'Checkout is broken.'
+
+
+def test_html_only_message_is_converted_to_text():
+    payload = multipart('multipart/mixed', multipart('multipart/related', part('text/html', HTML)))
+
+    text = MimeExtractor().body_text(payload)
+    assert 'The **checkout** button is broken.' in text
+    assert 'https://shop.example.com' in text
+    assert '<p>' not in text
+
+
+def test_walk_stops_at_first_plain_part_and_keeps_earlier_html():
+    html_first = multipart('multipart/alternative', part('text/html', HTML), part('text/plain', 'plain'))
+    plain_first = multipart('multipart/alternative', part('text/plain', 'plain'), part('text/html', HTML))
+
+    plain, html = find_body_parts(html_first)
+    assert (plain['mimeType'], html['mimeType']) == ('text/plain', 'text/html')
+    plain, html = find_body_parts(plain_first)
+    assert plain['mimeType'] == 'text/plain' and html is None
+
+
+def test_attachments_and_parts_without_inline_data_are_skipped():
+    payload = multipart(
+        'multipart/mixed',
+        part('text/plain', 'attached log', filename='log.txt'),
+        {'mimeType': 'text/plain', 'body': {'attachmentId': 'ANGjdJ8', 'size': 120000}},
+        part('text/html', HTML),
+    )
+
+    assert find_body_parts(payload)[0] is None
+    assert 'checkout' in MimeExtractor().body_text(payload)
+
+
+def test_text_that_is_not_utf8_is_decoded_with_replacements():
+    payload = part('text/plain', 'Café ünreachable'.encode('latin-1'))
+
+    assert MimeExtractor().body_text(payload) == 'Caf� �nreachable'
+
+
+def test_max_chars_stops_early_without_splitting_characters():
+    text = 'é' * 50 + ' outage ' + 'x' * 5000
+    payload = multipart('multipart/alternative', part('text/plain', text))
+    html_payload = part('text/html', f'<p>{text}</p>')
+
+    assert MimeExtractor(max_chars=54).body_text(payload) == text[:54]
+    assert MimeExtractor(max_chars=54).body_text(html_payload) == text[:54]
+
+
+def test_message_without_body_text_is_empty():
+    payload = multipart('multipart/mixed', part('image/png', b'\x89PNG', filename='x.png'))
+
+    assert MimeExtractor().body_text(payload) == ''
@@ -0,0 +1,87 @@
+"""
+Near-duplicate clustering of ticket emails into incidents.
+"""
+from src.near_duplicates import IncidentClusterer, MinHashIndex
+from src.records import EmailRecord
+from src.ticket_analyzer import TicketAnalyzer
+from benchmarks.fake_gmail import FakeGmailService, make_message
+
+OUTAGE = "Site is down - 502 bad gateway\nThe checkout site returns 502 bad gateway for every customer since 09:00."
+
+
+def report(number, text=OUTAGE, thread_id=None, sender=None):
+    subject, body = text.split('\n', 1)
+    return EmailRecord(
+        id=f"msg{number}", thread_id=thread_id or f"thread{number}", subject=subject,
+        sender=sender or f"user{number}@example.com", to='support@example.com', date='',
+        timestamp=1700000000.0 + number, body_text=body, summary=None
+    )
+
+
+def test_reports_differing_only_in_order_numbers_form_one_incident():
+    clusterer = IncidentClusterer()
+
+    assert clusterer.add(report(1, OUTAGE + " Order 884213.")) is None
+    assert clusterer.add(report(2, OUTAGE + " Order 190554.")) == 'msg1'
+    assert clusterer.add(report(3, "Invoice for March\nPlease find the invoice attached.")) is None
+    assert clusterer.duplicate_reports == 1
+
+
+def test_similarity_threshold_decides_whether_reports_merge():
+    first = "Dashboard broken after deployment\nThe dashboard shows blank charts and the export button fails."
+    second = "Dashboard broken after deployment\nThe dashboard shows blank charts and the filters reset."
+    index = MinHashIndex()
+    estimate = index.similarity(index.signature(first), index.signature(second))
+    assert 0.5 < estimate < 0.9
+
+    loose = IncidentClusterer(similarity=estimate - 0.05)
+    strict = IncidentClusterer(similarity=estimate + 0.05)
+    for clusterer in (loose, strict):
+        clusterer.add(report(1, first))
+    assert loose.add(report(2, second)) == 'msg1'
+    assert strict.add(report(2, second)) is None
+
+
+def test_reply_in_a_clustered_thread_joins_its_incident():
+    clusterer = IncidentClusterer()
+    clusterer.add(report(1, thread_id='outage'))
+
+    assert clusterer.add(report(2, "Re: any update?\nStill seeing it here.", thread_id='outage')) == 'msg1'
+
+
+def test_reports_without_words_open_their_own_incident():
+    clusterer = IncidentClusterer()
+
+    assert clusterer.add(report(1, "!!!\n...")) is None
+    assert clusterer.add(report(2, "!!!\n...")) is None
+
+
+def test_annotate_counts_distinct_reporters_and_folded_reports():
+    clusterer = IncidentClusterer()
+    reports = [report(1), report(2), report(3, sender='user1@example.com'), report(4, "Lunch\nPizza on Friday?")]
+    first = list(clusterer.iter_first_reports(reports))
+    assert [email.id for email in first] == ['msg1', 'msg4']
+
+    tickets = [TicketAnalyzer().summarize_ticket(email) for email in first]
+    clusterer.annotate(tickets)
+    assert [(ticket.reporter_count, ticket.duplicate_ids) for ticket in tickets] == [(2, ['msg2', 'msg3']), (1, [])]
+
+    clusterer.reset()
+    assert clusterer.incidents == {} and clusterer.duplicate_reports == 0
+
+
+def test_outage_storm_is_classified_and_forwarded_once(make_agent):
+    storm = []
+    for number in range(30):
+        message = make_message(2)  # "Site is down - 502 bad gateway"
+        message['id'], message['threadId'] = f"storm{number:04d}", f"thread{number:04d}"
+        message['payload']['headers'][1]['value'] = f"user{number}@example.com"
+        storm.append(message)
+    service = FakeGmailService(storm)
+    agent = make_agent(service, cluster=True)
+
+    tickets = agent.scan_gmail()
+
+    assert len(tickets) == 1
+    assert tickets[0].reporter_count == 30 and len(tickets[0].duplicate_ids) == 29
+    assert len(service.sent) == len(tickets[0].forward_to)
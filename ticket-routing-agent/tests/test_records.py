@@ -0,0 +1,83 @@
+"""
+The dict-compatible view of the slotted email and ticket records.
+"""
+import csv
+
+import pytest
+
+from src.gmail_handler import GmailHandler
+from src.records import EmailRecord
+from src.ticket_analyzer import TicketAnalyzer
+from benchmarks.fake_gmail import FakeGmailService, make_multipart_message
+
+
+def make_email(**fields):
+    values = dict(id='msg1', thread_id='thread1', subject='API returns 500 error', sender='ana@example.com',
+                  to='support@example.com', date='Tue, 14 Nov 2023 22:13:20 +0000', timestamp=1700000000.0,
+                  body_text='The api fails with a json error.', summary=None)
+    values.update(fields)
+    return EmailRecord(**values)
+
+
+def test_records_have_no_instance_dict():
+    email = make_email()
+    assert not hasattr(email, '__dict__')
+    with pytest.raises(AttributeError):
+        email.body_html = '<p>kept</p>'
+
+
+def test_dict_view_reads_and_writes_fields():
+    email = make_email()
+
+    assert email['subject'] == 'API returns 500 error'
+    assert email['from'] == email.sender == 'ana@example.com'
+    email['summary'] = 'Json error from the api'
+    assert email.summary == 'Json error from the api'
+    with pytest.raises(KeyError):
+        email['body_html']
+    with pytest.raises(KeyError):
+        email['body_html'] = '<p>kept</p>'
+
+
+def test_get_and_contains_treat_unset_fields_as_missing():
+    email = make_email()
+
+    assert email.get('summary') is None
+    assert email.get('summary', 'none yet') == 'none yet'
+    assert email.get('missing', 'default') == 'default'
+    assert 'summary' not in email
+    assert 'from' in email and 'subject' in email
+
+
+def test_keys_and_to_dict_use_the_original_dict_keys():
+    email = make_email()
+
+    assert email.keys() == ['id', 'thread_id', 'subject', 'from', 'to', 'date', 'timestamp', 'body_text', 'summary']
+    assert email.to_dict()['from'] == 'ana@example.com'
+
+
+def test_extracted_email_keeps_text_only_and_ticket_shares_its_body():
+    message = make_multipart_message(1)
+    handler = GmailHandler()
+    handler.service = FakeGmailService([message])
+
+    email = handler.extract_ticket_content(message)
+    ticket = TicketAnalyzer().summarize_ticket(email)
+
+    assert email.body_text.startswith('Our integration started failing')
+    assert '<' not in email.body_text
+    assert ticket.body is email.body_text
+    assert ticket['from'] == email['from']
+
+
+def test_tickets_export_through_the_dict_view(make_agent, tmp_path):
+    agent = make_agent(FakeGmailService([]))
+    agent.tickets = [agent.ticket_analyzer.summarize_ticket(make_email(summary='Json error'))]
+    path = tmp_path / 'tickets.csv'
+
+    assert agent.export_to_csv(str(path))
+    with open(path, newline='') as csvfile:
+        rows = list(csv.DictReader(csvfile))
+    assert [(row['subject'], row['from'], row['summary'], row['reporter_count']) for row in rows] == [
+        ('API returns 500 error', 'ana@example.com', 'Json error', '1')
+    ]
@@ -0,0 +1,64 @@
+"""
+Compilation of the ticket queries into Gmail search expressions, and the searches run with them.
+"""
+import pytest
+
+from src.gmail_handler import GmailHandler
+from src.search_query import compile_search_queries, quote_term
+from benchmarks.fake_gmail import FakeGmailService, make_inbox
+
+
+@pytest.mark.parametrize('term, quoted', [
+    ('bug', 'bug'),
+    ('follow-up', 'follow-up'),
+    ('not working', '"not working"'),
+    ('500 error', '"500 error"'),
+    ('404', '404'),
+    ('say "hi"', '"say  hi"'),
+    ('c++', '"c++"'),
+])
+def test_quote_term(term, quoted):
+    assert quote_term(term) == quoted
+
+
+def test_terms_are_quoted_deduplicated_and_share_the_filters():
+    queries = compile_search_queries(['bug', 'issue', 'not working', 'bug', '', '"'], 'newer_than:7d')
+
+    assert queries == ['{bug issue "not working"} newer_than:7d']
+
+
+def test_long_term_lists_are_split_under_the_length_limit():
+    terms = [f"keyword{number}" for number in range(200)] + ['not working']
+
+    queries = compile_search_queries(terms, 'newer_than:7d', max_length=120)
+
+    assert len(queries) > 1
+    assert all(len(query) <= 120 and query.endswith('} newer_than:7d') for query in queries)
+    # Every term in exactly one query, in order
+    assert ' '.join(query[1:query.index('}')] for query in queries) == ' '.join(terms[:200] + ['"not working"'])
+
+
+def test_search_finds_the_tickets_a_full_listing_does(make_agent):
+    inbox = make_inbox(300, ticket_share=0.3)
+
+    listed = make_agent(FakeGmailService(inbox)).scan_gmail()
+    searched_agent = make_agent(FakeGmailService(inbox), search=True)
+    searched = searched_agent.scan_gmail()
+
+    assert [ticket.id for ticket in searched] == [ticket.id for ticket in listed]
+    assert len(searched_agent.inbox) < len(inbox)  # only the matching messages were fetched
+
+
+def test_results_of_several_queries_are_merged_by_message_id(monkeypatch):
+    handler = GmailHandler()
+    handler.service = FakeGmailService(make_inbox(200, ticket_share=0.3))
+    monkeypatch.setattr(handler, 'search_queries', lambda: ['{bug error}', '{error timeout}', '{timeout}'])
+
+    message_ids = list(handler.iter_search_message_ids())
+
+    assert message_ids
+    assert len(message_ids) == len(set(message_ids))
+    assert set(message_ids) == {
+        message_id for query in ('{bug error}', '{error timeout}')
+        for message_id in handler.iter_inbox_message_ids(query)
+    }
@@ -0,0 +1,27 @@
+"""
+Forward outcomes recorded by the ticket store, against the fake Gmail service.
+"""
+from src.ticket_store import TicketStore
+from benchmarks.fake_gmail import FakeGmailService, make_inbox
+
+
+def test_failed_forwards_are_stored_as_undelivered(make_agent):
+    service = FakeGmailService(make_inbox(100, ticket_share=0.5), send_errors=[400] * 3)
+    agent = make_agent(service, store=True)
+    agent.gmail_handler.max_retries = 0
+    agent.scan_gmail()
+
+    forwards, failed = agent.store.conn.execute("SELECT forwards, failed_forwards FROM runs").fetchone()
+    undelivered = agent.store.conn.execute("SELECT COUNT(*) FROM forwards WHERE delivered = 0").fetchone()[0]
+    assert forwards == len(service.sent) + 3
+    assert failed == undelivered == 3
+
+
+def test_delivered_flag_is_stored_as_given(tmp_path):
+    store = TicketStore(str(tmp_path / 'tickets.db'))
+    run_id = store.start_run()
+    store.finish_run(run_id, {}, [('t1', 'qa@example.com', 0.0, True, 'sent'),
+                                  ('t2', 'qa@example.com', 0.0, False, '✓ looked sent')])
+    rows = store.conn.execute("SELECT ticket_id, delivered FROM forwards ORDER BY ticket_id").fetchall()
+    assert rows == [('t1', 1), ('t2', 0)]
+    store.close()